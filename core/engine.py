@@ -5,15 +5,26 @@ import os
 import boto3
 from datetime import datetime, timezone, timedelta
 from typing import Any
-from azure.identity import ClientSecretCredential
 from azure.mgmt.resource import ResourceManagementClient
 from azure.core.exceptions import ClientAuthenticationError
 from azure.mgmt.authorization import AuthorizationManagementClient
 from botocore.exceptions import NoCredentialsError
 
 from .utils import copy_assets
-from .utils_aws import build_aws_resource_inventory, build_aws_cost_inventory
-from .utils_azure import build_azure_resource_inventory, build_azure_cost_inventory
+from .utils_aws import build_aws_cost_inventory
+from .utils_aws_org import (
+    aws_resource_inventory_builder,
+    build_aws_org_cost_inventory,
+    build_aws_org_resource_inventory,
+)
+from .utils_azure import azure_credential, build_azure_cost_inventory
+from .utils_azure_scope import (
+    azure_resource_inventory_builder,
+    build_azure_scope_cost_inventory,
+    build_azure_scope_resource_inventory,
+    is_multi_scope,
+    permission_scope,
+)
 from .utils_db import connect, load_data
 from .utils_tfstate import build_tfstate_resource_inventory
 from .utils_report import (
@@ -36,12 +47,8 @@ def verify_credentials(
 
     if cloud_service_provider == 1:  # Azure
         try:
-            # Use DefaultAzureCredential if provided, else use client secrets
-            credential = provider_details.get("credential") or ClientSecretCredential(
-                tenant_id=provider_details["tenantId"],
-                client_id=provider_details["clientId"],
-                client_secret=provider_details["clientSecret"],
-            )
+            # One credential per run: later stages reuse it and its tokens
+            credential = azure_credential(provider_details)
             resource_client = ResourceManagementClient(
                 credential, provider_details["subscriptionId"]
             )
@@ -90,13 +97,9 @@ def test_permissions(
 
     if cloud_service_provider == 1:  # Azure
         try:
-            # Use DefaultAzureCredential if provided, else use client secrets
-            credential = provider_details.get("credential") or ClientSecretCredential(
-                tenant_id=provider_details["tenantId"],
-                client_id=provider_details["clientId"],
-                client_secret=provider_details["clientSecret"],
-            )
-            resource_group_scope = f"/subscriptions/{provider_details['subscriptionId']}/resourceGroups/{provider_details['resourceGroupName']}"
+            # One credential per run: later stages reuse it and its tokens
+            credential = azure_credential(provider_details)
+            resource_group_scope = permission_scope(provider_details)
 
             # Check role assignments
             auth_client = AuthorizationManagementClient(
@@ -267,14 +270,39 @@ def create_resource_inventory(
                 "logs": "Resource inventory created successfully.",
                 "coverage": coverage,
             }
+        elif cloud_service_provider == 1 and is_multi_scope(provider_details):
+            # Azure: several subscriptions / resource groups, rolled up
+            coverage = build_azure_scope_resource_inventory(
+                cloud_service_provider, provider_details, report_path, raw_data_path
+            )
+            return {
+                "success": True,
+                "logs": "Resource inventory created successfully.",
+                "coverage": coverage,
+            }
         elif cloud_service_provider == 1:  # Azure
-            build_azure_resource_inventory(
+            build = azure_resource_inventory_builder(provider_details)
+            build(cloud_service_provider, provider_details, report_path, raw_data_path)
+        elif cloud_service_provider == 2 and provider_details.get("orgRole"):
+            # AWS Organizations: every member account, rolled up
+            coverage = build_aws_org_resource_inventory(
                 cloud_service_provider, provider_details, report_path, raw_data_path
             )
+            return {
+                "success": True,
+                "logs": "Resource inventory created successfully.",
+                "coverage": coverage,
+            }
         elif cloud_service_provider == 2:  # AWS
-            build_aws_resource_inventory(
+            build = aws_resource_inventory_builder(provider_details)
+            coverage = build(
                 cloud_service_provider, provider_details, report_path, raw_data_path
             )
+            return {
+                "success": True,
+                "logs": "Resource inventory created successfully.",
+                "coverage": coverage or {},
+            }
 
         return {"success": True, "logs": "Resource inventory created successfully."}
 
@@ -292,10 +320,30 @@ def create_cost_inventory(
     raw_data_path: str,
 ) -> dict[str, Any]:
     try:
-        if cloud_service_provider == 1:  # Azure
+        if cloud_service_provider == 1 and is_multi_scope(provider_details):
+            # Azure: several subscriptions / resource groups, rolled up
+            coverage = build_azure_scope_cost_inventory(
+                cloud_service_provider, provider_details, report_path, raw_data_path
+            )
+            return {
+                "success": True,
+                "logs": "Cost inventory created successfully.",
+                "coverage": coverage,
+            }
+        elif cloud_service_provider == 1:  # Azure
             build_azure_cost_inventory(
                 cloud_service_provider, provider_details, report_path, raw_data_path
             )
+        elif cloud_service_provider == 2 and provider_details.get("orgRole"):
+            # AWS Organizations: every member account, rolled up
+            coverage = build_aws_org_cost_inventory(
+                cloud_service_provider, provider_details, report_path, raw_data_path
+            )
+            return {
+                "success": True,
+                "logs": "Cost inventory created successfully.",
+                "coverage": coverage,
+            }
         elif cloud_service_provider == 2:  # AWS
             build_aws_cost_inventory(
                 cloud_service_provider, provider_details, report_path, raw_data_path
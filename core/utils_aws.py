@@ -1,21 +1,477 @@
 # core/utils_aws.py
 import boto3
+import functools
+import botocore.exceptions
+import botocore.session
 import json
 import os
 import logging
+import re
 import sqlite3
-from typing import Any
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from collections.abc import Collection, Iterator
+from typing import Any, NamedTuple, Self
 from datetime import date, datetime, timezone
 from collections import defaultdict
 from dateutil.relativedelta import relativedelta
 from botocore.config import Config
+from botocore.credentials import RefreshableCredentials
 
 from .utils_db import connect, load_data
+from .utils_cache import FAILURE_CACHE_TTL_HOURS, ResponseCache, response_cache
 
 logger = logging.getLogger("core.engine.aws")
 
 AWS_RETRY_CONFIG = Config(retries={"mode": "adaptive", "max_attempts": 8})
 
+# Worker threads for resource inventory collection (--jobs). The calls are
+# network-bound, so a handful of workers hides most of the latency without
+# tripping per-service throttling.
+AWS_DEFAULT_JOBS = 8
+
+
+# Services whose list operations return the same account-wide result from any
+# region. They are collected once, in the home region (providerDetails.region),
+# instead of once per swept region. ListBuckets is account-wide as well.
+AWS_GLOBAL_SERVICES = {
+    "iam",
+    "cloudfront",
+    "route53",
+    "route53domains",
+    "organizations",
+    "s3",
+}
+
+# Cloud Control types that are account-wide, like the services above. The
+# service namespace alone does not decide it: AWS::S3::AccessPoint and
+# AWS::S3::StorageLens, for instance, are regional resources.
+AWS_GLOBAL_CLOUD_CONTROL_TYPES = {
+    "AWS::CloudFront::CachePolicy",
+    "AWS::CloudFront::CloudFrontOriginAccessIdentity",
+    "AWS::CloudFront::ContinuousDeploymentPolicy",
+    "AWS::CloudFront::Distribution",
+    "AWS::CloudFront::Function",
+    "AWS::CloudFront::KeyGroup",
+    "AWS::CloudFront::OriginAccessControl",
+    "AWS::CloudFront::OriginRequestPolicy",
+    "AWS::CloudFront::PublicKey",
+    "AWS::CloudFront::RealtimeLogConfig",
+    "AWS::CloudFront::ResponseHeadersPolicy",
+    "AWS::IAM::Group",
+    "AWS::IAM::InstanceProfile",
+    "AWS::IAM::ManagedPolicy",
+    "AWS::IAM::OIDCProvider",
+    "AWS::IAM::Role",
+    "AWS::IAM::SAMLProvider",
+    "AWS::IAM::ServerCertificate",
+    "AWS::IAM::User",
+    "AWS::IAM::VirtualMFADevice",
+    "AWS::Organizations::Account",
+    "AWS::Organizations::OrganizationalUnit",
+    "AWS::Organizations::Policy",
+    "AWS::Route53::CidrCollection",
+    "AWS::Route53::HealthCheck",
+    "AWS::Route53::HostedZone",
+    "AWS::S3::Bucket",
+    "AWS::S3::MultiRegionAccessPoint",
+}
+
+# Server-side parameters per "service.operation", applied by iter_pages().
+# "params" scopes the listing to resources the account owns, so public and
+# AWS-managed catalogue entries (shared AMIs and snapshots, AWS-managed IAM
+# policies and SSM documents, ...) are not counted; "page_size" is the
+# operation's largest page, so big accounts need fewer round trips. Explicit
+# keyword arguments from the caller take precedence.
+AWS_OPERATION_PARAMETERS: dict[str, dict[str, Any]] = {
+    "ec2.describe_snapshots": {"params": {"OwnerIds": ["self"]}, "page_size": 1000},
+    "ec2.describe_images": {"params": {"Owners": ["self"]}, "page_size": 1000},
+    "ec2.describe_fpga_images": {"params": {"Owners": ["self"]}, "page_size": 1000},
+    "ec2.describe_instances": {"page_size": 1000},
+    "ec2.describe_volumes": {"page_size": 500},
+    "ec2.describe_security_groups": {"page_size": 1000},
+    "ec2.describe_network_interfaces": {"page_size": 1000},
+    "rds.describe_db_snapshots": {
+        "params": {"IncludeShared": False, "IncludePublic": False},
+        "page_size": 100,
+    },
+    "rds.describe_db_cluster_snapshots": {
+        "params": {"IncludeShared": False, "IncludePublic": False},
+        "page_size": 100,
+    },
+    "rds.describe_db_instances": {"page_size": 100},
+    "iam.list_policies": {"params": {"Scope": "Local"}, "page_size": 1000},
+    "iam.list_roles": {"page_size": 1000},
+    "iam.list_users": {"page_size": 1000},
+    "ssm.list_documents": {
+        "params": {"Filters": [{"Key": "Owner", "Values": ["Self"]}]},
+        "page_size": 50,
+    },
+    "elasticbeanstalk.list_platform_versions": {
+        "params": {
+            "Filters": [{"Type": "PlatformOwner", "Operator": "=", "Values": ["self"]}]
+        }
+    },
+    "dynamodb.list_tables": {"page_size": 100},
+    "lambda.list_functions": {"page_size": 50},
+    "logs.describe_log_groups": {"page_size": 50},
+    "cloudwatch.describe_alarms": {"page_size": 100},
+    "kms.list_keys": {"page_size": 1000},
+    "ecr.describe_repositories": {"page_size": 1000},
+    "elbv2.describe_load_balancers": {"page_size": 400},
+    "sqs.list_queues": {"page_size": 1000},
+    "resourcegroupstaggingapi.get_resources": {"page_size": 100},
+    "cloudcontrol.list_resources": {"page_size": 100},
+}
+
+
+def operation_parameters(
+    service_name: str, operation_name: str
+) -> tuple[dict[str, Any], int | None]:
+    """Server-side parameters and page size for one operation, if it has any."""
+    entry = AWS_OPERATION_PARAMETERS.get(f"{service_name}.{operation_name}", {})
+    return dict(entry.get("params", {})), entry.get("page_size")
+
+
+# Sustained requests per second per service and region, shared by every
+# client of the run. Roughly the documented (or observed) control-plane quota
+# for the list/describe calls the collectors make; a service that is not
+# listed gets AWS_DEFAULT_RATE. Each bucket holds one second of burst.
+AWS_SERVICE_RATES: dict[str, float] = {
+    "ec2": 20.0,
+    "ebs": 20.0,
+    "cloudwatch": 20.0,
+    "rds": 10.0,
+    "dynamodb": 10.0,
+    "lambda": 10.0,
+    "iam": 10.0,
+    "s3": 50.0,
+    "logs": 5.0,
+    "ce": 5.0,
+    "route53": 5.0,
+    "cloudfront": 5.0,
+    "organizations": 5.0,
+    "cloudcontrol": 5.0,
+}
+AWS_DEFAULT_RATE = 10.0
+
+# Error codes AWS uses for rate limiting, as opposed to quotas or access.
+AWS_THROTTLING_CODES = frozenset(
+    {
+        "Throttling",
+        "ThrottlingException",
+        "ThrottledException",
+        "RequestThrottled",
+        "RequestThrottledException",
+        "RequestLimitExceeded",
+        "TooManyRequestsException",
+        "SlowDown",
+        "EC2ThrottledException",
+    }
+)
+
+# Error codes retrying will not fix: the caller lacks access, or the service
+# is not enabled for the account or not offered in the region. Inventory
+# units failing with one are skipped by later runs for a while.
+AWS_LASTING_ERROR_CODES = frozenset(
+    {
+        "AccessDenied",
+        "AccessDeniedException",
+        "UnauthorizedOperation",
+        "AuthorizationError",
+        "OptInRequired",
+        "SubscriptionRequiredException",
+        "InvalidAction",
+        "UnsupportedOperation",
+        "UnrecognizedClientException",
+        "UnsupportedActionException",
+        "TypeNotFoundException",
+    }
+)
+
+# An unreachable endpoint usually means the service is not offered in that
+# region, but may also be a network failure, so it is retried sooner.
+AWS_ENDPOINT_FAILURE_TTL_HOURS = 1
+
+
+class TokenBucket:
+    """Client-side rate limit for one service in one region.
+
+    A throttling response halves the rate; every successful attempt wins back
+    a twentieth of the table rate, so the bucket settles just under the
+    account's real quota instead of oscillating between bursts and retries.
+    """
+
+    MIN_RATE = 0.5
+
+    def __init__(self, rate: float) -> None:
+        self.max_rate = rate
+        self.rate = rate
+        self._tokens = max(rate, 1.0)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(
+            self._tokens + (now - self._updated) * self.rate, max(self.rate, 1.0)
+        )
+        self._updated = now
+
+    def acquire(self) -> None:
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+    def throttled(self) -> None:
+        with self._lock:
+            self._refill()
+            self.rate = max(self.rate / 2, self.MIN_RATE)
+            self._tokens = min(self._tokens, 0.0)
+
+    def succeeded(self) -> None:
+        with self._lock:
+            if self.rate < self.max_rate:
+                self._refill()
+                self.rate = min(self.rate + self.max_rate / 20, self.max_rate)
+
+
+class RequestScheduler:
+    """Token buckets per (service, region), shared by all AWS collectors.
+
+    attach() hooks a client's botocore events, so each HTTP attempt,
+    retries included, first waits for a token, and its outcome adjusts the
+    bucket. AWS_RETRY_CONFIG still retries the throttled attempt itself.
+    """
+
+    def __init__(
+        self,
+        rates: dict[str, float] | None = None,
+        default_rate: float = AWS_DEFAULT_RATE,
+    ) -> None:
+        self._rates = AWS_SERVICE_RATES if rates is None else rates
+        self._default_rate = default_rate
+        self._buckets: dict[tuple[str, str], TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def bucket(self, service_name: str, region: str) -> TokenBucket:
+        with self._lock:
+            key = (service_name, region)
+            if key not in self._buckets:
+                self._buckets[key] = TokenBucket(
+                    self._rates.get(service_name, self._default_rate)
+                )
+            return self._buckets[key]
+
+    def attach(self, client: Any) -> Any:
+        bucket = self.bucket(
+            client.meta.service_model.service_name, client.meta.region_name
+        )
+
+        def before_send(**kwargs: Any) -> None:
+            bucket.acquire()
+
+        def needs_retry(
+            response: Any = None, caught_exception: Any = None, **kwargs: Any
+        ) -> None:
+            # Observe only: returning None leaves the retry decision to botocore.
+            if response is None:
+                return
+            error_code = response[1].get("Error", {}).get("Code")
+            if error_code in AWS_THROTTLING_CODES:
+                bucket.throttled()
+                logger.debug(
+                    "Throttled by %s in %s (%s); rate lowered to %.2f/s",
+                    client.meta.service_model.service_name,
+                    client.meta.region_name,
+                    error_code,
+                    bucket.rate,
+                )
+            elif not error_code:
+                bucket.succeeded()
+
+        client.meta.events.register("before-send", before_send)
+        client.meta.events.register("needs-retry", needs_retry)
+        return client
+
+
+# One scheduler per process: stages run one after another and share quotas.
+AWS_SCHEDULER = RequestScheduler()
+
+
+def client_config(jobs: int) -> Config:
+    """AWS_RETRY_CONFIG with a connection pool large enough for `jobs` workers."""
+    return AWS_RETRY_CONFIG.merge(Config(max_pool_connections=max(jobs, 10)))
+
+
+class SharedSession:
+    """A boto3 session that several threads can build clients from.
+
+    Clients are thread-safe, the session that creates them is not, so only
+    client creation is serialised. Every client goes through `scheduler`.
+    """
+
+    def __init__(self, session: Any, scheduler: RequestScheduler | None = None) -> None:
+        self._session = session
+        self._scheduler = scheduler or AWS_SCHEDULER
+        self._lock = threading.Lock()
+
+    def client(self, *args: Any, **kwargs: Any) -> Any:
+        with self._lock:
+            client = self._session.client(*args, **kwargs)
+        return self._scheduler.attach(client)
+
+
+# Assumed-role sessions of organizations mode, one per role ARN, so the
+# inventory and cost stages of an account share one set of credentials and
+# one RequestScheduler (AWS quotas are per account).
+_ASSUMED_SESSIONS: dict[str, SharedSession] = {}
+_ASSUMED_SESSIONS_LOCK = threading.Lock()
+
+AWS_ROLE_SESSION_NAME = "cloudexit"
+
+
+def assume_role_session(session: Any, role_arn: str, region: str) -> Any:
+    """A boto3 session for `role_arn` whose credentials renew themselves.
+
+    botocore refreshes RefreshableCredentials shortly before they expire, under
+    its own lock, so a long run keeps working from every pool thread.
+    """
+    sts_client = session.client("sts", region_name=region, config=AWS_RETRY_CONFIG)
+
+    def refresh() -> dict[str, str]:
+        credentials = sts_client.assume_role(
+            RoleArn=role_arn, RoleSessionName=AWS_ROLE_SESSION_NAME
+        )["Credentials"]
+        return {
+            "access_key": credentials["AccessKeyId"],
+            "secret_key": credentials["SecretAccessKey"],
+            "token": credentials["SessionToken"],
+            "expiry_time": credentials["Expiration"].isoformat(),
+        }
+
+    botocore_session = botocore.session.get_session()
+    botocore_session._credentials = RefreshableCredentials.create_from_metadata(
+        metadata=refresh(), refresh_using=refresh, method="sts-assume-role"
+    )
+    return boto3.Session(botocore_session=botocore_session, region_name=region)
+
+
+def aws_session(provider_details: dict[str, Any]) -> SharedSession:
+    """The session for providerDetails, inside providerDetails.roleArn if set."""
+    role_arn = provider_details.get("roleArn")
+    if role_arn:
+        with _ASSUMED_SESSIONS_LOCK:
+            cached = _ASSUMED_SESSIONS.get(role_arn)
+        if cached is not None:
+            return cached
+
+    region = provider_details["region"]
+    session = boto3.Session(
+        aws_access_key_id=provider_details["accessKey"],
+        aws_secret_access_key=provider_details["secretKey"],
+        aws_session_token=provider_details.get("sessionToken"),
+        region_name=region,
+    )
+    if not role_arn:
+        return SharedSession(session)
+
+    assumed = SharedSession(
+        assume_role_session(session, role_arn, region), RequestScheduler()
+    )
+    with _ASSUMED_SESSIONS_LOCK:
+        return _ASSUMED_SESSIONS.setdefault(role_arn, assumed)
+
+
+# Region lists from the endpoint data that ships with botocore. The data is
+# static, so one credential-less session serves every assessment.
+_ENDPOINT_SESSION = botocore.session.get_session()
+_ENDPOINT_LOCK = threading.Lock()
+
+
+@functools.cache
+def _endpoint_regions(service_name: str, partition: str) -> frozenset[str]:
+    with _ENDPOINT_LOCK:
+        return frozenset(
+            _ENDPOINT_SESSION.get_available_regions(service_name, partition)
+        )
+
+
+def service_available(service_name: str, region: str) -> bool:
+    """False only when botocore's endpoint data rules `region` out for the service.
+
+    Global services list no regions, and a region newer than the installed
+    botocore is in no list at all (EC2's list stands in for the partition's,
+    as EC2 launches in every region); neither is ruled out.
+    """
+    try:
+        with _ENDPOINT_LOCK:
+            partition = _ENDPOINT_SESSION.get_partition_for_region(region)
+    except botocore.exceptions.BotoCoreError:
+        return True
+    regions = _endpoint_regions(service_name, partition)
+    if not regions or region not in _endpoint_regions("ec2", partition):
+        return True
+    return region in regions
+
+
+def lasting_failure(exc: Exception) -> tuple[str, float] | None:
+    """(reason, hours to skip the call) for an error retrying won't fix."""
+    if isinstance(exc, botocore.exceptions.ClientError):
+        code = exc.response.get("Error", {}).get("Code")
+        if code in AWS_LASTING_ERROR_CODES:
+            return code, FAILURE_CACHE_TTL_HOURS
+    elif isinstance(exc, botocore.exceptions.EndpointConnectionError):
+        return "EndpointConnectionError", AWS_ENDPOINT_FAILURE_TTL_HOURS
+    return None
+
+
+def aws_response_cache(
+    session: Any, provider_details: dict[str, Any]
+) -> ResponseCache | None:
+    """The response cache for the account behind `session`, if enabled."""
+    if not provider_details.get("cacheDir"):
+        return None
+    account_id = provider_details.get("accountId")
+    if not account_id:
+        try:
+            account_id = session.client(
+                "sts", region_name=provider_details["region"], config=AWS_RETRY_CONFIG
+            ).get_caller_identity()["Account"]
+        except (
+            botocore.exceptions.BotoCoreError,
+            botocore.exceptions.ClientError,
+        ) as e:
+            # Entries are scoped by account: without it, run uncached.
+            logger.warning(
+                "Response cache disabled: could not identify the account: %s", str(e)
+            )
+            return None
+    return response_cache(provider_details, account_id)
+
+
+def resolve_aws_regions(session: Any, provider_details: dict[str, Any]) -> list[str]:
+    """The regions an assessment covers: providerDetails.regions, else the home region."""
+    regions = provider_details.get("regions")
+    if not regions:
+        return [provider_details["region"]]
+    if regions == "all":
+        # Without AllRegions, DescribeRegions only returns the regions that are
+        # enabled for the account, which are the only ones worth sweeping.
+        ec2_client = session.client(
+            "ec2", region_name=provider_details["region"], config=AWS_RETRY_CONFIG
+        )
+        return sorted(
+            item["RegionName"] for item in ec2_client.describe_regions()["Regions"]
+        )
+    return list(dict.fromkeys(regions))
+
 
 def paginate(
     client: Any,
@@ -29,6 +485,32 @@ def paginate(
     return items
 
 
+def iter_pages(
+    client: Any,
+    operation_name: str,
+    result_key: str,
+    **kwargs: Any,
+) -> Iterator[list]:
+    """Yield the items of each page; an operation without a paginator is one page.
+
+    The operation's entry in AWS_OPERATION_PARAMETERS is applied underneath
+    the caller's keyword arguments.
+    """
+    params, page_size = operation_parameters(
+        client.meta.service_model.service_name, operation_name
+    )
+    kwargs = {**params, **kwargs}
+    if client.can_paginate(operation_name):
+        if page_size and "PaginationConfig" not in kwargs:
+            kwargs["PaginationConfig"] = {"PageSize": page_size}
+        for page in client.get_paginator(operation_name).paginate(**kwargs):
+            yield page.get(result_key, [])
+        return
+    response = getattr(client, operation_name)(**kwargs)
+    if isinstance(response, dict):
+        yield response.get(result_key, [])
+
+
 def paginate_or_call(
     client: Any,
     operation_name: str,
@@ -36,24 +518,416 @@ def paginate_or_call(
     **kwargs: Any,
 ) -> list:
     """paginate() when boto3 supports it for this operation, else a single call."""
-    if client.can_paginate(operation_name):
-        return paginate(client, operation_name, result_key, **kwargs)
-    response = getattr(client, operation_name)(**kwargs)
-    if not isinstance(response, dict):
-        return []
-    return response.get(result_key, [])
-
-
-def convert_datetime(obj: Any) -> Any:
-    if isinstance(obj, dict):
-        for k, v in obj.items():
-            obj[k] = convert_datetime(v)
-    elif isinstance(obj, list):
-        for i in range(len(obj)):
-            obj[i] = convert_datetime(obj[i])
-    elif isinstance(obj, datetime):
+    return [
+        item
+        for page in iter_pages(client, operation_name, result_key, **kwargs)
+        for item in page
+    ]
+
+
+class CallPlan:
+    """The AWS list calls the enabled stages need, deduplicated.
+
+    A call is identified by service, region, operation, result key and its
+    parameters once AWS_OPERATION_PARAMETERS is applied, so stages asking for
+    the same listing share one entry; global services always resolve to the
+    home region. A call with several consumers runs once and its pages are
+    kept until the last consumer has taken them. Every other call streams
+    straight through iter_pages(). With a `cache`, calls are served from the
+    response cache of an earlier run while it is fresh.
+    """
+
+    def __init__(self, home_region: str, cache: ResponseCache | None = None) -> None:
+        self.home_region = home_region
+        self.cache = cache
+        self._consumers: dict[tuple, list[str]] = {}
+        self._remaining: dict[tuple, int] = {}
+        self._pages: dict[tuple, list[list]] = {}
+        self._call_locks: dict[tuple, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def _key(
+        self,
+        service_name: str,
+        region: str,
+        operation_name: str,
+        result_key: str,
+        params: dict[str, Any],
+    ) -> tuple:
+        if service_name in AWS_GLOBAL_SERVICES:
+            region = self.home_region
+        defaults, _ = operation_parameters(service_name, operation_name)
+        merged = {**defaults, **params}
+        # Page size changes the number of round trips, not the result.
+        merged.pop("PaginationConfig", None)
+        return (
+            service_name,
+            region,
+            operation_name,
+            result_key,
+            json.dumps(merged, sort_keys=True, default=json_default),
+        )
+
+    def add(
+        self,
+        consumer: str,
+        service_name: str,
+        region: str,
+        operation_name: str,
+        result_key: str,
+        **params: Any,
+    ) -> None:
+        """Record that `consumer` will list this call once."""
+        key = self._key(service_name, region, operation_name, result_key, params)
+        self._consumers.setdefault(key, []).append(consumer)
+        self._remaining[key] = self._remaining.get(key, 0) + 1
+
+    def has_pages(
+        self,
+        service_name: str,
+        region: str,
+        operation_name: str,
+        result_key: str,
+        **params: Any,
+    ) -> bool:
+        """Whether an earlier consumer already fetched this call."""
+        key = self._key(service_name, region, operation_name, result_key, params)
+        with self._lock:
+            return key in self._pages
+
+    def iter_pages(
+        self,
+        client: Any,
+        region: str,
+        operation_name: str,
+        result_key: str,
+        **kwargs: Any,
+    ) -> Iterator[list]:
+        """iter_pages() for one consumer, served from the plan when shared."""
+        key = self._key(
+            client.meta.service_model.service_name,
+            region,
+            operation_name,
+            result_key,
+            kwargs,
+        )
+        with self._lock:
+            remaining = self._remaining.get(key, 0)
+            if remaining:
+                self._remaining[key] = remaining - 1
+            call_lock = self._call_locks.setdefault(key, threading.Lock())
+
+        if remaining <= 1:
+            # Unplanned or last consumer: take the kept pages, if any, and
+            # let them go; otherwise stream.
+            with call_lock:
+                pages = self._pages.pop(key, None)
+            if pages is None:
+                pages = self._fetch(key, client, operation_name, result_key, kwargs)
+            yield from pages
+            return
+
+        # More consumers follow, so the pages are kept for them. The per-call
+        # lock makes a concurrent consumer wait instead of repeating the call.
+        with call_lock:
+            pages = self._pages.get(key)
+            if pages is None:
+                pages = list(
+                    self._fetch(key, client, operation_name, result_key, kwargs)
+                )
+                self._pages[key] = pages
+        yield from pages
+
+    def _fetch(
+        self,
+        key: tuple,
+        client: Any,
+        operation_name: str,
+        result_key: str,
+        kwargs: dict[str, Any],
+    ) -> Iterator[list]:
+        pages = iter_pages(client, operation_name, result_key, **kwargs)
+        if self.cache is None:
+            return pages
+        service_name, region, _, _, params = key
+        return self.cache.pages(
+            region,
+            f"{service_name}.{operation_name}.{result_key}",
+            params,
+            pages,
+            default=json_default,
+        )
+
+    def describe(self) -> list[str]:
+        """The plan as printable lines, one per distinct call."""
+        shared = sum(1 for consumers in self._consumers.values() if len(consumers) > 1)
+        lines = [
+            (
+                f"AWS call plan: {len(self._consumers)} distinct calls, "
+                f"{shared} shared between consumers"
+            )
+        ]
+        for (
+            service_name,
+            region,
+            operation_name,
+            result_key,
+            params,
+        ), consumers in sorted(self._consumers.items()):
+            params = "" if params == "{}" else f" {params}"
+            lines.append(
+                f"  {service_name}.{operation_name}.{result_key} [{region}]{params}"
+                f" <- {', '.join(dict.fromkeys(consumers))}"
+            )
+        return lines
+
+
+# Plans built by Stage 3 for a later stage (--egress) of the same run, keyed
+# by account so a plan never serves another one.
+_CALL_PLANS: dict[tuple[str | None, str | None], CallPlan] = {}
+
+
+def _call_plan_key(provider_details: dict[str, Any]) -> tuple[str | None, str | None]:
+    # Member accounts of an organization share the caller's access key and
+    # differ by accountId and roleArn; a single account has neither.
+    return (
+        provider_details.get("accountId") or provider_details.get("accessKey"),
+        provider_details.get("roleArn"),
+    )
+
+
+def store_call_plan(provider_details: dict[str, Any], plan: CallPlan) -> None:
+    _CALL_PLANS[_call_plan_key(provider_details)] = plan
+
+
+def take_call_plan(provider_details: dict[str, Any]) -> CallPlan | None:
+    return _CALL_PLANS.pop(_call_plan_key(provider_details), None)
+
+
+def json_default(obj: Any) -> Any:
+    """json.dumps() hook for the datetimes botocore puts in responses."""
+    if isinstance(obj, (datetime, date)):
         return obj.isoformat()
-    return obj
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+class RawDataWriter:
+    """Streams raw inventory pages to a JSON Lines file, one page per line.
+
+    Shared by the inventory workers; each line is serialised outside the lock
+    and written whole, so lines from different workers never interleave.
+    `offset` is the size of the file in bytes, including unflushed lines.
+    """
+
+    def __init__(self, path: str, append: bool = False) -> None:
+        # Open for the writer's lifetime; close() (or the with block) closes it.
+        self._file = open(path, "ab" if append else "wb")  # noqa: SIM115
+        self._lock = threading.Lock()
+        self.offset = self._file.tell()
+
+    def write(self, record: dict[str, Any]) -> None:
+        line = (json.dumps(record, default=json_default) + "\n").encode("utf-8")
+        with self._lock:
+            self._file.write(line)
+            self.offset += len(line)
+
+    def flush(self) -> int:
+        """Flush to disk and return the offset everything so far ends at."""
+        with self._lock:
+            self._file.flush()
+            return self.offset
+
+    def close(self) -> None:
+        self._file.close()
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+
+class InventoryCheckpoints:
+    """Completed inventory units of a report, kept in its assessment.db.
+
+    A unit is one (service, operation, region) listing. Each is recorded as
+    soon as it finishes, with its count and the raw data offset its pages end
+    before, so a run that dies part-way can be resumed (--resume) without
+    listing those units again. Units that failed are not recorded and are
+    retried on resume.
+    """
+
+    TABLE = "resource_inventory_checkpoint"
+
+    def __init__(self, db_path: str) -> None:
+        self._db_path = db_path
+        self._lock = threading.Lock()
+        conn = connect(db_path)
+        try:
+            conn.execute(f"""
+                CREATE TABLE IF NOT EXISTS {self.TABLE} (
+                    service TEXT NOT NULL,
+                    operation TEXT NOT NULL,
+                    region TEXT NOT NULL,
+                    count INTEGER NOT NULL,
+                    raw_offset INTEGER,
+                    PRIMARY KEY (service, operation, region)
+                )
+                """)
+            conn.commit()
+        finally:
+            conn.close()
+
+    def completed(self) -> dict[tuple[str, str, str], tuple[int, int | None]]:
+        conn = connect(self._db_path)
+        try:
+            rows = conn.execute(
+                f"SELECT service, operation, region, count, raw_offset "
+                f"FROM {self.TABLE}"
+            ).fetchall()
+        finally:
+            conn.close()
+        return {
+            (service, operation, region): (count, raw_offset)
+            for service, operation, region, count, raw_offset in rows
+        }
+
+    def record(
+        self,
+        service: str,
+        operation: str,
+        region: str,
+        count: int,
+        raw_offset: int | None,
+    ) -> None:
+        # Workers record concurrently; SQLite takes one writer at a time.
+        with self._lock:
+            conn = connect(self._db_path)
+            try:
+                conn.execute(
+                    f"""
+                    INSERT INTO {self.TABLE}
+                        (service, operation, region, count, raw_offset)
+                    VALUES (?, ?, ?, ?, ?)
+                    ON CONFLICT(service, operation, region) DO UPDATE SET
+                        count = excluded.count,
+                        raw_offset = excluded.raw_offset
+                    """,
+                    (service, operation, region, count, raw_offset),
+                )
+                conn.commit()
+            finally:
+                conn.close()
+
+
+def compact_raw_data(
+    path: str, completed: dict[tuple[str, str, str], tuple[int, int | None]]
+) -> None:
+    """Keep only the raw pages of completed units before resuming.
+
+    Pages of units that were cut off would otherwise appear twice once those
+    units run again. Nothing a completed unit wrote lies past the largest
+    checkpointed offset, so the tail (including a line torn by the crash) is
+    dropped unread.
+    """
+    if not os.path.exists(path):
+        return
+    end = max((offset or 0 for _, offset in completed.values()), default=0)
+    compacted_path = path + ".resume"
+    with open(path, "rb") as source, open(compacted_path, "wb") as target:
+        position = 0
+        for line in source:
+            position += len(line)
+            if position > end:
+                break
+            try:
+                record = json.loads(line)
+                unit = (record["service"], record["operation"], record["region"])
+            except (ValueError, KeyError, TypeError):
+                continue
+            if unit in completed:
+                target.write(line)
+    os.replace(compacted_path, path)
+
+
+# resourcetype codes naming a CloudFormation resource type are listed through
+# the Cloud Control API, so a type needs no collector code of its own.
+CLOUDFORMATION_TYPE_PATTERN = re.compile(r"^AWS::[A-Za-z0-9]+::[A-Za-z0-9]+$")
+
+
+class InventoryUnit(NamedTuple):
+    """One listing of the resource inventory: a resource type in a region."""
+
+    resource_type_code: str
+    service_name: str
+    operation_name: str
+    result_key: str
+    region: str
+    type_name: str | None = None
+
+    @classmethod
+    def for_code(cls, resource_type_code: str, region: str) -> "InventoryUnit | None":
+        """The unit listing `resource_type_code`, or None for an unknown form."""
+        if CLOUDFORMATION_TYPE_PATTERN.match(resource_type_code):
+            return cls(
+                resource_type_code,
+                "cloudcontrol",
+                "list_resources",
+                "ResourceDescriptions",
+                region,
+                resource_type_code,
+            )
+        parts = resource_type_code.split(".")
+        if len(parts) != 4 or parts[0] != "AWS":
+            return None
+        return cls(resource_type_code, parts[1], parts[2], parts[3].strip(), region)
+
+    @property
+    def operation(self) -> str:
+        """The operation as checkpoints, raw data and the failure cache name it."""
+        if self.type_name:
+            return f"{self.operation_name}:{self.type_name}"
+        return self.operation_name
+
+    @property
+    def params(self) -> dict[str, Any]:
+        return {"TypeName": self.type_name} if self.type_name else {}
+
+    @property
+    def global_service(self) -> bool:
+        """Whether the resources are listed once, in the home region."""
+        if self.type_name:
+            return self.type_name in AWS_GLOBAL_CLOUD_CONTROL_TYPES
+        return self.service_name in AWS_GLOBAL_SERVICES
+
+
+def count_resources(
+    client: Any,
+    operation_name: str,
+    result_key: str,
+    record: dict[str, Any],
+    raw_writer: RawDataWriter | None,
+    plan: CallPlan | None = None,
+    **kwargs: Any,
+) -> int:
+    """Count the items of one operation page by page, streaming each page out.
+
+    Nothing is retained beyond the current page, so memory stays flat however
+    many resources the operation returns, unless the plan shares the call
+    with a later stage.
+    """
+    if plan is not None:
+        pages = plan.iter_pages(
+            client, record["region"], operation_name, result_key, **kwargs
+        )
+    else:
+        pages = iter_pages(client, operation_name, result_key, **kwargs)
+    count = 0
+    for page in pages:
+        count += len(page)
+        if raw_writer is not None:
+            raw_writer.write({**record, "resources": page})
+    return count
 
 
 def build_aws_resource_inventory(
@@ -61,18 +935,18 @@ def build_aws_resource_inventory(
     provider_details: dict[str, Any],
     report_path: str,
     raw_data_path: str,
-) -> None:
+    precounted: Collection[tuple[str, str]] = (),
+) -> dict[str, Any] | None:
+    """Count every resource type the API can list, per region.
+
+    `precounted` holds (resource type code, region) pairs another backend
+    already counted; those are not listed.
+    """
     try:
-        access_key = provider_details["accessKey"]
-        secret_key = provider_details["secretKey"]
         region = provider_details["region"]
 
-        session = boto3.Session(
-            aws_access_key_id=access_key,
-            aws_secret_access_key=secret_key,
-            aws_session_token=provider_details.get("sessionToken"),
-            region_name=region,
-        )
+        # Every client is rate limited by the account's RequestScheduler.
+        session = aws_session(provider_details)
 
         db_path = os.path.join(report_path, "data", "assessment.db")
 
@@ -83,49 +957,206 @@ def build_aws_resource_inventory(
             if item["csp"] == 2 and item["status"] == "t"
         }
 
-        # Save raw data for debugging and auditing purposes
-        raw_data = []
-
-        # Aggregate resources by type and location
-        aggregated_resources = defaultdict(int)
+        jobs = int(provider_details.get("jobs") or AWS_DEFAULT_JOBS)
+        config = client_config(jobs)
+        regions = resolve_aws_regions(session, provider_details)
 
-        # Iterate through each resource type in the JSON
-        for idx, (resource_type_code, resource_info) in enumerate(
-            resource_type_mapping.items(), start=1
-        ):
-            parts = resource_type_code.split(".")
-            if len(parts) != 4 or parts[0] != "AWS":
+        # Resolve every valid code into one work unit per region (or a single
+        # one for global services). Clients are created up front, once per
+        # service and region: boto3 sessions are not thread-safe, while the
+        # clients themselves can be shared by the workers.
+        clients: dict[tuple[str, str], Any] = {}
+        # Codes of the form AWS.service.operation.key use that boto3 call;
+        # CloudFormation type names (AWS::Service::Type) go through Cloud
+        # Control.
+        units: list[InventoryUnit] = []
+        unavailable = []
+        for resource_type_code in resource_type_mapping:
+            home_unit = InventoryUnit.for_code(resource_type_code, region)
+            if home_unit is None:
                 # logger.warning(f"Invalid resource type format: {resource_type_code}. Skipping.")
                 continue
 
-            # Extract service name, operation name, and result key
-            service_name, operation_name, result_key = parts[1], parts[2], parts[3]
-
-            # logger.info(f"Processing service {service_name} with operation {operation_name}")
+            unit_regions = [region] if home_unit.global_service else regions
+            for unit_region in unit_regions:
+                if (resource_type_code, unit_region) in precounted:
+                    continue
+                unit = home_unit._replace(region=unit_region)
+                service_name, operation_name = unit.service_name, unit.operation_name
+                # A service with no endpoint in the region would only fail
+                # after DNS and connect timeouts, so it is not called at all.
+                if not service_available(service_name, unit_region):
+                    unavailable.append(
+                        {
+                            "operation": f"{service_name}.{unit.operation}",
+                            "region": unit_region,
+                            "reason": "not available in region",
+                        }
+                    )
+                    continue
+                try:
+                    if (service_name, unit_region) not in clients:
+                        clients[(service_name, unit_region)] = session.client(
+                            service_name, region_name=unit_region, config=config
+                        )
+                    client = clients[(service_name, unit_region)]
+                except botocore.exceptions.BotoCoreError as exc:
+                    logger.debug(
+                        "Error processing %s.%s in %s: %s",
+                        service_name,
+                        unit.operation,
+                        unit_region,
+                        exc,
+                    )
+                    continue
 
-            try:
-                client = session.client(
-                    service_name, region_name=region, config=AWS_RETRY_CONFIG
-                )
                 if not hasattr(client, operation_name):
                     # logger.error(f"Operation {operation_name} does not exist for service {service_name}")
                     continue
 
-                resources = paginate_or_call(client, operation_name, result_key.strip())
+                units.append(unit)
 
-                # Aggregate the resources
-                for resource in resources:
-                    aggregated_resources[(resource_type_code, region)] += 1
+        if unavailable:
+            logger.info(
+                "Not querying %d operations in regions their service is not "
+                "offered in",
+                len(unavailable),
+            )
 
-                # Store raw data
-                raw_data.append(
-                    {
-                        "service": service_name,
-                        "operation": operation_name,
-                        "resources": resources,
-                    }
+        # Units an interrupted run of this report already finished (--resume)
+        # keep their checkpointed counts and are not listed again.
+        checkpoints = InventoryCheckpoints(db_path)
+        completed = checkpoints.completed()
+        pending = [
+            unit
+            for unit in units
+            if (unit.service_name, unit.operation, unit.region) not in completed
+        ]
+        if len(pending) < len(units):
+            logger.info(
+                "Resuming: %d of %d inventory units already done",
+                len(units) - len(pending),
+                len(units),
+            )
+
+        # Operations that failed for a lasting reason in an earlier run (access
+        # denied, service not enabled) are skipped until that result expires.
+        cache = aws_response_cache(session, provider_details)
+        skipped = []
+        if cache is not None:
+            runnable = []
+            for unit in pending:
+                operation = f"{unit.service_name}.{unit.operation}"
+                reason = cache.failure(unit.region, operation)
+                if reason:
+                    skipped.append(
+                        {
+                            "operation": operation,
+                            "region": unit.region,
+                            "reason": reason,
+                        }
+                    )
+                else:
+                    runnable.append(unit)
+            pending = runnable
+            for entry in skipped:
+                logger.info(
+                    "Skipping %s in %s: failed with %s in an earlier run",
+                    entry["operation"],
+                    entry["region"],
+                    entry["reason"],
                 )
 
+        # Every listing the run needs goes into one plan, so a call that both
+        # this stage and --egress make is only run once.
+        plan = CallPlan(region, cache)
+        for unit in pending:
+            plan.add(
+                "inventory",
+                unit.service_name,
+                unit.region,
+                unit.operation_name,
+                unit.result_key,
+                **unit.params,
+            )
+        if provider_details.get("egress"):
+            from .utils_egress_aws import plan_egress_calls
+
+            plan_egress_calls(plan, regions)
+            store_call_plan(provider_details, plan)
+        # The summary shows with --verbose; the full plan goes to run.log.
+        summary, *calls = plan.describe()
+        logger.info(summary)
+        logger.debug("\n".join(calls))
+
+        # Raw data is kept for debugging and auditing purposes unless the
+        # caller opted out (--no-raw).
+        raw_writer = None
+        if provider_details.get("rawData", True):
+            raw_file_path = os.path.join(
+                raw_data_path, "resource_inventory_raw_data.jsonl"
+            )
+            if completed:
+                compact_raw_data(raw_file_path, completed)
+            raw_writer = RawDataWriter(raw_file_path, append=bool(completed))
+
+        def count_unit(unit: InventoryUnit) -> int:
+            count = count_resources(
+                clients[(unit.service_name, unit.region)],
+                unit.operation_name,
+                unit.result_key,
+                {
+                    "service": unit.service_name,
+                    "operation": unit.operation,
+                    "region": unit.region,
+                },
+                raw_writer,
+                plan,
+                **unit.params,
+            )
+            # The unit's pages are flushed before it is marked done, so a
+            # checkpoint never points past data that is not on disk.
+            raw_offset = raw_writer.flush() if raw_writer is not None else None
+            try:
+                checkpoints.record(
+                    unit.service_name, unit.operation, unit.region, count, raw_offset
+                )
+            except sqlite3.Error as exc:
+                logger.debug(
+                    "Could not checkpoint %s.%s: %s",
+                    unit.service_name,
+                    unit.operation,
+                    exc,
+                )
+            return count
+
+        try:
+            with ThreadPoolExecutor(max_workers=jobs) as executor:
+                futures = [executor.submit(count_unit, unit) for unit in pending]
+        finally:
+            if raw_writer is not None:
+                raw_writer.close()
+        if plan.cache is not None:
+            logger.info(
+                "Response cache: %d listings served from cache, %d fetched",
+                plan.cache.hits,
+                plan.cache.misses,
+            )
+
+        # Aggregate resources by type and location
+        aggregated_resources = defaultdict(int)
+        for unit in units:
+            checkpoint = completed.get((unit.service_name, unit.operation, unit.region))
+            if checkpoint and checkpoint[0]:
+                aggregated_resources[
+                    (unit.resource_type_code, unit.region)
+                ] += checkpoint[0]
+
+        # Counts are consumed in submission order so the rows match a
+        # sequential run regardless of which worker finished first.
+        for unit, future in zip(pending, futures):
+            try:
+                resource_count = future.result()
             except Exception as exc:
                 # Expected for services the caller can't access or that aren't
                 # available in a region. Keep at DEBUG (run.log only) so it never
@@ -134,19 +1165,23 @@ def build_aws_resource_inventory(
                 # botocore stack is noise, so no exc_info here.
                 logger.debug(
                     "Error processing %s.%s in %s: %s",
-                    service_name,
-                    operation_name,
-                    region,
+                    unit.service_name,
+                    unit.operation,
+                    unit.region,
                     exc,
                 )
+                failure = lasting_failure(exc)
+                if cache is not None and failure:
+                    cache.record_failure(
+                        unit.region, f"{unit.service_name}.{unit.operation}", *failure
+                    )
                 continue
 
-        # Save raw data to a JSON file
-        raw_data = convert_datetime(raw_data)
-
-        raw_file_path = os.path.join(raw_data_path, "resource_inventory_raw_data.json")
-        with open(raw_file_path, "w", encoding="utf-8") as raw_file:
-            json.dump(raw_data, raw_file, indent=4)
+            # Aggregate the resources
+            if resource_count:
+                aggregated_resources[
+                    (unit.resource_type_code, unit.region)
+                ] += resource_count
 
         # Insert aggregated data into SQLite
         with connect(db_path=db_path) as conn:
@@ -186,8 +1221,11 @@ def build_aws_resource_inventory(
 
             conn.commit()
 
+        return {"operations_skipped": skipped, "operations_unavailable": unavailable}
+
     except Exception as e:
         logger.error(f"Error creating AWS resource inventory: {str(e)}", exc_info=True)
+        return None
 
 
 def get_missing_months_aws(processed_costs: set[str], max_months: int) -> list[date]:
@@ -206,22 +1244,43 @@ def get_missing_months_aws(processed_costs: set[str], max_months: int) -> list[d
     return missing_months
 
 
+def cost_filter(
+    regions: list[str],
+    tags: dict[str, str] | None = None,
+    account_id: str | None = None,
+) -> dict:
+    """Cost Explorer filter for the regions and, if given, the tag scope.
+
+    Tags only filter costs once they are activated as cost allocation tags.
+    With `account_id`, only that account's own costs are counted: queried
+    from a payer account, Cost Explorer otherwise returns the consolidated
+    costs of the whole organization.
+    """
+    filters = [{"Dimensions": {"Key": "REGION", "Values": regions}}]
+    if account_id:
+        filters.append(
+            {"Dimensions": {"Key": "LINKED_ACCOUNT", "Values": [account_id]}}
+        )
+    filters.extend(
+        {"Tags": {"Key": key, "Values": [value]}} for key, value in (tags or {}).items()
+    )
+    if len(filters) == 1:
+        return filters[0]
+    return {"And": filters}
+
+
 def build_aws_cost_inventory(
     cloud_service_provider: int,
     provider_details: dict[str, Any],
     report_path: str,
     raw_data_path: str,
-) -> None:
+) -> dict[str, Any] | None:
     try:
-        session = boto3.Session(
-            aws_access_key_id=provider_details["accessKey"],
-            aws_secret_access_key=provider_details["secretKey"],
-            aws_session_token=provider_details.get("sessionToken"),
-            region_name=provider_details["region"],
-        )
+        session = aws_session(provider_details)
         cost_explorer = session.client(
             "ce", region_name="us-east-1", config=AWS_RETRY_CONFIG
         )
+        regions = resolve_aws_regions(session, provider_details)
 
         db_path = os.path.join(report_path, "data", "assessment.db")
 
@@ -236,9 +1295,11 @@ def build_aws_cost_inventory(
             Granularity="MONTHLY",
             Metrics=["UnblendedCost"],
             GroupBy=[{"Type": "DIMENSION", "Key": "SERVICE"}],
-            Filter={
-                "Dimensions": {"Key": "REGION", "Values": [provider_details["region"]]}
-            },
+            Filter=cost_filter(
+                regions,
+                provider_details.get("tags"),
+                provider_details.get("accountId"),
+            ),
         )
 
         cost_inventory_raw_path = os.path.join(
@@ -304,8 +1365,11 @@ def build_aws_cost_inventory(
 
             conn.commit()
 
+        return {}
+
     except sqlite3.Error as e:
         logger.error(f"SQLite error: {str(e)}", exc_info=True)
+        return None
     except Exception as e:
         logger.error(f"Error creating AWS cost inventory: {str(e)}", exc_info=True)
         raise
@@ -0,0 +1,266 @@
+# core/utils_aws_config.py
+import json
+import logging
+import os
+from collections import defaultdict
+from typing import Any
+
+from botocore.exceptions import BotoCoreError, ClientError
+
+from .utils_aws import (
+    AWS_RETRY_CONFIG,
+    aws_session,
+    build_aws_resource_inventory,
+    resolve_aws_regions,
+)
+from .utils_db import connect, load_data
+
+logger = logging.getLogger("core.engine.aws")
+
+# AWS Config resource types counted by one aggregated query instead of the
+# listing the resourcetype code names. Only types whose Config record matches
+# what the listing counts are mapped, with one difference: Config counts EC2
+# instances, the listing reservations. Global services (IAM, S3, ...) are a
+# single listing each and stay with the API enumerator.
+AWS_CONFIG_RESOURCE_TYPES = {
+    "AWS::EC2::Instance": "AWS.ec2.describe_instances.Reservations",
+    "AWS::EC2::Volume": "AWS.ec2.describe_volumes.Volumes",
+    "AWS::EC2::SecurityGroup": "AWS.ec2.describe_security_groups.SecurityGroups",
+    "AWS::EC2::NetworkInterface": "AWS.ec2.describe_network_interfaces.NetworkInterfaces",
+    "AWS::EC2::VPC": "AWS.ec2.describe_vpcs.Vpcs",
+    "AWS::EC2::Subnet": "AWS.ec2.describe_subnets.Subnets",
+    "AWS::EC2::EIP": "AWS.ec2.describe_addresses.Addresses",
+    "AWS::RDS::DBInstance": "AWS.rds.describe_db_instances.DBInstances",
+    "AWS::RDS::DBCluster": "AWS.rds.describe_db_clusters.DBClusters",
+    "AWS::DynamoDB::Table": "AWS.dynamodb.list_tables.TableNames",
+    "AWS::Lambda::Function": "AWS.lambda.list_functions.Functions",
+    "AWS::ECR::Repository": "AWS.ecr.describe_repositories.repositories",
+    "AWS::ECS::Cluster": "AWS.ecs.list_clusters.clusterArns",
+    "AWS::EKS::Cluster": "AWS.eks.list_clusters.clusters",
+    "AWS::EFS::FileSystem": "AWS.efs.describe_file_systems.FileSystems",
+    "AWS::ElasticLoadBalancingV2::LoadBalancer": "AWS.elbv2.describe_load_balancers.LoadBalancers",
+    "AWS::ElastiCache::CacheCluster": "AWS.elasticache.describe_cache_clusters.CacheClusters",
+    "AWS::Redshift::Cluster": "AWS.redshift.describe_clusters.Clusters",
+    "AWS::SQS::Queue": "AWS.sqs.list_queues.QueueUrls",
+    "AWS::SNS::Topic": "AWS.sns.list_topics.Topics",
+    "AWS::Kinesis::Stream": "AWS.kinesis.list_streams.StreamNames",
+    "AWS::SecretsManager::Secret": "AWS.secretsmanager.list_secrets.SecretList",
+    "AWS::StepFunctions::StateMachine": "AWS.stepfunctions.list_state_machines.stateMachines",
+    "AWS::CloudWatch::Alarm": "AWS.cloudwatch.describe_alarms.MetricAlarms",
+    "AWS::Backup::BackupVault": "AWS.backup.list_backup_vaults.BackupVaultList",
+    "AWS::ApiGateway::RestApi": "AWS.apigateway.get_rest_apis.items",
+}
+
+CONFIG_COUNTS_FILE = "resource_inventory_config.json"
+
+
+def config_query(config_types: list[str], account_id: str | None = None) -> str:
+    """The advanced query counting `config_types` per type and region."""
+    names = ", ".join(f"'{name}'" for name in config_types)
+    conditions = [f"resourceType IN ({names})"]
+    if account_id:
+        conditions.insert(0, f"accountId = '{account_id}'")
+    return (
+        "SELECT resourceType, awsRegion, COUNT(*) WHERE "
+        + " AND ".join(conditions)
+        + " GROUP BY resourceType, awsRegion"
+    )
+
+
+def recorded_types(recorder: dict[str, Any]) -> set[str]:
+    """The mapped Config types a configuration recorder records."""
+    group = recorder.get("recordingGroup") or {"allSupported": True}
+    excluded = (group.get("exclusionByResourceTypes") or {}).get("resourceTypes")
+    if excluded:
+        return set(AWS_CONFIG_RESOURCE_TYPES) - set(excluded)
+    if group.get("allSupported"):
+        return set(AWS_CONFIG_RESOURCE_TYPES)
+    return set(AWS_CONFIG_RESOURCE_TYPES) & set(group.get("resourceTypes") or [])
+
+
+def _query_counts(
+    client: Any, operation_name: str, regions: list[str], **kwargs: Any
+) -> dict[tuple[str, str], int]:
+    counts: dict[tuple[str, str], int] = defaultdict(int)
+    for page in client.get_paginator(operation_name).paginate(**kwargs):
+        for result in page.get("Results", []):
+            row = json.loads(result)
+            if row.get("awsRegion") in regions:
+                counts[(row["resourceType"], row["awsRegion"])] += int(row["COUNT(*)"])
+    return counts
+
+
+def aggregator_counts(
+    provider_details: dict[str, Any], regions: list[str]
+) -> tuple[dict[tuple[str, str], int], set[tuple[str, str]]]:
+    """Counts of one account from the configAggregator in the home region.
+
+    The aggregator belongs to the caller (in organizations mode, the
+    management or delegated administrator account), so member accounts are
+    queried with the caller's credentials, not through orgRole.
+    """
+    caller_details = {
+        key: value for key, value in provider_details.items() if key != "roleArn"
+    }
+    session = aws_session(caller_details)
+    client = session.client(
+        "config", region_name=provider_details["region"], config=AWS_RETRY_CONFIG
+    )
+    name = provider_details["configAggregator"]
+    # Raises NoSuchConfigurationAggregatorException for an unknown name.
+    aggregator = client.describe_configuration_aggregators(
+        ConfigurationAggregatorNames=[name]
+    )["ConfigurationAggregators"][0]
+    sources = aggregator.get("AccountAggregationSources") or []
+    if aggregator.get("OrganizationAggregationSource"):
+        sources = [aggregator["OrganizationAggregationSource"]]
+    aggregated_regions = set()
+    for source in sources:
+        if source.get("AllAwsRegions"):
+            aggregated_regions.update(regions)
+        aggregated_regions.update(source.get("AwsRegions") or [])
+
+    account_id = provider_details.get("accountId")
+    if not account_id:
+        account_id = session.client(
+            "sts", region_name=provider_details["region"], config=AWS_RETRY_CONFIG
+        ).get_caller_identity()["Account"]
+
+    counted_regions = [region for region in regions if region in aggregated_regions]
+    counts = _query_counts(
+        client,
+        "select_aggregate_resource_config",
+        counted_regions,
+        Expression=config_query(sorted(AWS_CONFIG_RESOURCE_TYPES), account_id),
+        ConfigurationAggregatorName=name,
+    )
+    covered = {
+        (config_type, region)
+        for config_type in AWS_CONFIG_RESOURCE_TYPES
+        for region in counted_regions
+    }
+    return counts, covered
+
+
+def recorder_counts(
+    session: Any, regions: list[str]
+) -> tuple[dict[tuple[str, str], int], set[tuple[str, str]]]:
+    """Counts from the configuration recorder of each region that records.
+
+    Regions without an active recorder, and the types a recorder leaves out,
+    are not covered.
+    """
+    counts: dict[tuple[str, str], int] = {}
+    covered: set[tuple[str, str]] = set()
+    for region in regions:
+        client = session.client("config", region_name=region, config=AWS_RETRY_CONFIG)
+        recorders = client.describe_configuration_recorders()["ConfigurationRecorders"]
+        statuses = client.describe_configuration_recorder_status()[
+            "ConfigurationRecordersStatus"
+        ]
+        recording = {status["name"] for status in statuses if status.get("recording")}
+        types = set()
+        for recorder in recorders:
+            if recorder.get("name") in recording:
+                types |= recorded_types(recorder)
+        if not types:
+            logger.info("No active AWS Config recorder in %s", region)
+            continue
+        counts.update(
+            _query_counts(
+                client,
+                "select_resource_config",
+                [region],
+                Expression=config_query(sorted(types)),
+            )
+        )
+        covered.update((config_type, region) for config_type in types)
+    return counts, covered
+
+
+def build_aws_config_resource_inventory(
+    cloud_service_provider: int,
+    provider_details: dict[str, Any],
+    report_path: str,
+    raw_data_path: str,
+) -> dict[str, Any] | None:
+    """The resource inventory with AWS Config counting what it records.
+
+    One grouped query per aggregator (configAggregator) or per region replaces
+    the listings of every mapped type; the remaining types, and all of them
+    when Config cannot be queried, are listed by build_aws_resource_inventory.
+    """
+    try:
+        session = aws_session(provider_details)
+        regions = resolve_aws_regions(session, provider_details)
+        if provider_details.get("configAggregator"):
+            counts, covered = aggregator_counts(provider_details, regions)
+        else:
+            counts, covered = recorder_counts(session, regions)
+    except (BotoCoreError, ClientError, KeyError, ValueError) as e:
+        logger.warning(
+            f"AWS Config inventory unavailable, listing every resource type "
+            f"instead: {e!s}"
+        )
+        return build_aws_resource_inventory(
+            cloud_service_provider, provider_details, report_path, raw_data_path
+        )
+
+    resource_type_ids = {
+        item["code"]: item["id"]
+        for item in load_data("resourcetype")
+        if item["csp"] == 2 and item["status"] == "t"
+    }
+    precounted = {
+        (AWS_CONFIG_RESOURCE_TYPES[config_type], region)
+        for config_type, region in covered
+        if AWS_CONFIG_RESOURCE_TYPES[config_type] in resource_type_ids
+    }
+    logger.info(
+        "AWS Config counted %d resource types across %d regions",
+        len({code for code, _ in precounted}),
+        len({region for _, region in precounted}),
+    )
+
+    coverage = build_aws_resource_inventory(
+        cloud_service_provider,
+        provider_details,
+        report_path,
+        raw_data_path,
+        precounted=precounted,
+    )
+
+    rows = [
+        (
+            resource_type_ids[AWS_CONFIG_RESOURCE_TYPES[config_type]],
+            region,
+            count,
+        )
+        for (config_type, region), count in sorted(counts.items())
+        if count and (AWS_CONFIG_RESOURCE_TYPES[config_type], region) in precounted
+    ]
+    db_path = os.path.join(report_path, "data", "assessment.db")
+    with connect(db_path=db_path) as conn:
+        conn.executemany(
+            """
+            INSERT INTO resource_inventory (resource_type, location, count)
+            VALUES (?, ?, ?)
+            ON CONFLICT(resource_type, location) DO UPDATE SET count = excluded.count
+            """,
+            rows,
+        )
+
+    if provider_details.get("rawData", True):
+        with open(
+            os.path.join(raw_data_path, CONFIG_COUNTS_FILE), "w", encoding="utf-8"
+        ) as raw_file:
+            json.dump(
+                [
+                    {"resourceType": config_type, "region": region, "count": count}
+                    for (config_type, region), count in sorted(counts.items())
+                ],
+                raw_file,
+                indent=2,
+            )
+
+    return coverage
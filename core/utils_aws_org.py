@@ -0,0 +1,238 @@
+# core/utils_aws_org.py
+import json
+import logging
+import os
+import sqlite3
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+from botocore.exceptions import BotoCoreError, ClientError
+
+from .utils_aws import (
+    AWS_RETRY_CONFIG,
+    aws_session,
+    build_aws_cost_inventory,
+    build_aws_resource_inventory,
+    paginate,
+)
+from .utils_aws_config import build_aws_config_resource_inventory
+from .utils_aws_tags import build_aws_tag_resource_inventory
+from .utils_rollup import (
+    create_scope_db,
+    rollup_cost_inventory,
+    rollup_resource_inventory,
+)
+
+logger = logging.getLogger("core.engine.aws")
+
+# Member accounts assessed at the same time (--org-parallel). Each account
+# still runs its own inventory pool of providerDetails.jobs workers.
+AWS_ORG_DEFAULT_PARALLEL = 4
+
+ORG_MANIFEST_FILE = "org_accounts.json"
+
+
+def list_org_accounts(provider_details: dict[str, Any]) -> list[dict[str, str]]:
+    """Active accounts of the organization, narrowed to orgAccounts if given."""
+    organizations = aws_session(provider_details).client(
+        "organizations",
+        region_name=provider_details["region"],
+        config=AWS_RETRY_CONFIG,
+    )
+    accounts = [
+        {"id": account["Id"], "name": account.get("Name") or account["Id"]}
+        for account in paginate(organizations, "list_accounts", "Accounts")
+        # State replaces the deprecated Status field; either may be returned.
+        if (account.get("State") or account.get("Status", "ACTIVE")) == "ACTIVE"
+    ]
+    selected = provider_details.get("orgAccounts")
+    if selected:
+        accounts = [account for account in accounts if account["id"] in selected]
+    return accounts
+
+
+def account_provider_details(
+    provider_details: dict[str, Any], account_id: str, caller_account: str
+) -> dict[str, Any]:
+    """providerDetails for one member account, reached through orgRole.
+
+    The caller's own account (usually the management account) has no such
+    role, so it is assessed with the caller's credentials. accountId also
+    narrows Cost Explorer to the account's own costs, which a payer account
+    would otherwise report for the whole organization.
+    """
+    details = {
+        key: value
+        for key, value in provider_details.items()
+        if not key.startswith("org") and key != "egress"
+    }
+    details["accountId"] = account_id
+    if account_id != caller_account:
+        details["roleArn"] = (
+            f"arn:aws:iam::{account_id}:role/{provider_details['orgRole']}"
+        )
+    return details
+
+
+def _write_manifest(
+    raw_data_path: str,
+    provider_details: dict[str, Any],
+    stage: str,
+    results: list[dict[str, str]],
+) -> None:
+    # One manifest for both stages: each run of a stage records its outcome
+    # per account next to the other stage's.
+    manifest_path = os.path.join(raw_data_path, ORG_MANIFEST_FILE)
+    manifest = {"role": provider_details["orgRole"], "accounts": {}}
+    if os.path.exists(manifest_path):
+        with open(manifest_path, encoding="utf-8") as manifest_file:
+            manifest = json.load(manifest_file)
+    for result in results:
+        entry = manifest["accounts"].setdefault(result["id"], {"name": result["name"]})
+        entry[stage] = result["status"]
+    with open(manifest_path, "w", encoding="utf-8") as manifest_file:
+        json.dump(manifest, manifest_file, indent=4)
+
+
+def _assess_accounts(
+    cloud_service_provider: int,
+    provider_details: dict[str, Any],
+    report_path: str,
+    raw_data_path: str,
+    build: Callable[[int, dict[str, Any], str, str], dict[str, Any] | None],
+    rollup: Callable[[str, list[str]], None],
+    stage: str,
+) -> dict[str, Any]:
+    """Run one build_aws_* stage in every member account, then roll it up."""
+    caller_account = (
+        aws_session(provider_details)
+        .client("sts", region_name=provider_details["region"], config=AWS_RETRY_CONFIG)
+        .get_caller_identity()["Account"]
+    )
+    accounts = list_org_accounts(provider_details)
+    if not accounts:
+        raise RuntimeError("No active accounts found in the organization.")
+
+    db_path = os.path.join(report_path, "data", "assessment.db")
+
+    def assess(account: dict[str, str]) -> tuple[str, dict[str, Any]]:
+        details = account_provider_details(
+            provider_details, account["id"], caller_account
+        )
+        account_path = os.path.join(report_path, "accounts", account["id"])
+        account_raw_data_path = os.path.join(account_path, "raw_data")
+        os.makedirs(os.path.join(account_path, "data"), exist_ok=True)
+        os.makedirs(account_raw_data_path, exist_ok=True)
+
+        account_db_path = os.path.join(account_path, "data", "assessment.db")
+        if not os.path.exists(account_db_path):
+            create_scope_db(db_path, account_db_path)
+
+        # Assume the role up front: the build functions log and swallow their
+        # own errors, which would hide an account that cannot be reached.
+        aws_session(details)
+        coverage = build(
+            cloud_service_provider, details, account_path, account_raw_data_path
+        )
+        if coverage is None:
+            # The builder logged its error and gave up on the account.
+            raise RuntimeError(f"{stage} failed; see the run log")
+        return account_db_path, coverage
+
+    parallel = int(provider_details.get("orgParallel") or AWS_ORG_DEFAULT_PARALLEL)
+    with ThreadPoolExecutor(max_workers=parallel) as executor:
+        futures = [executor.submit(assess, account) for account in accounts]
+
+    account_db_paths = []
+    results = []
+    skipped = []
+    unavailable = []
+    for account, future in zip(accounts, futures):
+        try:
+            account_db_path, coverage = future.result()
+            account_db_paths.append(account_db_path)
+            skipped.extend(
+                {**entry, "account": account["id"]}
+                for entry in coverage.get("operations_skipped", [])
+            )
+            unavailable.extend(
+                {**entry, "account": account["id"]}
+                for entry in coverage.get("operations_unavailable", [])
+            )
+            results.append({**account, "status": "ok"})
+        except (
+            BotoCoreError,
+            ClientError,
+            OSError,
+            RuntimeError,
+            sqlite3.Error,
+        ) as exc:
+            logger.warning(
+                "Skipping account %s (%s) in %s: %s",
+                account["id"],
+                account["name"],
+                stage,
+                exc,
+            )
+            results.append({**account, "status": f"error: {exc}"})
+
+    _write_manifest(raw_data_path, provider_details, stage, results)
+    if not account_db_paths:
+        raise RuntimeError(
+            f"None of the {len(accounts)} accounts could be assessed; "
+            f"see raw_data/{ORG_MANIFEST_FILE}."
+        )
+    rollup(db_path, account_db_paths)
+
+    return {
+        "accounts_total": len(accounts),
+        "accounts_failed": len(accounts) - len(account_db_paths),
+        "operations_skipped": skipped,
+        "operations_unavailable": unavailable,
+    }
+
+
+def aws_resource_inventory_builder(
+    provider_details: dict[str, Any],
+) -> Callable[..., dict[str, Any] | None]:
+    """The resource inventory builder of one account for providerDetails."""
+    if provider_details.get("tags"):
+        return build_aws_tag_resource_inventory
+    if provider_details.get("inventoryBackend") == "config":
+        return build_aws_config_resource_inventory
+    return build_aws_resource_inventory
+
+
+def build_aws_org_resource_inventory(
+    cloud_service_provider: int,
+    provider_details: dict[str, Any],
+    report_path: str,
+    raw_data_path: str,
+) -> dict[str, Any]:
+    return _assess_accounts(
+        cloud_service_provider,
+        provider_details,
+        report_path,
+        raw_data_path,
+        aws_resource_inventory_builder(provider_details),
+        rollup_resource_inventory,
+        "resource_inventory",
+    )
+
+
+def build_aws_org_cost_inventory(
+    cloud_service_provider: int,
+    provider_details: dict[str, Any],
+    report_path: str,
+    raw_data_path: str,
+) -> dict[str, Any]:
+    return _assess_accounts(
+        cloud_service_provider,
+        provider_details,
+        report_path,
+        raw_data_path,
+        build_aws_cost_inventory,
+        rollup_cost_inventory,
+        "cost_inventory",
+    )
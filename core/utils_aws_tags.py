@@ -0,0 +1,217 @@
+# core/utils_aws_tags.py
+import logging
+import os
+from collections import Counter, defaultdict
+from typing import Any
+
+from .utils_aws import (
+    AWS_RETRY_CONFIG,
+    RawDataWriter,
+    aws_session,
+    iter_pages,
+    resolve_aws_regions,
+)
+from .utils_db import connect, load_data
+
+logger = logging.getLogger("core.engine.aws")
+
+# (ARN service, resource type) -> resourcetype code of the listing that
+# counts the same resources. The resource type is the part of the ARN
+# resource before the first "/" or ":", empty when there is none (S3
+# buckets, SQS queues, SNS topics). EC2 instances are counted one per ARN,
+# where the listing counts reservations.
+AWS_ARN_RESOURCE_TYPES = {
+    ("ec2", "instance"): "AWS.ec2.describe_instances.Reservations",
+    ("ec2", "volume"): "AWS.ec2.describe_volumes.Volumes",
+    ("ec2", "snapshot"): "AWS.ec2.describe_snapshots.Snapshots",
+    ("ec2", "image"): "AWS.ec2.describe_images.Images",
+    ("ec2", "security-group"): "AWS.ec2.describe_security_groups.SecurityGroups",
+    (
+        "ec2",
+        "network-interface",
+    ): "AWS.ec2.describe_network_interfaces.NetworkInterfaces",
+    ("ec2", "vpc"): "AWS.ec2.describe_vpcs.Vpcs",
+    ("ec2", "subnet"): "AWS.ec2.describe_subnets.Subnets",
+    ("ec2", "elastic-ip"): "AWS.ec2.describe_addresses.Addresses",
+    ("ec2", "natgateway"): "AWS.ec2.describe_nat_gateways.NatGateways",
+    ("s3", ""): "AWS.s3.list_buckets.Buckets",
+    ("rds", "db"): "AWS.rds.describe_db_instances.DBInstances",
+    ("rds", "cluster"): "AWS.rds.describe_db_clusters.DBClusters",
+    ("rds", "snapshot"): "AWS.rds.describe_db_snapshots.DBSnapshots",
+    (
+        "rds",
+        "cluster-snapshot",
+    ): "AWS.rds.describe_db_cluster_snapshots.DBClusterSnapshots",
+    ("dynamodb", "table"): "AWS.dynamodb.list_tables.TableNames",
+    ("lambda", "function"): "AWS.lambda.list_functions.Functions",
+    ("sqs", ""): "AWS.sqs.list_queues.QueueUrls",
+    ("sns", ""): "AWS.sns.list_topics.Topics",
+    (
+        "elasticloadbalancing",
+        "loadbalancer",
+    ): "AWS.elbv2.describe_load_balancers.LoadBalancers",
+    ("ecr", "repository"): "AWS.ecr.describe_repositories.repositories",
+    ("ecs", "cluster"): "AWS.ecs.list_clusters.clusterArns",
+    ("eks", "cluster"): "AWS.eks.list_clusters.clusters",
+    ("elasticfilesystem", "file-system"): "AWS.efs.describe_file_systems.FileSystems",
+    ("elasticache", "cluster"): "AWS.elasticache.describe_cache_clusters.CacheClusters",
+    ("redshift", "cluster"): "AWS.redshift.describe_clusters.Clusters",
+    ("kinesis", "stream"): "AWS.kinesis.list_streams.StreamNames",
+    ("secretsmanager", "secret"): "AWS.secretsmanager.list_secrets.SecretList",
+    ("states", "stateMachine"): "AWS.stepfunctions.list_state_machines.stateMachines",
+    ("cloudwatch", "alarm"): "AWS.cloudwatch.describe_alarms.MetricAlarms",
+    ("logs", "log-group"): "AWS.logs.describe_log_groups.logGroups",
+    ("kms", "key"): "AWS.kms.list_keys.Keys",
+    ("backup", "backup-vault"): "AWS.backup.list_backup_vaults.BackupVaultList",
+    ("glacier", "vaults"): "AWS.glacier.list_vaults.VaultList",
+    ("apigateway", "restapis"): "AWS.apigateway.get_rest_apis.items",
+    ("apprunner", "service"): "AWS.apprunner.list_services.ServiceSummaryList",
+    ("iam", "role"): "AWS.iam.list_roles.Roles",
+    ("iam", "user"): "AWS.iam.list_users.Users",
+    ("iam", "policy"): "AWS.iam.list_policies.Policies",
+}
+
+# Classic load balancers share the "loadbalancer" ARN resource type with the
+# v2 ones, but name the balancer right after it ("loadbalancer/<name>"); v2
+# ARNs name the balancer type first ("loadbalancer/app/<name>/<id>").
+AWS_CLASSIC_ELB_RESOURCE_TYPE = (
+    "AWS.elb.describe_load_balancers.LoadBalancerDescriptions"
+)
+
+
+def tag_filters(tags: dict[str, str]) -> list[dict[str, Any]]:
+    """TagFilters for get_resources: every tag must match."""
+    return [{"Key": key, "Values": [value]} for key, value in tags.items()]
+
+
+def parse_arn(arn: str) -> tuple[str, str, str]:
+    """(service, region, resource type) of an ARN."""
+    _, _, service, region, _, resource = arn.split(":", 5)
+    resource = resource.lstrip("/")
+    for separator in ("/", ":"):
+        if separator in resource:
+            return service, region, resource.split(separator, 1)[0]
+    return service, region, ""
+
+
+def arn_resource_type(arn: str) -> tuple[str, str, str | None]:
+    """(service:type, region, resourcetype code or None) of an ARN."""
+    try:
+        service, region, resource_type = parse_arn(arn)
+    except ValueError:
+        return arn, "", None
+    if (
+        service == "elasticloadbalancing"
+        and resource_type == "loadbalancer"
+        and arn.split(":", 5)[5].count("/") == 1
+    ):
+        return f"{service}:{resource_type}", region, AWS_CLASSIC_ELB_RESOURCE_TYPE
+    code = AWS_ARN_RESOURCE_TYPES.get((service, resource_type))
+    return f"{service}:{resource_type}", region, code
+
+
+def build_aws_tag_resource_inventory(
+    cloud_service_provider: int,
+    provider_details: dict[str, Any],
+    report_path: str,
+    raw_data_path: str,
+) -> dict[str, Any] | None:
+    """The resource inventory of the resources carrying providerDetails.tags.
+
+    One paginated get_resources stream per region replaces every service
+    listing. Resources without a region in their ARN (S3, IAM) are counted
+    under the home region, like the global services of the API inventory.
+    """
+    try:
+        region = provider_details["region"]
+        session = aws_session(provider_details)
+        regions = resolve_aws_regions(session, provider_details)
+        db_path = os.path.join(report_path, "data", "assessment.db")
+
+        resource_type_ids = {
+            item["code"]: item["id"]
+            for item in load_data("resourcetype")
+            if item["csp"] == 2 and item["status"] == "t"
+        }
+
+        raw_writer = None
+        if provider_details.get("rawData", True):
+            raw_writer = RawDataWriter(
+                os.path.join(raw_data_path, "resource_inventory_raw_data.jsonl")
+            )
+
+        # An ARN is counted once, whichever regions' streams return it.
+        seen: set[str] = set()
+        aggregated_resources: dict[tuple[int, str], int] = defaultdict(int)
+        unmapped: Counter = Counter()
+        try:
+            for unit_region in regions:
+                client = session.client(
+                    "resourcegroupstaggingapi",
+                    region_name=unit_region,
+                    config=AWS_RETRY_CONFIG,
+                )
+                for page in iter_pages(
+                    client,
+                    "get_resources",
+                    "ResourceTagMappingList",
+                    TagFilters=tag_filters(provider_details["tags"]),
+                ):
+                    if raw_writer is not None:
+                        raw_writer.write(
+                            {
+                                "service": "resourcegroupstaggingapi",
+                                "operation": "get_resources",
+                                "region": unit_region,
+                                "resources": page,
+                            }
+                        )
+                    for resource in page:
+                        arn = resource["ResourceARN"]
+                        if arn in seen:
+                            continue
+                        seen.add(arn)
+                        name, arn_region, code = arn_resource_type(arn)
+                        if code not in resource_type_ids:
+                            unmapped[name] += 1
+                            continue
+                        aggregated_resources[
+                            (resource_type_ids[code], arn_region or region)
+                        ] += 1
+        finally:
+            if raw_writer is not None:
+                raw_writer.close()
+
+        logger.info(
+            "%d tagged resources found, %d of a type the report does not cover",
+            len(seen),
+            sum(unmapped.values()),
+        )
+        if unmapped:
+            logger.debug(
+                "Tagged resources without a resource type: %s",
+                ", ".join(
+                    f"{name} ({count})" for name, count in unmapped.most_common()
+                ),
+            )
+
+        with connect(db_path=db_path) as conn:
+            conn.executemany(
+                """
+                INSERT INTO resource_inventory (resource_type, location, count)
+                VALUES (?, ?, ?)
+                ON CONFLICT(resource_type, location) DO UPDATE SET count = excluded.count
+                """,
+                [
+                    (resource_type_id, location, count)
+                    for (
+                        resource_type_id,
+                        location,
+                    ), count in aggregated_resources.items()
+                ],
+            )
+    except Exception:
+        logger.exception("Error creating AWS tag resource inventory")
+        return None
+
+    return {}
@@ -3,31 +3,194 @@ import json
 import os
 import logging
 import sqlite3
+import requests
+import threading
+import time
+from collections.abc import Iterator
 from typing import Any
 from datetime import date, datetime
 from dateutil.relativedelta import relativedelta
 from collections import defaultdict
-from azure.identity import ClientSecretCredential
+from azure.identity import ClientSecretCredential, TokenCachePersistenceOptions
 from azure.mgmt.resource import ResourceManagementClient
+from azure.mgmt.resource.resources.models import GenericResourceExpanded
 from azure.mgmt.costmanagement import CostManagementClient
 from azure.mgmt.costmanagement.models import QueryDefinition, TimeframeType
 from azure.core.exceptions import AzureError, ClientAuthenticationError
 
+from .utils_cache import ResponseCache, response_cache
 from .utils_db import connect, load_data
 
 logger = logging.getLogger("core.engine.azure")
 logging.getLogger("azure").setLevel(logging.WARNING)
 
+MANAGEMENT_SCOPE = "https://management.azure.com/.default"
+
+# Access tokens are reused until this many seconds before they expire.
+TOKEN_REFRESH_MARGIN = 300
+# Name of the persistent token cache (providerDetails.tokenCache), kept in
+# the OS-protected store MSAL uses (Keychain, DPAPI, libsecret).
+TOKEN_CACHE_NAME = "cloudexit"
+RESOURCE_GRAPH_URL = (
+    "https://management.azure.com/providers/Microsoft.ResourceGraph/resources"
+)
+RESOURCE_GRAPH_API_VERSION = "2022-10-01"
+# Rows per Resource Graph page: the most it allows; its default is 100.
+RESOURCE_GRAPH_PAGE_SIZE = 1000
+
+# Resource Graph counts by type and location server-side; only the summary
+# rows come back.
+RESOURCE_GRAPH_COUNT_QUERY = (
+    "Resources{where} | summarize count_ = count() by type, location"
+)
+# The per-resource detail written with rawData.
+RESOURCE_GRAPH_RAW_QUERY = (
+    "Resources{where} | project id, name, type, location, kind, sku, tags"
+)
+
+
+class CachedTokenCredential:
+    """One credential for a whole run, reusing its access tokens.
+
+    Every SDK client and REST call asks its credential for a token; through
+    this wrapper they share one per scope until shortly before it expires,
+    instead of each client (or each `az` subprocess of the CLI credential)
+    fetching its own.
+    """
+
+    def __init__(self, credential: Any) -> None:
+        self.credential = credential
+        self._tokens: dict[tuple, Any] = {}
+        self._lock = threading.Lock()
+
+    def get_token(
+        self,
+        *scopes: str,
+        claims: str | None = None,
+        tenant_id: str | None = None,
+        **kwargs: Any,
+    ) -> Any:
+        if claims:
+            # A claims challenge asks for a new token; never answer it from
+            # the cache.
+            return self.credential.get_token(
+                *scopes, claims=claims, tenant_id=tenant_id, **kwargs
+            )
+        key = (scopes, tenant_id, tuple(sorted(kwargs.items())))
+        with self._lock:
+            token = self._tokens.get(key)
+            if token is None or token.expires_on - TOKEN_REFRESH_MARGIN <= time.time():
+                token = self.credential.get_token(
+                    *scopes, tenant_id=tenant_id, **kwargs
+                )
+                self._tokens[key] = token
+        return token
+
+    def close(self) -> None:
+        close = getattr(self.credential, "close", None)
+        if close is not None:
+            close()
+
+
+def token_cache_options(enabled: bool) -> dict[str, Any]:
+    """Keyword arguments enabling the persistent token cache of a credential."""
+    if not enabled:
+        return {}
+    return {
+        "cache_persistence_options": TokenCachePersistenceOptions(name=TOKEN_CACHE_NAME)
+    }
+
+
+def azure_credential(provider_details: dict[str, Any]) -> CachedTokenCredential:
+    """The run's credential, created on first use and kept in providerDetails."""
+    credential = provider_details.get("credential")
+    if isinstance(credential, CachedTokenCredential):
+        return credential
+    if credential is None:
+        credential = ClientSecretCredential(
+            tenant_id=provider_details["tenantId"],
+            client_id=provider_details["clientId"],
+            client_secret=provider_details["clientSecret"],
+            **token_cache_options(provider_details.get("tokenCache", False)),
+        )
+    credential = CachedTokenCredential(credential)
+    provider_details["credential"] = credential
+    return credential
+
+
+# Resource listings Stage 3 made for a later stage (--egress) of the same
+# run, keyed by subscription and resource group so a listing never serves
+# another scope.
+_RESOURCE_SNAPSHOTS: dict[tuple[str, str | None], list] = {}
+
+
+def _snapshot_key(provider_details: dict[str, Any]) -> tuple[str, str | None]:
+    return (
+        provider_details.get("subscriptionId"),
+        provider_details.get("resourceGroupName"),
+    )
+
+
+def store_resource_snapshot(provider_details: dict[str, Any], resources: list) -> None:
+    _RESOURCE_SNAPSHOTS[_snapshot_key(provider_details)] = resources
+
+
+def take_resource_snapshot(provider_details: dict[str, Any]) -> list | None:
+    return _RESOURCE_SNAPSHOTS.pop(_snapshot_key(provider_details), None)
+
+
+def resource_scope(subscription_id: str, resource_group_name: str | None = None) -> str:
+    """The ARM scope of a resource group, or of the whole subscription."""
+    if resource_group_name is None:
+        return f"/subscriptions/{subscription_id}"
+    return f"/subscriptions/{subscription_id}/resourceGroups/{resource_group_name}"
+
+
+def _list_resources(resource_client: Any, resource_group_name: str | None) -> list:
+    if resource_group_name is None:
+        return list(resource_client.resources.list())
+    return list(resource_client.resources.list_by_resource_group(resource_group_name))
+
+
+def list_resource_group(
+    resource_client: Any,
+    resource_group_name: str | None,
+    cache: ResponseCache | None = None,
+) -> list:
+    """The resources of a resource group, from the response cache if fresh.
+
+    Without a resource group, the resources of the whole subscription.
+    """
+    if cache is None:
+        return _list_resources(resource_client, resource_group_name)
+    if resource_group_name is None:
+        operation, params = "resources.list", {}
+    else:
+        operation = "resources.list_by_resource_group"
+        params = {"resourceGroupName": resource_group_name}
+    cached = cache.get("", operation, params)
+    if cached is not None:
+        return [GenericResourceExpanded.deserialize(item) for item in cached]
+    resources = _list_resources(resource_client, resource_group_name)
+    cache.put(
+        "",
+        operation,
+        params,
+        json.dumps([resource.serialize(True) for resource in resources]),
+    )
+    return resources
+
 
 def is_resource_inventory_empty(
-    credential: Any, subscription_id: str, resource_group_name: str
+    credential: Any,
+    subscription_id: str,
+    resource_group_name: str | None,
+    cache: ResponseCache | None = None,
 ) -> bool:
     try:
         resource_client = ResourceManagementClient(credential, subscription_id)
         # logger.info("Checking Azure resource inventory...")
-        resources = list(
-            resource_client.resources.list_by_resource_group(resource_group_name)
-        )
+        resources = list_resource_group(resource_client, resource_group_name, cache)
         if not resources:
             # logger.info("No resources found in the resource group.")
             return True
@@ -50,32 +213,27 @@ def build_azure_resource_inventory(
     raw_data_path: str,
 ) -> None:
     try:
-        # Use DefaultAzureCredential if provided, otherwise fall back to ClientSecretCredential
-        credential = provider_details.get("credential") or ClientSecretCredential(
-            tenant_id=provider_details["tenantId"],
-            client_id=provider_details["clientId"],
-            client_secret=provider_details["clientSecret"],
-        )
+        credential = azure_credential(provider_details)
         subscription_id = provider_details["subscriptionId"]
-        resource_group_name = provider_details["resourceGroupName"]
+        resource_group_name = provider_details.get("resourceGroupName")
 
         db_path = os.path.join(report_path, "data", "assessment.db")
+        cache = response_cache(provider_details, subscription_id)
 
-        # Check if resource inventory is empty
-        if is_resource_inventory_empty(
-            credential, subscription_id, resource_group_name
-        ):
+        resource_client = ResourceManagementClient(credential, subscription_id)
+
+        # Fetch resources once; the same listing tells an empty scope apart.
+        resources = list_resource_group(resource_client, resource_group_name, cache)
+        if not resources:
             logger.warning(
-                "The selected resource group does not contain any resources."
+                "The selected %s does not contain any resources.",
+                "subscription" if resource_group_name is None else "resource group",
             )
             return
 
-        resource_client = ResourceManagementClient(credential, subscription_id)
-
-        # Fetch resources and serialize to raw JSON
-        resources = list(
-            resource_client.resources.list_by_resource_group(resource_group_name)
-        )
+        # Serialize to raw JSON
+        if provider_details.get("egress"):
+            store_resource_snapshot(provider_details, resources)
         raw_data = [resource.serialize(True) for resource in resources]
 
         # Save raw data to a JSON file
@@ -138,6 +296,134 @@ def build_azure_resource_inventory(
         raise
 
 
+def resource_graph_filter(resource_group_name: str | None) -> str:
+    """The {where} clause narrowing a Resource Graph query to one resource group."""
+    if resource_group_name is None:
+        return ""
+    resource_group = resource_group_name.replace("'", "''")
+    return f" | where resourceGroup =~ '{resource_group}'"
+
+
+def query_resource_graph(
+    credential: Any,
+    subscription_id: str,
+    query: str,
+    timeout: int = 60,
+) -> Iterator[list[dict[str, Any]]]:
+    """Yield the rows of a Resource Graph query page by page ($skipToken)."""
+    token = credential.get_token(MANAGEMENT_SCOPE)
+    options: dict[str, Any] = {
+        "resultFormat": "objectArray",
+        "$top": RESOURCE_GRAPH_PAGE_SIZE,
+    }
+    while True:
+        response = requests.post(
+            RESOURCE_GRAPH_URL,
+            headers={"Authorization": f"Bearer {token.token}"},
+            params={"api-version": RESOURCE_GRAPH_API_VERSION},
+            json={
+                "subscriptions": [subscription_id],
+                "query": query,
+                "options": options,
+            },
+            timeout=timeout,
+        )
+        response.raise_for_status()
+        payload = response.json()
+        yield payload.get("data", [])
+        skip_token = payload.get("$skipToken")
+        if not skip_token:
+            return
+        options = {**options, "$skipToken": skip_token}
+
+
+def build_azure_graph_resource_inventory(
+    cloud_service_provider: int,
+    provider_details: dict[str, Any],
+    report_path: str,
+    raw_data_path: str,
+) -> None:
+    """The resource inventory from one summarized Resource Graph query.
+
+    Nothing is enumerated: Resource Graph returns one row per type and
+    location. Per-resource detail is only fetched (and streamed to
+    resource_inventory_raw_data.jsonl) with providerDetails.rawData. When
+    Resource Graph cannot be queried, the resources are listed instead.
+    """
+    credential = azure_credential(provider_details)
+    subscription_id = provider_details["subscriptionId"]
+    resource_group_name = provider_details.get("resourceGroupName")
+    where = resource_graph_filter(resource_group_name)
+    db_path = os.path.join(report_path, "data", "assessment.db")
+
+    try:
+        aggregated_resources: dict[tuple[str, str], int] = defaultdict(int)
+        for rows in query_resource_graph(
+            credential,
+            subscription_id,
+            RESOURCE_GRAPH_COUNT_QUERY.format(where=where),
+        ):
+            for row in rows:
+                resource_type_code = (row.get("type") or "").strip().lower()
+                resource_location = (row.get("location") or "").strip().lower()
+                aggregated_resources[(resource_type_code, resource_location)] += int(
+                    row.get("count_", 0)
+                )
+    except (requests.RequestException, AzureError, ValueError) as e:
+        logger.warning(
+            f"Azure Resource Graph unavailable, listing the resource group "
+            f"instead: {e!s}"
+        )
+        return build_azure_resource_inventory(
+            cloud_service_provider, provider_details, report_path, raw_data_path
+        )
+
+    if not aggregated_resources:
+        logger.warning(
+            "The selected %s does not contain any resources.",
+            "subscription" if resource_group_name is None else "resource group",
+        )
+        return
+
+    if provider_details.get("rawData"):
+        raw_file_path = os.path.join(raw_data_path, "resource_inventory_raw_data.jsonl")
+        try:
+            with open(raw_file_path, "w", encoding="utf-8") as raw_file:
+                for rows in query_resource_graph(
+                    credential,
+                    subscription_id,
+                    RESOURCE_GRAPH_RAW_QUERY.format(where=where),
+                ):
+                    for row in rows:
+                        raw_file.write(json.dumps(row) + "\n")
+        except (requests.RequestException, AzureError) as e:
+            # The counts do not depend on it, so the inventory still stands.
+            logger.warning(f"Could not write the raw resource detail: {e!s}")
+
+    resource_type_mapping = {
+        item["code"].strip().lower(): item["id"]
+        for item in load_data("resourcetype", db_path=db_path)
+        if item["csp"] == 1 and item["status"] == "t"
+    }
+    with connect(db_path=db_path) as conn:
+        conn.executemany(
+            """
+            INSERT INTO resource_inventory (resource_type, location, count)
+            VALUES (?, ?, ?)
+            ON CONFLICT(resource_type, location) DO UPDATE SET count = excluded.count
+            """,
+            [
+                (resource_type_mapping[resource_type_code], location, count)
+                for (
+                    resource_type_code,
+                    location,
+                ), count in aggregated_resources.items()
+                if resource_type_code in resource_type_mapping
+            ],
+        )
+        conn.commit()
+
+
 def get_missing_months_azure(processed_costs: set[str], months_back: int) -> set[date]:
     today = date.today()
     start_date = today.replace(day=1) - relativedelta(months=months_back - 1)
@@ -168,12 +454,7 @@ def build_azure_cost_inventory(
     raw_data_path: str,
 ) -> None:
     try:
-        # Use DefaultAzureCredential if provided, otherwise fall back to ClientSecretCredential
-        credential = provider_details.get("credential") or ClientSecretCredential(
-            tenant_id=provider_details["tenantId"],
-            client_id=provider_details["clientId"],
-            client_secret=provider_details["clientSecret"],
-        )
+        credential = azure_credential(provider_details)
         cost_management_client = CostManagementClient(
             credential, base_url="https://management.azure.com"
         )
@@ -198,7 +479,10 @@ def build_azure_cost_inventory(
         )
 
         cost_data = cost_management_client.query.usage(
-            f'/subscriptions/{provider_details["subscriptionId"]}/resourceGroups/{provider_details["resourceGroupName"]}',
+            resource_scope(
+                provider_details["subscriptionId"],
+                provider_details.get("resourceGroupName"),
+            ),
             query,
         )
 
@@ -0,0 +1,277 @@
+# core/utils_azure_scope.py
+import json
+import logging
+import os
+import sqlite3
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+import requests
+from azure.core.exceptions import AzureError
+
+from .utils_azure import (
+    MANAGEMENT_SCOPE,
+    azure_credential,
+    build_azure_cost_inventory,
+    build_azure_graph_resource_inventory,
+    build_azure_resource_inventory,
+    resource_scope,
+)
+from .utils_rollup import (
+    create_scope_db,
+    rollup_cost_inventory,
+    rollup_resource_inventory,
+)
+
+logger = logging.getLogger("core.engine.azure")
+
+# Scopes assessed at the same time (--scope-parallel).
+AZURE_SCOPE_DEFAULT_PARALLEL = 4
+
+# providerDetails keys that widen an Azure run beyond resourceGroupName.
+AZURE_SCOPE_FIELDS = ("resourceGroups", "subscriptions", "managementGroup")
+
+SCOPE_MANIFEST_FILE = "azure_scopes.json"
+
+MANAGEMENT_GROUP_URL = (
+    "https://management.azure.com/providers/Microsoft.Management/"
+    "managementGroups/{management_group}/descendants"
+)
+MANAGEMENT_GROUP_API_VERSION = "2020-05-01"
+MANAGEMENT_GROUP_SUBSCRIPTION_TYPE = (
+    "Microsoft.Management/managementGroups/subscriptions"
+)
+
+
+def is_multi_scope(provider_details: dict[str, Any]) -> bool:
+    return any(provider_details.get(field) for field in AZURE_SCOPE_FIELDS)
+
+
+def permission_scope(provider_details: dict[str, Any]) -> str:
+    """The ARM scope whose role assignments Stage 2 checks."""
+    if provider_details.get("managementGroup"):
+        return (
+            "/providers/Microsoft.Management/managementGroups/"
+            f"{provider_details['managementGroup']}"
+        )
+    if is_multi_scope(provider_details):
+        return resource_scope(provider_details["subscriptionId"])
+    return resource_scope(
+        provider_details["subscriptionId"], provider_details["resourceGroupName"]
+    )
+
+
+def list_management_group_subscriptions(
+    credential: Any, management_group: str, timeout: int = 60
+) -> list[str]:
+    """IDs of every subscription under a management group, nested ones included."""
+    token = credential.get_token(MANAGEMENT_SCOPE)
+    url = MANAGEMENT_GROUP_URL.format(management_group=management_group)
+    params: dict[str, str] | None = {"api-version": MANAGEMENT_GROUP_API_VERSION}
+    subscriptions = []
+    while url:
+        response = requests.get(
+            url,
+            headers={"Authorization": f"Bearer {token.token}"},
+            params=params,
+            timeout=timeout,
+        )
+        response.raise_for_status()
+        payload = response.json()
+        subscriptions.extend(
+            entry["name"]
+            for entry in payload.get("value", [])
+            if entry.get("type") == MANAGEMENT_GROUP_SUBSCRIPTION_TYPE
+        )
+        # nextLink already carries the api-version.
+        url, params = payload.get("nextLink"), None
+    return subscriptions
+
+
+def list_scopes(
+    provider_details: dict[str, Any], credential: Any
+) -> list[dict[str, str | None]]:
+    """The subscriptions and resource groups one run assesses.
+
+    Whole subscriptions come from subscriptions and managementGroup; the
+    resourceGroups of subscriptionId are dropped when that subscription is
+    assessed whole, so no resource is counted twice.
+    """
+    subscriptions = list(provider_details.get("subscriptions") or [])
+    if provider_details.get("managementGroup"):
+        subscriptions.extend(
+            list_management_group_subscriptions(
+                credential, provider_details["managementGroup"]
+            )
+        )
+    subscriptions = list(dict.fromkeys(subscriptions))
+
+    scopes: list[dict[str, str | None]] = []
+    subscription_id = provider_details["subscriptionId"]
+    if subscription_id not in subscriptions:
+        scopes.extend(
+            {"subscriptionId": subscription_id, "resourceGroupName": name}
+            for name in dict.fromkeys(provider_details.get("resourceGroups") or [])
+        )
+    scopes.extend(
+        {"subscriptionId": subscription, "resourceGroupName": None}
+        for subscription in subscriptions
+    )
+    return scopes
+
+
+def scope_provider_details(
+    provider_details: dict[str, Any], scope: dict[str, str | None], credential: Any
+) -> dict[str, Any]:
+    """providerDetails for one scope, sharing the run's credential."""
+    details = {
+        key: value
+        for key, value in provider_details.items()
+        if key not in AZURE_SCOPE_FIELDS
+        and key not in ("scopeParallel", "resourceGroupName", "egress")
+    }
+    details["credential"] = credential
+    details["subscriptionId"] = scope["subscriptionId"]
+    if scope["resourceGroupName"] is not None:
+        details["resourceGroupName"] = scope["resourceGroupName"]
+    return details
+
+
+def _scope_dir(scope: dict[str, str | None]) -> str:
+    if scope["resourceGroupName"] is None:
+        return scope["subscriptionId"]
+    return f"{scope['subscriptionId']}_{scope['resourceGroupName']}"
+
+
+def _write_manifest(
+    raw_data_path: str, stage: str, results: list[dict[str, Any]]
+) -> None:
+    # One manifest for both stages: each scope's rows stay in
+    # scopes/<dir>/data/assessment.db, next to its outcome per stage.
+    manifest_path = os.path.join(raw_data_path, SCOPE_MANIFEST_FILE)
+    manifest: dict[str, Any] = {"scopes": {}}
+    if os.path.exists(manifest_path):
+        with open(manifest_path, encoding="utf-8") as manifest_file:
+            manifest = json.load(manifest_file)
+    for result in results:
+        entry = manifest["scopes"].setdefault(
+            result["scope"], {"path": os.path.join("scopes", result["dir"])}
+        )
+        entry[stage] = result["status"]
+    with open(manifest_path, "w", encoding="utf-8") as manifest_file:
+        json.dump(manifest, manifest_file, indent=4)
+
+
+def _assess_scopes(
+    cloud_service_provider: int,
+    provider_details: dict[str, Any],
+    report_path: str,
+    raw_data_path: str,
+    build: Callable[[int, dict[str, Any], str, str], Any],
+    rollup: Callable[[str, list[str]], None],
+    stage: str,
+) -> dict[str, Any]:
+    """Run one build_azure_* stage in every scope, then roll it up."""
+    credential = azure_credential(provider_details)
+    scopes = list_scopes(provider_details, credential)
+    if not scopes:
+        raise RuntimeError("No subscriptions or resource groups to assess.")
+
+    db_path = os.path.join(report_path, "data", "assessment.db")
+
+    def assess(scope: dict[str, str | None]) -> str:
+        details = scope_provider_details(provider_details, scope, credential)
+        scope_path = os.path.join(report_path, "scopes", _scope_dir(scope))
+        scope_raw_data_path = os.path.join(scope_path, "raw_data")
+        os.makedirs(os.path.join(scope_path, "data"), exist_ok=True)
+        os.makedirs(scope_raw_data_path, exist_ok=True)
+
+        scope_db_path = os.path.join(scope_path, "data", "assessment.db")
+        if not os.path.exists(scope_db_path):
+            # The Azure builders map resource types from the assessment.db
+            # they write to.
+            create_scope_db(db_path, scope_db_path, ("resourcetype",))
+
+        build(cloud_service_provider, details, scope_path, scope_raw_data_path)
+        return scope_db_path
+
+    parallel = int(
+        provider_details.get("scopeParallel") or AZURE_SCOPE_DEFAULT_PARALLEL
+    )
+    with ThreadPoolExecutor(max_workers=parallel) as executor:
+        futures = [executor.submit(assess, scope) for scope in scopes]
+
+    scope_db_paths = []
+    results = []
+    for scope, future in zip(scopes, futures):
+        name = resource_scope(scope["subscriptionId"], scope["resourceGroupName"])
+        try:
+            scope_db_paths.append(future.result())
+            status = "ok"
+        except (
+            AzureError,
+            requests.RequestException,
+            OSError,
+            RuntimeError,
+            sqlite3.Error,
+        ) as exc:
+            logger.warning("Skipping scope %s in %s: %s", name, stage, exc)
+            status = f"error: {exc}"
+        results.append({"scope": name, "dir": _scope_dir(scope), "status": status})
+
+    _write_manifest(raw_data_path, stage, results)
+    if not scope_db_paths:
+        raise RuntimeError(
+            f"None of the {len(scopes)} scopes could be assessed; "
+            f"see raw_data/{SCOPE_MANIFEST_FILE}."
+        )
+    rollup(db_path, scope_db_paths)
+
+    return {
+        "scopes_total": len(scopes),
+        "scopes_failed": len(scopes) - len(scope_db_paths),
+    }
+
+
+def azure_resource_inventory_builder(
+    provider_details: dict[str, Any],
+) -> Callable[..., None]:
+    """The resource inventory builder of one scope for providerDetails."""
+    if provider_details.get("inventoryBackend") == "graph":
+        return build_azure_graph_resource_inventory
+    return build_azure_resource_inventory
+
+
+def build_azure_scope_resource_inventory(
+    cloud_service_provider: int,
+    provider_details: dict[str, Any],
+    report_path: str,
+    raw_data_path: str,
+) -> dict[str, Any]:
+    return _assess_scopes(
+        cloud_service_provider,
+        provider_details,
+        report_path,
+        raw_data_path,
+        azure_resource_inventory_builder(provider_details),
+        rollup_resource_inventory,
+        "resource_inventory",
+    )
+
+
+def build_azure_scope_cost_inventory(
+    cloud_service_provider: int,
+    provider_details: dict[str, Any],
+    report_path: str,
+    raw_data_path: str,
+) -> dict[str, Any]:
+    return _assess_scopes(
+        cloud_service_provider,
+        provider_details,
+        report_path,
+        raw_data_path,
+        build_azure_cost_inventory,
+        rollup_cost_inventory,
+        "cost_inventory",
+    )
@@ -0,0 +1,332 @@
+# core/utils_cache.py
+import atexit
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections.abc import Callable, Iterator
+from typing import Any, NamedTuple
+
+logger = logging.getLogger("core.engine.cache")
+
+# Defaults for the CLI (--cache-dir, --cache-ttl). The engine only caches when
+# providerDetails.cacheDir is set.
+RESPONSE_CACHE_DIR = "cache"
+RESPONSE_CACHE_TTL_HOURS = 6
+RESPONSE_CACHE_FILE = "responses.db"
+
+# How long an operation that failed for a lasting reason (access denied,
+# service not enabled) is skipped before it is tried again.
+FAILURE_CACHE_TTL_HOURS = 24
+
+# Least recently used entries are evicted beyond this size. A single listing
+# larger than a sixteenth of it is not cached at all, so a huge listing keeps
+# streaming instead of being held in memory.
+RESPONSE_CACHE_MAX_BYTES = 512 * 1024 * 1024
+
+
+class SnapshotBlocks(NamedTuple):
+    """The unique bytes of a snapshot, counted against `parent` in its lineage.
+
+    `full_listing` is set when the snapshot could not be compared with its
+    parent and every written block was counted instead.
+    """
+
+    parent: str | None
+    bytes: int
+    full_listing: bool = False
+
+
+class ResponseCache:
+    """List responses on disk, reused across runs until they expire.
+
+    Entries are keyed by scope (AWS account or Azure subscription), region,
+    operation and parameters, so a cache directory can be shared by several
+    accounts. Operations that are known to fail in a scope and region are
+    kept too, with the reason, so later runs can skip them. With `refresh`
+    nothing is read, but fresh responses are still written back.
+
+    Responses are stored as the APIs return them, secrets included (Lambda
+    environment variables, for one), so the directory and the database are
+    only readable by their owner.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        scope: str,
+        ttl_hours: float = RESPONSE_CACHE_TTL_HOURS,
+        max_bytes: int = RESPONSE_CACHE_MAX_BYTES,
+        refresh: bool = False,
+    ) -> None:
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+        # makedirs leaves an existing directory's mode (and the umask's) alone.
+        os.chmod(directory, 0o700)
+        self.scope = scope
+        self.ttl = ttl_hours * 3600
+        self.max_bytes = max_bytes
+        self.refresh = refresh
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # One connection shared by the worker threads, serialised by _lock.
+        path = os.path.join(directory, RESPONSE_CACHE_FILE)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        # SQLite gives its journal the database's permissions.
+        os.chmod(path, 0o600)
+        self.closed = False
+        with self._lock:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS response (
+                    key TEXT PRIMARY KEY,
+                    created REAL NOT NULL,
+                    accessed REAL NOT NULL,
+                    size INTEGER NOT NULL,
+                    body TEXT NOT NULL
+                )
+                """)
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS failure (
+                    key TEXT PRIMARY KEY,
+                    reason TEXT NOT NULL,
+                    expires REAL NOT NULL
+                )
+                """)
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS bucket_region (
+                    scope TEXT NOT NULL,
+                    bucket TEXT NOT NULL,
+                    region TEXT NOT NULL,
+                    PRIMARY KEY (scope, bucket)
+                )
+                """)
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS snapshot_blocks (
+                    scope TEXT NOT NULL,
+                    snapshot TEXT NOT NULL,
+                    parent TEXT NOT NULL,
+                    bytes INTEGER NOT NULL,
+                    full_listing INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (scope, snapshot)
+                )
+                """)
+            self._conn.commit()
+
+    def key(self, region: str, operation: str, params: Any) -> str:
+        identity = json.dumps(
+            [self.scope, region, operation, params], sort_keys=True, default=str
+        )
+        return hashlib.sha256(identity.encode("utf-8")).hexdigest()
+
+    def get(self, region: str, operation: str, params: Any) -> Any | None:
+        """The cached response, or None if absent, expired or refreshing."""
+        if self.refresh:
+            with self._lock:
+                self.misses += 1
+            return None
+        key = self.key(region, operation, params)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT body FROM response WHERE key = ? AND created > ?",
+                (key, now - self.ttl),
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._conn.execute(
+                "UPDATE response SET accessed = ? WHERE key = ?", (now, key)
+            )
+            self._conn.commit()
+        logger.debug("Served %s [%s] from the response cache", operation, region)
+        return json.loads(row[0])
+
+    def put(self, region: str, operation: str, params: Any, body: str) -> None:
+        """Store a response already serialised to JSON text."""
+        if len(body) > self.max_bytes // 16:
+            return
+        key = self.key(region, operation, params)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO response VALUES (?, ?, ?, ?, ?)",
+                (key, now, now, len(body), body),
+            )
+            self._evict(now)
+            self._conn.commit()
+
+    def failure(self, region: str, operation: str) -> str | None:
+        """Why `operation` failed in `region` recently, or None."""
+        if self.refresh:
+            return None
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT reason FROM failure WHERE key = ? AND expires > ?",
+                (self.key(region, operation, None), time.time()),
+            ).fetchone()
+        return row[0] if row else None
+
+    def record_failure(
+        self,
+        region: str,
+        operation: str,
+        reason: str,
+        ttl_hours: float = FAILURE_CACHE_TTL_HOURS,
+    ) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute("DELETE FROM failure WHERE expires <= ?", (now,))
+            self._conn.execute(
+                "INSERT OR REPLACE INTO failure VALUES (?, ?, ?)",
+                (self.key(region, operation, None), reason, now + ttl_hours * 3600),
+            )
+            self._conn.commit()
+
+    def bucket_regions(self, buckets: list[str]) -> dict[str, str]:
+        """The known regions of `buckets` in this scope.
+
+        A bucket keeps its region for life, so these never expire; only
+        `refresh` looks them up again.
+        """
+        if self.refresh or not buckets:
+            return {}
+        wanted = set(buckets)
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT bucket, region FROM bucket_region WHERE scope = ?",
+                (self.scope,),
+            ).fetchall()
+        return {bucket: region for bucket, region in rows if bucket in wanted}
+
+    def store_bucket_regions(self, regions: dict[str, str]) -> None:
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO bucket_region VALUES (?, ?, ?)",
+                [(self.scope, bucket, region) for bucket, region in regions.items()],
+            )
+            self._conn.commit()
+
+    def snapshot_blocks(self, snapshots: list[str]) -> dict[str, SnapshotBlocks]:
+        """The counts of `snapshots` already made in this scope.
+
+        A snapshot's blocks never change, so these never expire; only
+        `refresh` counts them again.
+        """
+        if self.refresh or not snapshots:
+            return {}
+        wanted = set(snapshots)
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT snapshot, parent, bytes, full_listing FROM snapshot_blocks "
+                "WHERE scope = ?",
+                (self.scope,),
+            ).fetchall()
+        return {
+            snapshot: SnapshotBlocks(parent or None, size, bool(full_listing))
+            for snapshot, parent, size, full_listing in rows
+            if snapshot in wanted
+        }
+
+    def store_snapshot_blocks(self, counts: dict[str, SnapshotBlocks]) -> None:
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO snapshot_blocks VALUES (?, ?, ?, ?, ?)",
+                [
+                    (self.scope, snapshot, parent or "", size, int(full_listing))
+                    for snapshot, (parent, size, full_listing) in counts.items()
+                ],
+            )
+            self._conn.commit()
+
+    def pages(
+        self,
+        region: str,
+        operation: str,
+        params: Any,
+        fetch: Iterator[list],
+        default: Callable[[Any], Any] | None = None,
+    ) -> Iterator[list]:
+        """Yield cached pages, or the pages of `fetch`, storing them once done.
+
+        `fetch` is only iterated on a miss. Pages are serialised as they pass
+        (with `default` for values json cannot encode) and the entry is only
+        written once the listing is complete.
+        """
+        cached = self.get(region, operation, params)
+        if cached is not None:
+            yield from cached
+            return
+        chunks: list[str] | None = []
+        size = 0
+        for page in fetch:
+            if chunks is not None:
+                chunk = json.dumps(page, default=default)
+                size += len(chunk)
+                if size > self.max_bytes // 16:
+                    # Too large to keep: stop buffering and just stream.
+                    chunks = None
+                else:
+                    chunks.append(chunk)
+            yield page
+        if chunks is not None:
+            self.put(region, operation, params, "[" + ",".join(chunks) + "]")
+
+    def _evict(self, now: float) -> None:
+        self._conn.execute("DELETE FROM response WHERE created <= ?", (now - self.ttl,))
+        total = self._conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM response"
+        ).fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in self._conn.execute(
+            "SELECT key, size FROM response ORDER BY accessed"
+        ).fetchall():
+            self._conn.execute("DELETE FROM response WHERE key = ?", (key,))
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def close(self) -> None:
+        with self._lock:
+            self.closed = True
+            self._conn.close()
+
+
+# One ResponseCache per directory, scope and settings for the process, so
+# every stage and region of a run shares its connection. Closed at exit.
+_CACHES: dict[tuple, ResponseCache] = {}
+_CACHES_LOCK = threading.Lock()
+
+
+def response_cache(
+    provider_details: dict[str, Any], scope: str
+) -> ResponseCache | None:
+    """The ResponseCache providerDetails ask for, or None when caching is off."""
+    directory = provider_details.get("cacheDir")
+    if not directory:
+        return None
+    ttl_hours = provider_details.get("cacheTtl", RESPONSE_CACHE_TTL_HOURS)
+    refresh = bool(provider_details.get("refresh"))
+    key = (os.path.abspath(directory), scope, ttl_hours, refresh)
+    with _CACHES_LOCK:
+        cache = _CACHES.get(key)
+        if cache is None or cache.closed:
+            cache = _CACHES[key] = ResponseCache(
+                directory, scope, ttl_hours=ttl_hours, refresh=refresh
+            )
+        return cache
+
+
+def close_response_caches() -> None:
+    with _CACHES_LOCK:
+        caches = list(_CACHES.values())
+        _CACHES.clear()
+    for cache in caches:
+        cache.close()
+
+
+atexit.register(close_response_caches)
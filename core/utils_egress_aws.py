@@ -1,12 +1,31 @@
 # core/utils_egress_aws.py
 import boto3
 import logging
-from typing import Any
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from collections.abc import Callable, Iterable
+from typing import Any, Self
 from datetime import datetime, timedelta, timezone
 from botocore.exceptions import BotoCoreError, ClientError
 
-from .utils_aws import AWS_RETRY_CONFIG, paginate
+from .utils_aws import (
+    AWS_DEFAULT_JOBS,
+    AWS_RETRY_CONFIG,
+    CallPlan,
+    SharedSession,
+    aws_response_cache,
+    client_config,
+    paginate,
+    resolve_aws_regions,
+    take_call_plan,
+)
+from .utils_cache import ResponseCache, SnapshotBlocks
 from .utils_egress import GIB, format_bytes, new_row
+from .utils_egress_inventory import (
+    fill_unknown_sizes,
+    read_inventories,
+    read_s3_inventory,
+)
 
 logger = logging.getLogger("core.engine.egress.aws")
 
@@ -14,8 +33,22 @@ METRIC_DATA_BATCH_SIZE = 500
 
 METRICS_LOOKBACK_DAYS = 3
 
+# Window and period of each metric: the freshest value for the fewest
+# datapoints. S3 storage metrics are published once a day (and can lag by
+# two), hence the METRICS_LOOKBACK_DAYS window; FreeStorageSpace is
+# published every minute, where the newest hourly average of the last few
+# hours is fresh enough.
+S3_METRIC_PERIOD = 86400
+RDS_METRIC_PERIOD = 3600
+RDS_METRIC_LOOKBACK = timedelta(hours=3)
+
 ARCHIVE_TIERS = {"Archive", "Glacier", "Deep Archive"}
 
+# Most blocks the EBS direct APIs return per page.
+EBS_BLOCKS_PAGE_SIZE = 10000
+# The VolumeId of snapshots copied from another snapshot: no lineage.
+EBS_COPIED_VOLUME_ID = "vol-ffffffff"
+
 S3_STORAGE_TYPE_TIERS = {
     "StandardStorage": "Standard",
     "ReducedRedundancyStorage": "Standard",
@@ -75,6 +108,33 @@ EGRESS_RESOURCE_REGISTRY = {
 }
 
 
+def plan_egress_calls(plan: CallPlan, regions: list[str]) -> None:
+    """Add the listing behind every registry entry to `plan`, once per region."""
+    for code in EGRESS_RESOURCE_REGISTRY:
+        _, service_name, operation_name, result_key = code.split(".")
+        for region in regions:
+            plan.add("egress", service_name, region, operation_name, result_key)
+
+
+def _list_resources(
+    plan: CallPlan | None,
+    client: Any,
+    region: str,
+    operation_name: str,
+    result_key: str,
+    **kwargs: Any,
+) -> list:
+    if plan is None:
+        return paginate(client, operation_name, result_key, **kwargs)
+    return [
+        item
+        for page in plan.iter_pages(
+            client, region, operation_name, result_key, **kwargs
+        )
+        for item in page
+    ]
+
+
 def fetch_latest_metric_values(
     cloudwatch: Any,
     metric_specs: list[dict[str, Any]],
@@ -86,11 +146,14 @@ def fetch_latest_metric_values(
         return {}
     try:
         end = datetime.now(timezone.utc)
-        start = end - timedelta(days=lookback_days)
         results: dict[str, float | None] = {spec["id"]: None for spec in metric_specs}
 
         for batch_start in range(0, len(metric_specs), METRIC_DATA_BATCH_SIZE):
             batch = metric_specs[batch_start : batch_start + METRIC_DATA_BATCH_SIZE]
+            # One window per request: the widest a spec of the batch asks for.
+            start = end - max(
+                spec.get("lookback", timedelta(days=lookback_days)) for spec in batch
+            )
             queries = [
                 {
                     "Id": spec["id"],
@@ -100,7 +163,7 @@ def fetch_latest_metric_values(
                             "MetricName": spec["metric_name"],
                             "Dimensions": spec["dimensions"],
                         },
-                        "Period": period,
+                        "Period": spec.get("period", period),
                         "Stat": spec.get("stat", "Average"),
                     },
                     "ReturnData": True,
@@ -129,6 +192,146 @@ def fetch_latest_metric_values(
         return None
 
 
+class MetricPlanner:
+    """The CloudWatch lookups of one region's egress collectors.
+
+    Collectors add() their metric specs with a callback instead of fetching
+    them; fetch() packs the specs of every collector into shared
+    get_metric_data requests of METRIC_DATA_BATCH_SIZE queries, each metric
+    at its own period, and hands every callback its values. Metrics with
+    different windows ("lookback") go in separate requests.
+    s3_size_metrics() finds the BucketSizeBytes series of all buckets in the
+    region with one paginated list_metrics.
+    """
+
+    def __init__(self, cloudwatch: Any) -> None:
+        self.cloudwatch = cloudwatch
+        self._specs: list[dict[str, Any]] = []
+        self._callbacks: list[tuple[dict[str, str], Callable]] = []
+        self._s3_size_metrics: dict[str, list[dict[str, Any]]] | None = None
+        self._lock = threading.Lock()
+
+    def s3_size_metrics(self) -> dict[str, list[dict[str, Any]]]:
+        """The BucketSizeBytes metrics of the region, by bucket name."""
+        if self._s3_size_metrics is None:
+            try:
+                metrics = paginate(
+                    self.cloudwatch,
+                    "list_metrics",
+                    "Metrics",
+                    Namespace="AWS/S3",
+                    MetricName="BucketSizeBytes",
+                )
+            except (BotoCoreError, ClientError) as e:
+                logger.debug("Listing S3 size metrics failed: %s", str(e))
+                metrics = []
+            self._s3_size_metrics = {}
+            for metric in metrics:
+                bucket_name = next(
+                    (
+                        dimension["Value"]
+                        for dimension in metric.get("Dimensions", [])
+                        if dimension["Name"] == "BucketName"
+                    ),
+                    None,
+                )
+                if bucket_name:
+                    self._s3_size_metrics.setdefault(bucket_name, []).append(metric)
+        return self._s3_size_metrics
+
+    def add(
+        self,
+        specs: list[dict[str, Any]],
+        callback: Callable[[dict[str, float | None]], None],
+    ) -> None:
+        """Queue `specs`; fetch() calls `callback` with their latest values.
+
+        Spec ids only need to be unique within one add(); values come back
+        under the same ids, None where CloudWatch returned nothing.
+        """
+        ids = {}
+        with self._lock:
+            for spec in specs:
+                query_id = f"q{len(self._specs)}"
+                self._specs.append({**spec, "id": query_id})
+                ids[query_id] = spec["id"]
+            self._callbacks.append((ids, callback))
+
+    def fetch(self) -> None:
+        specs, self._specs = self._specs, []
+        callbacks, self._callbacks = self._callbacks, []
+
+        windows: dict[timedelta | None, list[dict[str, Any]]] = {}
+        for spec in specs:
+            windows.setdefault(spec.get("lookback"), []).append(spec)
+
+        values: dict[str, float | None] = {}
+        batches = 0
+        for window_specs in windows.values():
+            for start in range(0, len(window_specs), METRIC_DATA_BATCH_SIZE):
+                batch = window_specs[start : start + METRIC_DATA_BATCH_SIZE]
+                # A failed batch leaves only its own queries without values.
+                values.update(fetch_latest_metric_values(self.cloudwatch, batch) or {})
+                batches += 1
+        if specs:
+            logger.debug(
+                "Fetched %d CloudWatch metrics in %d batches", len(specs), batches
+            )
+
+        for ids, callback in callbacks:
+            try:
+                callback(
+                    {spec_id: values.get(query_id) for query_id, spec_id in ids.items()}
+                )
+            except Exception as e:
+                logger.debug("Applying metric values failed: %s", str(e), exc_info=True)
+
+
+class ItemPool:
+    """The per-item follow-up calls of an egress run, `jobs` at a time.
+
+    One pool serves every collector and region, so a run with thousands of
+    buckets or tables is bounded by jobs rather than by item count. The
+    workers share each collector's clients (boto3 clients are thread-safe),
+    which are built with `config` to pool a connection per worker. Bucket
+    regions resolved by any region's collector are kept in `bucket_regions`;
+    `snapshot_lineage` is only set when snapshots are sized by lineage.
+    """
+
+    def __init__(
+        self,
+        jobs: int = AWS_DEFAULT_JOBS,
+        cache: ResponseCache | None = None,
+        snapshot_lineage: bool = False,
+    ) -> None:
+        self.config = client_config(jobs)
+        self.bucket_regions = BucketRegionIndex(cache)
+        self.snapshot_lineage = SnapshotLineage(cache) if snapshot_lineage else None
+        self._executor = ThreadPoolExecutor(max_workers=jobs)
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self._executor.shutdown()
+
+    def map(self, fn: Callable[[Any], Any], items: Iterable[Any]) -> list:
+        """[fn(item) for item in items], in order, run in parallel."""
+        return list(self._executor.map(fn, items))
+
+
+def _map_items(
+    pool: ItemPool | None, fn: Callable[[Any], Any], items: Iterable[Any]
+) -> list:
+    if pool is None:
+        return [fn(item) for item in items]
+    return pool.map(fn, items)
+
+
+def _item_config(pool: ItemPool | None) -> Any:
+    return AWS_RETRY_CONFIG if pool is None else pool.config
+
+
 def _bucket_region(s3_client: Any, bucket_name: str) -> str:
     location = s3_client.get_bucket_location(Bucket=bucket_name).get(
         "LocationConstraint"
@@ -140,37 +343,257 @@ def _bucket_region(s3_client: Any, bucket_name: str) -> str:
     return location
 
 
-def _list_buckets_in_region(s3_client: Any, region: str) -> list[str]:
-    try:
-        response = s3_client.list_buckets(BucketRegion=region)
-        return [bucket["Name"] for bucket in response.get("Buckets", [])]
-    except (BotoCoreError, ClientError) as e:
-        logger.debug("ListBuckets with BucketRegion filter failed: %s", str(e))
+class BucketRegionIndex:
+    """The regions of an account's buckets, each resolved once.
+
+    Only needed where ListBuckets neither filters by nor returns
+    BucketRegion. GetBucketLocation results are kept for the run, so every
+    region of a sweep shares them, and with a `cache` in the response cache
+    directory, so later runs only resolve buckets they have not seen. A
+    deleted bucket's name can be taken in another region; --refresh
+    resolves everything again.
+    """
+
+    def __init__(self, cache: ResponseCache | None = None) -> None:
+        self.cache = cache
+        self._regions: dict[str, str] = {}
+        # Held while resolving, so regions swept side by side do not look
+        # up the same buckets twice.
+        self._lock = threading.Lock()
+
+    def resolve(
+        self, s3_client: Any, bucket_names: list[str], pool: ItemPool | None = None
+    ) -> dict[str, str]:
+        """The region of each bucket in `bucket_names` that could be resolved."""
+        with self._lock:
+            missing = [name for name in bucket_names if name not in self._regions]
+            if missing and self.cache is not None:
+                self._regions.update(self.cache.bucket_regions(missing))
+                missing = [name for name in missing if name not in self._regions]
+
+            def lookup(name: str) -> str | None:
+                try:
+                    return _bucket_region(s3_client, name)
+                except (BotoCoreError, ClientError) as e:
+                    logger.debug("Skipping bucket %s: %s", name, str(e))
+                    return None
+
+            resolved = {
+                name: region
+                for name, region in zip(missing, _map_items(pool, lookup, missing))
+                if region is not None
+            }
+            self._regions.update(resolved)
+            if resolved and self.cache is not None:
+                self.cache.store_bucket_regions(resolved)
+            return {
+                name: self._regions[name]
+                for name in bucket_names
+                if name in self._regions
+            }
+
 
-    bucket_names = []
-    for bucket in s3_client.list_buckets().get("Buckets", []):
-        name = bucket["Name"]
-        bucket_region = bucket.get("BucketRegion")
-        if bucket_region is None:
+def _count_blocks(
+    call: Callable[..., dict[str, Any]],
+    result_key: str,
+    token_key: str,
+    **kwargs: Any,
+) -> int:
+    # Bytes of the listed blocks that hold data in the snapshot (`token_key`),
+    # following NextToken; the EBS direct APIs have no boto3 paginators.
+    total = 0
+    while True:
+        page = call(MaxResults=EBS_BLOCKS_PAGE_SIZE, **kwargs)
+        blocks = sum(1 for block in page.get(result_key, []) if token_key in block)
+        total += blocks * page.get("BlockSize", 0)
+        if not page.get("NextToken"):
+            return total
+        kwargs["NextToken"] = page["NextToken"]
+
+
+def _snapshot_lineages(
+    snapshots: list[dict[str, Any]],
+) -> list[tuple[str, str | None]]:
+    # (snapshot, the snapshot of the same volume before it), oldest first.
+    # Pending snapshots cannot be read yet.
+    by_volume: dict[str, list[dict[str, Any]]] = {}
+    pairs: list[tuple[str, str | None]] = []
+    for snapshot in snapshots:
+        if snapshot.get("State", "completed") != "completed":
+            continue
+        volume_id = snapshot.get("VolumeId")
+        if not volume_id or volume_id == EBS_COPIED_VOLUME_ID:
+            pairs.append((snapshot["SnapshotId"], None))
+        else:
+            by_volume.setdefault(volume_id, []).append(snapshot)
+    for lineage in by_volume.values():
+        parent = None
+        for snapshot in sorted(lineage, key=lambda item: str(item.get("StartTime"))):
+            pairs.append((snapshot["SnapshotId"], parent))
+            parent = snapshot["SnapshotId"]
+    return pairs
+
+
+class SnapshotLineage:
+    """The unique bytes of EBS snapshots, counted along each volume's lineage.
+
+    The oldest snapshot of a volume is sized by its written blocks
+    (ListSnapshotBlocks), every later one by the blocks changed since the
+    snapshot before it (ListChangedBlocks), so a volume's snapshots add up
+    to the data they hold instead of one volume size each. Snapshots never
+    change: with a `cache`, counts are kept in the response cache directory
+    and only new snapshots, or those whose predecessor was deleted, are
+    counted on later runs.
+    """
+
+    def __init__(self, cache: ResponseCache | None = None) -> None:
+        self.cache = cache
+
+    def unique_bytes(
+        self,
+        ebs_client: Any,
+        snapshots: list[dict[str, Any]],
+        pool: ItemPool | None = None,
+    ) -> dict[str, int]:
+        """Unique bytes of each snapshot in `snapshots` that could be counted."""
+        pairs = _snapshot_lineages(snapshots)
+        known = {}
+        if self.cache is not None:
+            known = self.cache.snapshot_blocks([snapshot for snapshot, _ in pairs])
+        # Entries are keyed by the parent they were counted against, also
+        # when that comparison fell back to listing every block.
+        missing = [
+            (snapshot, parent)
+            for snapshot, parent in pairs
+            if snapshot not in known or known[snapshot].parent != parent
+        ]
+
+        def count(pair: tuple[str, str | None]) -> SnapshotBlocks | None:
+            snapshot, parent = pair
             try:
-                bucket_region = _bucket_region(s3_client, name)
+                if parent is not None:
+                    try:
+                        return SnapshotBlocks(
+                            parent,
+                            _count_blocks(
+                                ebs_client.list_changed_blocks,
+                                "ChangedBlocks",
+                                "SecondBlockToken",
+                                FirstSnapshotId=parent,
+                                SecondSnapshotId=snapshot,
+                            ),
+                        )
+                    except ClientError as e:
+                        # Snapshots of one volume are not always incremental
+                        # (a re-encrypted copy starts a lineage of its own).
+                        if e.response["Error"]["Code"] != "ValidationException":
+                            raise
+                return SnapshotBlocks(
+                    parent,
+                    _count_blocks(
+                        ebs_client.list_snapshot_blocks,
+                        "Blocks",
+                        "BlockToken",
+                        SnapshotId=snapshot,
+                    ),
+                    full_listing=parent is not None,
+                )
             except (BotoCoreError, ClientError) as e:
-                logger.debug("Skipping bucket %s: %s", name, str(e))
-                continue
-        if bucket_region == region:
-            bucket_names.append(name)
-    return bucket_names
+                logger.debug("Skipping lineage of snapshot %s: %s", snapshot, str(e))
+                return None
+
+        counted = {
+            snapshot: result
+            for (snapshot, _), result in zip(missing, _map_items(pool, count, missing))
+            if result is not None
+        }
+        if counted and self.cache is not None:
+            self.cache.store_snapshot_blocks(counted)
+        known.update(counted)
+        return {
+            snapshot: known[snapshot].bytes
+            for snapshot, _ in pairs
+            if snapshot in known
+        }
+
+
+def _list_buckets_in_region(
+    s3_client: Any,
+    region: str,
+    buckets: list[dict[str, Any]] | None = None,
+    pool: ItemPool | None = None,
+) -> list[str]:
+    # `buckets` is an account-wide ListBuckets result already fetched by an
+    # earlier stage; without it the listing is filtered server-side.
+    if buckets is None:
+        try:
+            response = s3_client.list_buckets(BucketRegion=region)
+            return [bucket["Name"] for bucket in response.get("Buckets", [])]
+        except (BotoCoreError, ClientError) as e:
+            logger.debug("ListBuckets with BucketRegion filter failed: %s", str(e))
+        buckets = s3_client.list_buckets().get("Buckets", [])
+
+    regions = {
+        bucket["Name"]: bucket["BucketRegion"]
+        for bucket in buckets
+        if bucket.get("BucketRegion") is not None
+    }
+    missing = [bucket["Name"] for bucket in buckets if bucket["Name"] not in regions]
+    if missing:
+        index = pool.bucket_regions if pool is not None else BucketRegionIndex()
+        regions.update(index.resolve(s3_client, missing, pool))
+    return [
+        bucket["Name"] for bucket in buckets if regions.get(bucket["Name"]) == region
+    ]
+
+
+def _archive_flag(archive_bytes: int) -> str:
+    return f"Archive-class: {format_bytes(archive_bytes)} (restore required)"
+
+
+def _apply_s3_sizes(
+    row: dict[str, Any], spec_tiers: dict[str, str], values: dict[str, float | None]
+) -> None:
+    tier_bytes: dict[str, int] = {}
+    for spec_id, value in values.items():
+        if value is None:
+            continue
+        tier = spec_tiers[spec_id]
+        tier_bytes[tier] = tier_bytes.get(tier, 0) + int(value)
+
+    if tier_bytes:
+        row["size_bytes"] = sum(tier_bytes.values())
+        row["tier_bytes"] = tier_bytes
+        archive_bytes = sum(
+            size for tier, size in tier_bytes.items() if tier in ARCHIVE_TIERS
+        )
+        if archive_bytes:
+            row["flags"].append(_archive_flag(archive_bytes))
+    else:
+        row["size_unknown"] = True
 
 
 def _collect_s3_buckets(
-    session: Any, region: str, code: str, entry: dict[str, Any]
+    session: Any,
+    region: str,
+    code: str,
+    entry: dict[str, Any],
+    plan: CallPlan | None = None,
+    metrics: MetricPlanner | None = None,
+    pool: ItemPool | None = None,
 ) -> list[dict[str, Any]]:
-    s3_client = session.client("s3", region_name=region, config=AWS_RETRY_CONFIG)
-    cloudwatch = session.client(
-        "cloudwatch", region_name=region, config=AWS_RETRY_CONFIG
-    )
+    s3_client = session.client("s3", region_name=region, config=_item_config(pool))
+    own_metrics = metrics is None
+    if metrics is None:
+        metrics = MetricPlanner(
+            session.client("cloudwatch", region_name=region, config=AWS_RETRY_CONFIG)
+        )
 
-    bucket_names = _list_buckets_in_region(s3_client, region)
+    buckets = None
+    if plan is not None and plan.has_pages("s3", region, "list_buckets", "Buckets"):
+        buckets = _list_resources(plan, s3_client, region, "list_buckets", "Buckets")
+    bucket_names = _list_buckets_in_region(s3_client, region, buckets, pool)
+    size_metrics = metrics.s3_size_metrics() if bucket_names else {}
 
     rows = []
     for name in bucket_names:
@@ -178,19 +601,9 @@ def _collect_s3_buckets(
             f"arn:aws:s3:::{name}", name, code, entry["label"], entry["category"]
         )
 
-        try:
-            metrics = cloudwatch.list_metrics(
-                Namespace="AWS/S3",
-                MetricName="BucketSizeBytes",
-                Dimensions=[{"Name": "BucketName", "Value": name}],
-            ).get("Metrics", [])
-        except (BotoCoreError, ClientError) as e:
-            logger.debug("Listing metrics failed for bucket %s: %s", name, str(e))
-            metrics = []
-
         specs = []
         spec_tiers = {}
-        for index, metric in enumerate(metrics):
+        for index, metric in enumerate(size_metrics.get(name, [])):
             storage_type = next(
                 (
                     dimension["Value"]
@@ -206,50 +619,51 @@ def _collect_s3_buckets(
                     "namespace": "AWS/S3",
                     "metric_name": "BucketSizeBytes",
                     "dimensions": metric.get("Dimensions", []),
+                    "period": S3_METRIC_PERIOD,
                 }
             )
             spec_tiers[spec_id] = S3_STORAGE_TYPE_TIERS.get(storage_type, storage_type)
+        metrics.add(
+            specs,
+            lambda values, row=row, spec_tiers=spec_tiers: _apply_s3_sizes(
+                row, spec_tiers, values
+            ),
+        )
 
-        values = fetch_latest_metric_values(cloudwatch, specs)
-        tier_bytes: dict[str, int] = {}
-        if values:
-            for spec_id, value in values.items():
-                if value is None:
-                    continue
-                tier = spec_tiers[spec_id]
-                tier_bytes[tier] = tier_bytes.get(tier, 0) + int(value)
-
-        if tier_bytes:
-            row["size_bytes"] = sum(tier_bytes.values())
-            row["tier_bytes"] = tier_bytes
-            archive_bytes = sum(
-                size for tier, size in tier_bytes.items() if tier in ARCHIVE_TIERS
-            )
-            if archive_bytes:
-                row["flags"].append(
-                    f"Archive-class: {format_bytes(archive_bytes)} (restore required)"
-                )
-        else:
-            row["size_unknown"] = True
+        rows.append(row)
 
+    def replicated(name: str) -> bool:
         try:
             s3_client.get_bucket_replication(Bucket=name)
+        except (BotoCoreError, ClientError):
+            return False
+        return True
+
+    for row, is_replicated in zip(rows, _map_items(pool, replicated, bucket_names)):
+        if is_replicated:
             row["notes"].append(
                 "replication configured (replica buckets are counted separately)"
             )
-        except (BotoCoreError, ClientError):
-            pass
 
-        rows.append(row)
+    if own_metrics:
+        metrics.fetch()
     return rows
 
 
 def _collect_ebs_volumes(
-    session: Any, region: str, code: str, entry: dict[str, Any]
+    session: Any,
+    region: str,
+    code: str,
+    entry: dict[str, Any],
+    plan: CallPlan | None = None,
+    metrics: MetricPlanner | None = None,
+    pool: ItemPool | None = None,
 ) -> list[dict[str, Any]]:
     ec2_client = session.client("ec2", region_name=region, config=AWS_RETRY_CONFIG)
     rows = []
-    for volume in paginate(ec2_client, "describe_volumes", "Volumes"):
+    for volume in _list_resources(
+        plan, ec2_client, region, "describe_volumes", "Volumes"
+    ):
         name = next(
             (tag["Value"] for tag in volume.get("Tags", []) if tag["Key"] == "Name"),
             volume["VolumeId"],
@@ -266,13 +680,27 @@ def _collect_ebs_volumes(
 
 
 def _collect_ebs_snapshots(
-    session: Any, region: str, code: str, entry: dict[str, Any]
+    session: Any,
+    region: str,
+    code: str,
+    entry: dict[str, Any],
+    plan: CallPlan | None = None,
+    metrics: MetricPlanner | None = None,
+    pool: ItemPool | None = None,
 ) -> list[dict[str, Any]]:
     ec2_client = session.client("ec2", region_name=region, config=AWS_RETRY_CONFIG)
+    snapshots = _list_resources(
+        plan, ec2_client, region, "describe_snapshots", "Snapshots", OwnerIds=["self"]
+    )
+    unique_bytes: dict[str, int] = {}
+    lineage = pool.snapshot_lineage if pool is not None else None
+    if lineage is not None and snapshots:
+        ebs_client = session.client(
+            "ebs", region_name=region, config=_item_config(pool)
+        )
+        unique_bytes = lineage.unique_bytes(ebs_client, snapshots, pool)
     rows = []
-    for snapshot in paginate(
-        ec2_client, "describe_snapshots", "Snapshots", OwnerIds=["self"]
-    ):
+    for snapshot in snapshots:
         row = new_row(
             snapshot["SnapshotId"],
             snapshot["SnapshotId"],
@@ -281,7 +709,10 @@ def _collect_ebs_snapshots(
             entry["category"],
         )
         size_gb = snapshot.get("VolumeSize")
-        if size_gb:
+        if snapshot["SnapshotId"] in unique_bytes:
+            row["size_bytes"] = unique_bytes[snapshot["SnapshotId"]]
+            row["notes"].append("incremental – unique blocks of its volume lineage")
+        elif size_gb:
             row["size_bytes"] = int(size_gb) * GIB
             row["flags"].append("allocated (upper bound)")
             row["notes"].append("incremental – shares blocks with sibling snapshots")
@@ -291,19 +722,45 @@ def _collect_ebs_snapshots(
     return rows
 
 
+def _apply_rds_sizes(
+    spec_rows: dict[str, tuple[dict[str, Any], int]],
+    values: dict[str, float | None],
+) -> None:
+    for spec_id, (row, allocated_bytes) in spec_rows.items():
+        free_bytes = values.get(spec_id)
+        if free_bytes is not None and allocated_bytes:
+            row["size_bytes"] = max(int(allocated_bytes - free_bytes), 0)
+            row["notes"].append(f"allocated: {format_bytes(allocated_bytes)}")
+        elif allocated_bytes:
+            row["size_bytes"] = allocated_bytes
+            row["flags"].append("allocated (upper bound)")
+        else:
+            row["size_unknown"] = True
+
+
 def _collect_rds_instances(
-    session: Any, region: str, code: str, entry: dict[str, Any]
+    session: Any,
+    region: str,
+    code: str,
+    entry: dict[str, Any],
+    plan: CallPlan | None = None,
+    metrics: MetricPlanner | None = None,
+    pool: ItemPool | None = None,
 ) -> list[dict[str, Any]]:
     rds_client = session.client("rds", region_name=region, config=AWS_RETRY_CONFIG)
-    cloudwatch = session.client(
-        "cloudwatch", region_name=region, config=AWS_RETRY_CONFIG
-    )
+    own_metrics = metrics is None
+    if metrics is None:
+        metrics = MetricPlanner(
+            session.client("cloudwatch", region_name=region, config=AWS_RETRY_CONFIG)
+        )
 
     rows = []
     specs = []
     spec_rows: dict[str, tuple[dict[str, Any], int]] = {}
     for index, instance in enumerate(
-        paginate(rds_client, "describe_db_instances", "DBInstances")
+        _list_resources(
+            plan, rds_client, region, "describe_db_instances", "DBInstances"
+        )
     ):
         identifier = instance["DBInstanceIdentifier"]
         row = new_row(
@@ -326,33 +783,33 @@ def _collect_rds_instances(
                 "namespace": "AWS/RDS",
                 "metric_name": "FreeStorageSpace",
                 "dimensions": [{"Name": "DBInstanceIdentifier", "Value": identifier}],
+                "period": RDS_METRIC_PERIOD,
+                "lookback": RDS_METRIC_LOOKBACK,
             }
         )
         spec_rows[spec_id] = (row, allocated_bytes)
         rows.append(row)
 
-    values = fetch_latest_metric_values(cloudwatch, specs, period=300)
-    for spec_id, (row, allocated_bytes) in spec_rows.items():
-        free_bytes = values.get(spec_id) if values else None
-        if free_bytes is not None and allocated_bytes:
-            row["size_bytes"] = max(int(allocated_bytes - free_bytes), 0)
-            row["notes"].append(f"allocated: {format_bytes(allocated_bytes)}")
-        elif allocated_bytes:
-            row["size_bytes"] = allocated_bytes
-            row["flags"].append("allocated (upper bound)")
-        else:
-            row["size_unknown"] = True
+    metrics.add(specs, lambda values: _apply_rds_sizes(spec_rows, values))
+    if own_metrics:
+        metrics.fetch()
     return rows
 
 
 def _collect_dynamodb_tables(
-    session: Any, region: str, code: str, entry: dict[str, Any]
+    session: Any,
+    region: str,
+    code: str,
+    entry: dict[str, Any],
+    plan: CallPlan | None = None,
+    metrics: MetricPlanner | None = None,
+    pool: ItemPool | None = None,
 ) -> list[dict[str, Any]]:
     dynamodb_client = session.client(
-        "dynamodb", region_name=region, config=AWS_RETRY_CONFIG
+        "dynamodb", region_name=region, config=_item_config(pool)
     )
-    rows = []
-    for table_name in paginate(dynamodb_client, "list_tables", "TableNames"):
+
+    def table_row(table_name: str) -> dict[str, Any]:
         try:
             table = dynamodb_client.describe_table(TableName=table_name).get(
                 "Table", {}
@@ -363,8 +820,7 @@ def _collect_dynamodb_tables(
                 table_name, table_name, code, entry["label"], entry["category"]
             )
             row["size_unknown"] = True
-            rows.append(row)
-            continue
+            return row
 
         row = new_row(
             table.get("TableArn", table_name),
@@ -379,18 +835,31 @@ def _collect_dynamodb_tables(
             for index in table.get("GlobalSecondaryIndexes", [])
         )
         row["size_bytes"] = size_bytes
-        rows.append(row)
-    return rows
+        return row
+
+    return _map_items(
+        pool,
+        table_row,
+        _list_resources(plan, dynamodb_client, region, "list_tables", "TableNames"),
+    )
 
 
 def _collect_backup_vaults(
-    session: Any, region: str, code: str, entry: dict[str, Any]
+    session: Any,
+    region: str,
+    code: str,
+    entry: dict[str, Any],
+    plan: CallPlan | None = None,
+    metrics: MetricPlanner | None = None,
+    pool: ItemPool | None = None,
 ) -> list[dict[str, Any]]:
     backup_client = session.client(
         "backup", region_name=region, config=AWS_RETRY_CONFIG
     )
     rows = []
-    for vault in paginate(backup_client, "list_backup_vaults", "BackupVaultList"):
+    for vault in _list_resources(
+        plan, backup_client, region, "list_backup_vaults", "BackupVaultList"
+    ):
         vault_name = vault["BackupVaultName"]
         row = new_row(
             vault.get("BackupVaultArn", vault_name),
@@ -419,25 +888,91 @@ _STRATEGY_COLLECTORS = {
 }
 
 
-def collect_aws_egress(
-    provider_details: dict[str, Any],
-) -> tuple[list[dict[str, Any]], set[str]]:
-    region = provider_details["region"]
-    session = boto3.Session(
-        aws_access_key_id=provider_details["accessKey"],
-        aws_secret_access_key=provider_details["secretKey"],
-        aws_session_token=provider_details.get("sessionToken"),
-        region_name=region,
+def _collect_region(
+    session: Any,
+    region: str,
+    plan: CallPlan | None = None,
+    pool: ItemPool | None = None,
+) -> list[dict[str, Any]]:
+    # One planner per region: the metric lookups of every collector are
+    # fetched together once all of them have listed their resources.
+    metrics = MetricPlanner(
+        session.client("cloudwatch", region_name=region, config=AWS_RETRY_CONFIG)
     )
 
-    rows = []
-    for code, entry in EGRESS_RESOURCE_REGISTRY.items():
+    def collect(code: str) -> list[dict[str, Any]]:
+        entry = EGRESS_RESOURCE_REGISTRY[code]
         collector = _STRATEGY_COLLECTORS[entry["strategy"]]
         try:
-            rows.extend(collector(session, region, code, entry))
+            return collector(session, region, code, entry, plan, metrics, pool)
         except Exception as e:
             logger.debug(
-                "Egress collection failed for %s: %s", code, str(e), exc_info=True
+                "Egress collection failed for %s in %s: %s",
+                code,
+                region,
+                str(e),
+                exc_info=True,
             )
+            return []
+
+    # The collectors of a region run side by side; their per-item calls
+    # queue on the run's ItemPool. Rows keep registry order.
+    with ThreadPoolExecutor(max_workers=len(EGRESS_RESOURCE_REGISTRY)) as executor:
+        results = list(executor.map(collect, EGRESS_RESOURCE_REGISTRY))
+    metrics.fetch()
+    return [row for rows in results for row in rows]
+
+
+def collect_aws_egress(
+    provider_details: dict[str, Any],
+) -> tuple[list[dict[str, Any]], set[str]]:
+    region = provider_details["region"]
+    # Regions are swept in parallel, all building their clients from the
+    # same session and sharing the AWS_SCHEDULER rate limits.
+    session = SharedSession(
+        boto3.Session(
+            aws_access_key_id=provider_details["accessKey"],
+            aws_secret_access_key=provider_details["secretKey"],
+            aws_session_token=provider_details.get("sessionToken"),
+            region_name=region,
+        )
+    )
+    regions = resolve_aws_regions(session, provider_details)
+
+    # Listings Stage 3 already fetched are served from its plan; anything
+    # else is called here.
+    plan = take_call_plan(provider_details) or CallPlan(
+        region, aws_response_cache(session, provider_details)
+    )
+
+    jobs = int(provider_details.get("jobs") or AWS_DEFAULT_JOBS)
+    with (
+        ItemPool(
+            jobs, plan.cache, bool(provider_details.get("snapshotLineage"))
+        ) as pool,
+        ThreadPoolExecutor(max_workers=min(len(regions), jobs)) as executor,
+    ):
+        futures = [
+            executor.submit(_collect_region, session, name, plan, pool)
+            for name in regions
+        ]
+    rows = [row for future in futures for row in future.result()]
+
+    # Buckets without a BucketSizeBytes datapoint are sized from their S3
+    # Inventory, when one is given.
+    inventories = provider_details.get("egressInventory")
+    if inventories and any(row["size_unknown"] for row in rows):
+        s3_client = session.client("s3", region_name=region, config=AWS_RETRY_CONFIG)
+        sizes = read_inventories(
+            inventories, lambda location: read_s3_inventory(location, s3_client)
+        )
+        fill_unknown_sizes(
+            rows,
+            sizes,
+            "AWS.s3.list_buckets.Buckets",
+            "S3 Inventory",
+            ARCHIVE_TIERS,
+            _archive_flag,
+        )
 
     return rows, ARCHIVE_TIERS
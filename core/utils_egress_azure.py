@@ -1,12 +1,28 @@
 # core/utils_egress_azure.py
 import logging
 import requests
-from typing import Any
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, NamedTuple
 from datetime import datetime, timedelta, timezone
-from azure.identity import ClientSecretCredential
+from azure.core.exceptions import AzureError
 from azure.mgmt.resource import ResourceManagementClient
 
+from .utils_azure import (
+    MANAGEMENT_SCOPE,
+    azure_credential,
+    list_resource_group,
+    query_resource_graph,
+    resource_graph_filter,
+    take_resource_snapshot,
+)
+from .utils_cache import response_cache
 from .utils_egress import GIB, format_bytes, new_row
+from .utils_egress_inventory import (
+    fill_unknown_sizes,
+    read_blob_inventory,
+    read_inventories,
+)
 
 logger = logging.getLogger("core.engine.egress.azure")
 
@@ -17,9 +33,27 @@ VAULT_FINDING = (
 )
 
 METRICS_API_VERSION = "2018-01-01"
-MANAGEMENT_SCOPE = "https://management.azure.com/.default"
 MANAGEMENT_BASE_URL = "https://management.azure.com"
 
+# Regional metrics:getBatch endpoint: up to METRICS_BATCH_SIZE resources of
+# one subscription, region and namespace per request.
+METRICS_BATCH_URL = (
+    "https://{region}.metrics.monitor.azure.com/subscriptions/"
+    "{subscription_id}/metrics:getBatch"
+)
+METRICS_BATCH_API_VERSION = "2023-10-01"
+METRICS_BATCH_SCOPE = "https://metrics.monitor.azure.com/.default"
+METRICS_BATCH_SIZE = 50
+# Batch requests in flight at once, over one keep-alive session.
+METRICS_BATCH_WORKERS = 4
+
+# The size property of every disk and snapshot in the scope, a Resource
+# Graph page at a time instead of one get_by_id call per resource.
+ALLOCATED_SIZE_QUERY = (
+    "Resources | where type in~ ({types}){where} "
+    "| project id, size = properties.{size_property}"
+)
+
 ARCHIVE_TIERS = {"Archive"}
 
 EGRESS_RESOURCE_REGISTRY = {
@@ -93,6 +127,33 @@ def _latest_average(datapoints: list[dict[str, Any]]) -> float | None:
     return None
 
 
+def _metrics_window() -> tuple[str, str]:
+    end = datetime.now(timezone.utc)
+    start = end - timedelta(days=2)
+    return start.strftime("%Y-%m-%dT%H:%M:%SZ"), end.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def _parse_metrics(
+    metrics: list[dict[str, Any]], metric_names: list[str], dimension: str | None
+) -> dict[str, list[dict[str, Any]]]:
+    result: dict[str, list[dict[str, Any]]] = {name: [] for name in metric_names}
+    for metric in metrics:
+        name = metric.get("name", {}).get("value", "")
+        series_values = []
+        for series in metric.get("timeseries", []):
+            dimension_value = None
+            if dimension:
+                for metadata in series.get("metadatavalues", []):
+                    metadata_name = metadata.get("name", {}).get("value", "")
+                    if metadata_name.lower() == dimension.lower():
+                        dimension_value = metadata.get("value")
+            value = _latest_average(series.get("data", []))
+            if value is not None:
+                series_values.append({"dimension": dimension_value, "value": value})
+        result[name] = series_values
+    return result
+
+
 def fetch_monitor_metrics(
     credential: Any,
     resource_id: str,
@@ -100,24 +161,21 @@ def fetch_monitor_metrics(
     *,
     dimension: str | None = None,
     timeout: int = 30,
+    session: Any = None,
 ) -> dict[str, list[dict[str, Any]]] | None:
     try:
         token = credential.get_token(MANAGEMENT_SCOPE)
-        end = datetime.now(timezone.utc)
-        start = end - timedelta(days=2)
+        start, end = _metrics_window()
         params = {
             "api-version": METRICS_API_VERSION,
             "metricnames": ",".join(metric_names),
-            "timespan": (
-                f"{start.strftime('%Y-%m-%dT%H:%M:%SZ')}/"
-                f"{end.strftime('%Y-%m-%dT%H:%M:%SZ')}"
-            ),
+            "timespan": f"{start}/{end}",
             "aggregation": "Average",
             "interval": "PT1H",
         }
         if dimension:
             params["$filter"] = f"{dimension} eq '*'"
-        response = requests.get(
+        response = (session or requests).get(
             f"{MANAGEMENT_BASE_URL}{resource_id}/providers/Microsoft.Insights/metrics",
             headers={"Authorization": f"Bearer {token.token}"},
             params=params,
@@ -132,22 +190,228 @@ def fetch_monitor_metrics(
         logger.debug("Metrics lookup failed for %s: %s", resource_id, str(e))
         return None
 
-    result: dict[str, list[dict[str, Any]]] = {name: [] for name in metric_names}
-    for metric in payload.get("value", []):
-        name = metric.get("name", {}).get("value", "")
-        series_values = []
-        for series in metric.get("timeseries", []):
-            dimension_value = None
-            if dimension:
-                for metadata in series.get("metadatavalues", []):
-                    metadata_name = metadata.get("name", {}).get("value", "")
-                    if metadata_name.lower() == dimension.lower():
-                        dimension_value = metadata.get("value")
-            value = _latest_average(series.get("data", []))
-            if value is not None:
-                series_values.append({"dimension": dimension_value, "value": value})
-        result[name] = series_values
-    return result
+    return _parse_metrics(payload.get("value", []), metric_names, dimension)
+
+
+def _subscription_of(resource_id: str) -> str | None:
+    parts = resource_id.split("/")
+    if len(parts) > 2 and parts[1].lower() == "subscriptions":
+        return parts[2]
+    return None
+
+
+class MetricsQuery(NamedTuple):
+    """The metrics one collector reads for one resource."""
+
+    resource_id: str
+    region: str
+    namespace: str
+    metric_names: tuple[str, ...]
+    dimension: str | None = None
+
+    @property
+    def key(self) -> tuple[str, tuple[str, ...], str | None]:
+        return self.resource_id.lower(), self.metric_names, self.dimension
+
+
+class MonitorMetrics:
+    """Azure Monitor metrics for the egress collectors.
+
+    prefetch() fetches the queries of many resources ahead of the collectors:
+    grouped by subscription, region, namespace and metric names, each group
+    goes to the regional metrics:getBatch endpoint METRICS_BATCH_SIZE
+    resources at a time, a few requests at a time over one keep-alive
+    session. get() answers from those results and falls back to one
+    fetch_monitor_metrics call for anything a batch did not return.
+    """
+
+    def __init__(
+        self,
+        credential: Any,
+        session: Any = None,
+        workers: int = METRICS_BATCH_WORKERS,
+        timeout: int = 30,
+    ) -> None:
+        self.credential = credential
+        self.session = session
+        self.workers = workers
+        self.timeout = timeout
+        self._results: dict[tuple, dict[str, list[dict[str, Any]]]] = {}
+
+    def get(
+        self,
+        resource_id: str,
+        metric_names: list[str],
+        dimension: str | None = None,
+    ) -> dict[str, list[dict[str, Any]]] | None:
+        key = (resource_id.lower(), tuple(metric_names), dimension)
+        if key in self._results:
+            return self._results[key]
+        return fetch_monitor_metrics(
+            self.credential,
+            resource_id,
+            metric_names,
+            dimension=dimension,
+            timeout=self.timeout,
+            session=self.session,
+        )
+
+    def prefetch(self, queries: list[MetricsQuery]) -> None:
+        groups: dict[tuple, list[MetricsQuery]] = defaultdict(list)
+        for query in queries:
+            subscription_id = _subscription_of(query.resource_id)
+            if subscription_id is None or not query.region:
+                continue  # left to get()
+            groups[
+                (
+                    subscription_id,
+                    query.region,
+                    query.namespace.lower(),
+                    query.metric_names,
+                    query.dimension,
+                )
+            ].append(query)
+        batches = [
+            group[start : start + METRICS_BATCH_SIZE]
+            for group in groups.values()
+            for start in range(0, len(group), METRICS_BATCH_SIZE)
+        ]
+        if not batches:
+            return
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            for results in executor.map(self._fetch_batch, batches):
+                self._results.update(results)
+        logger.debug(
+            "Prefetched metrics of %d resources in %d batch requests",
+            len(self._results),
+            len(batches),
+        )
+
+    def _fetch_batch(self, batch: list[MetricsQuery]) -> dict[tuple, dict]:
+        first = batch[0]
+        start, end = _metrics_window()
+        params = {
+            "api-version": METRICS_BATCH_API_VERSION,
+            "metricnamespace": first.namespace,
+            "metricnames": ",".join(first.metric_names),
+            "starttime": start,
+            "endtime": end,
+            "interval": "PT1H",
+            "aggregation": "average",
+        }
+        if first.dimension:
+            params["filter"] = f"{first.dimension} eq '*'"
+        try:
+            token = self.credential.get_token(METRICS_BATCH_SCOPE)
+            response = (self.session or requests).post(
+                METRICS_BATCH_URL.format(
+                    region=first.region,
+                    subscription_id=_subscription_of(first.resource_id),
+                ),
+                headers={"Authorization": f"Bearer {token.token}"},
+                params=params,
+                json={"resourceids": [query.resource_id for query in batch]},
+                timeout=self.timeout,
+            )
+            response.raise_for_status()
+            payload = response.json()
+        except (AzureError, requests.RequestException, ValueError) as e:
+            # The resources of a failed batch are fetched one by one instead.
+            logger.debug(
+                "Metrics batch of %d %s resources in %s failed: %s",
+                len(batch),
+                first.namespace,
+                first.region,
+                str(e),
+            )
+            return {}
+
+        queries = {query.resource_id.lower(): query for query in batch}
+        results = {}
+        for entry in payload.get("values", []):
+            query = queries.get((entry.get("resourceid") or "").lower())
+            if query is not None:
+                results[query.key] = _parse_metrics(
+                    entry.get("value", []), list(query.metric_names), query.dimension
+                )
+        return results
+
+
+def metrics_queries(resource: Any, entry: dict[str, Any]) -> list[MetricsQuery]:
+    """The metrics the collector of `entry` reads for `resource`."""
+    region = (resource.location or "").strip().lower()
+    if entry["strategy"] == "storage_account_metrics":
+        return [
+            MetricsQuery(
+                resource.id,
+                region,
+                "Microsoft.Storage/storageAccounts",
+                ("UsedCapacity",),
+            ),
+            MetricsQuery(
+                f"{resource.id}/blobServices/default",
+                region,
+                "Microsoft.Storage/storageAccounts/blobServices",
+                ("BlobCapacity",),
+                "Tier",
+            ),
+        ]
+    if entry["strategy"] == "monitor_metric":
+        return [
+            MetricsQuery(resource.id, region, resource.type, tuple(entry["metrics"]))
+        ]
+    return []
+
+
+class AllocatedSizes:
+    """Allocated sizes (GiB) for the allocated_size_property collector.
+
+    prefetch() reads the size property of every registered type in one
+    subscription or resource group through Resource Graph; get() answers
+    from those rows and falls back to one get_by_id call for anything the
+    projection did not return (Resource Graph trails ARM by a few minutes).
+    """
+
+    def __init__(self, resource_client: Any) -> None:
+        self.resource_client = resource_client
+        self._sizes: dict[str, Any] = {}
+
+    def get(self, resource: Any, entry: dict[str, Any]) -> Any:
+        key = resource.id.lower()
+        if key in self._sizes:
+            return self._sizes[key]
+        full_resource = self.resource_client.resources.get_by_id(
+            resource.id, entry["api_version"]
+        )
+        return (full_resource.properties or {}).get(entry["size_property"])
+
+    def prefetch(
+        self,
+        credential: Any,
+        subscription_id: str,
+        resource_group_name: str | None = None,
+    ) -> None:
+        types_by_property: dict[str, list[str]] = defaultdict(list)
+        for resource_type, entry in EGRESS_RESOURCE_REGISTRY.items():
+            if entry["strategy"] == "allocated_size_property":
+                types_by_property[entry["size_property"]].append(resource_type)
+
+        for size_property, resource_types in types_by_property.items():
+            query = ALLOCATED_SIZE_QUERY.format(
+                types=", ".join(
+                    f"'{resource_type}'" for resource_type in resource_types
+                ),
+                where=resource_graph_filter(resource_group_name),
+                size_property=size_property,
+            )
+            try:
+                for page in query_resource_graph(credential, subscription_id, query):
+                    for row in page:
+                        self._sizes[row["id"].lower()] = row.get("size")
+            except (AzureError, requests.RequestException, KeyError, ValueError) as e:
+                # Whatever was not read here is fetched one by one instead.
+                logger.debug("Allocated size query failed: %s", str(e))
+        logger.debug("Prefetched allocated sizes of %d resources", len(self._sizes))
 
 
 def _metric_total(
@@ -177,16 +441,22 @@ def _unknown_size_finding(resource: Any) -> dict[str, str]:
     }
 
 
+def _archive_flag(archive_bytes: int) -> str:
+    return f"Archive: {format_bytes(archive_bytes)} (rehydration required)"
+
+
 def _collect_storage_account(
-    credential: Any, resource_client: Any, resource: Any, entry: dict[str, Any]
+    metrics: MonitorMetrics,
+    sizes: AllocatedSizes,
+    resource: Any,
+    entry: dict[str, Any],
 ) -> dict[str, Any]:
     row = _base_row(resource, entry)
 
-    account_metrics = fetch_monitor_metrics(credential, resource.id, ["UsedCapacity"])
+    account_metrics = metrics.get(resource.id, ["UsedCapacity"])
     used_capacity = _metric_total(account_metrics, "UsedCapacity")
 
-    blob_metrics = fetch_monitor_metrics(
-        credential,
+    blob_metrics = metrics.get(
         f"{resource.id}/blobServices/default",
         ["BlobCapacity"],
         dimension="Tier",
@@ -205,9 +475,7 @@ def _collect_storage_account(
 
     archive_bytes = tier_bytes.get("Archive", 0)
     if archive_bytes:
-        row["flags"].append(
-            f"Archive: {format_bytes(archive_bytes)} (rehydration required)"
-        )
+        row["flags"].append(_archive_flag(archive_bytes))
 
     sku_name = getattr(getattr(resource, "sku", None), "name", None)
     if sku_name and any(geo in sku_name.upper() for geo in ("GRS", "GZRS")):
@@ -231,15 +499,15 @@ def _collect_storage_account(
 
 
 def _collect_allocated_size(
-    credential: Any, resource_client: Any, resource: Any, entry: dict[str, Any]
+    metrics: MonitorMetrics,
+    sizes: AllocatedSizes,
+    resource: Any,
+    entry: dict[str, Any],
 ) -> dict[str, Any]:
     row = _base_row(resource, entry)
     row["flags"].append("allocated (upper bound)")
 
-    full_resource = resource_client.resources.get_by_id(
-        resource.id, entry["api_version"]
-    )
-    size_gb = (full_resource.properties or {}).get(entry["size_property"])
+    size_gb = sizes.get(resource, entry)
     if size_gb:
         row["size_bytes"] = int(size_gb) * GIB
     else:
@@ -249,15 +517,18 @@ def _collect_allocated_size(
 
 
 def _collect_monitor_metric(
-    credential: Any, resource_client: Any, resource: Any, entry: dict[str, Any]
+    metrics: MonitorMetrics,
+    sizes: AllocatedSizes,
+    resource: Any,
+    entry: dict[str, Any],
 ) -> dict[str, Any]:
     row = _base_row(resource, entry)
 
-    metrics = fetch_monitor_metrics(credential, resource.id, entry["metrics"])
+    resource_metrics = metrics.get(resource.id, entry["metrics"])
     values = [
         total
         for name in entry["metrics"]
-        if (total := _metric_total(metrics, name)) is not None
+        if (total := _metric_total(resource_metrics, name)) is not None
     ]
     if values:
         row["size_bytes"] = int(sum(values))
@@ -268,7 +539,10 @@ def _collect_monitor_metric(
 
 
 def _collect_vault(
-    credential: Any, resource_client: Any, resource: Any, entry: dict[str, Any]
+    metrics: MonitorMetrics,
+    sizes: AllocatedSizes,
+    resource: Any,
+    entry: dict[str, Any],
 ) -> dict[str, Any]:
     row = _base_row(resource, entry)
     row["flags"].append("backup vault – not sized")
@@ -291,14 +565,23 @@ _STRATEGY_COLLECTORS = {
 
 
 def build_egress_inventory(
-    credential: Any, resource_client: Any, resources: list[Any]
+    credential: Any,
+    resource_client: Any,
+    resources: list[Any],
+    metrics: MonitorMetrics | None = None,
+    sizes: AllocatedSizes | None = None,
 ) -> tuple[list[dict[str, Any]], list[dict[str, str]]]:
+    # Without prefetched lookups, everything is fetched per resource.
+    if metrics is None:
+        metrics = MonitorMetrics(credential)
+    if sizes is None:
+        sizes = AllocatedSizes(resource_client)
     rows = []
     findings = []
     for resource, entry in filter_data_bearing_resources(resources):
         collector = _STRATEGY_COLLECTORS[entry["strategy"]]
         try:
-            row = collector(credential, resource_client, resource, entry)
+            row = collector(metrics, sizes, resource, entry)
         except Exception as e:
             logger.debug(
                 "Egress sizing failed for %s: %s", resource.id, str(e), exc_info=True
@@ -321,18 +604,55 @@ def build_egress_inventory(
 def collect_azure_egress(
     provider_details: dict[str, Any],
 ) -> tuple[list[dict[str, Any]], set[str]]:
-    credential = provider_details.get("credential") or ClientSecretCredential(
-        tenant_id=provider_details["tenantId"],
-        client_id=provider_details["clientId"],
-        client_secret=provider_details["clientSecret"],
-    )
+    credential = azure_credential(provider_details)
     subscription_id = provider_details["subscriptionId"]
     resource_group_name = provider_details["resourceGroupName"]
 
     resource_client = ResourceManagementClient(credential, subscription_id)
-    resources = list(
-        resource_client.resources.list_by_resource_group(resource_group_name)
-    )
+    # The listing Stage 3 already made is reused; only sizing calls remain.
+    resources = take_resource_snapshot(provider_details)
+    if resources is None:
+        resources = list_resource_group(
+            resource_client,
+            resource_group_name,
+            response_cache(provider_details, subscription_id),
+        )
+
+    matched = filter_data_bearing_resources(resources)
+    sizes = AllocatedSizes(resource_client)
+    if any(entry["strategy"] == "allocated_size_property" for _, entry in matched):
+        sizes.prefetch(credential, subscription_id, resource_group_name)
 
-    rows, _ = build_egress_inventory(credential, resource_client, resources)
+    with requests.Session() as session:
+        session.mount(
+            "https://",
+            requests.adapters.HTTPAdapter(pool_maxsize=METRICS_BATCH_WORKERS),
+        )
+        metrics = MonitorMetrics(credential, session)
+        metrics.prefetch(
+            [
+                query
+                for resource, entry in matched
+                for query in metrics_queries(resource, entry)
+            ]
+        )
+        rows, _ = build_egress_inventory(
+            credential, resource_client, resources, metrics, sizes
+        )
+
+    # Storage accounts without capacity datapoints are sized from their
+    # Blob Inventory, when one is given.
+    inventories = provider_details.get("egressInventory")
+    if inventories and any(row["size_unknown"] for row in rows):
+        fill_unknown_sizes(
+            rows,
+            read_inventories(
+                inventories,
+                lambda location: read_blob_inventory(location, credential),
+            ),
+            "Microsoft.Storage/storageAccounts",
+            "Blob Inventory",
+            ARCHIVE_TIERS,
+            _archive_flag,
+        )
     return rows, ARCHIVE_TIERS
@@ -0,0 +1,362 @@
+# core/utils_egress_inventory.py
+import csv
+import gzip
+import io
+import json
+import logging
+import os
+import re
+import shutil
+import tempfile
+from collections import defaultdict
+from collections.abc import Callable, Iterator
+from contextlib import closing, contextmanager
+from typing import IO, Any
+from urllib.parse import urlparse
+
+import requests
+from botocore.exceptions import BotoCoreError, ClientError
+
+logger = logging.getLogger("core.engine.egress")
+
+# Bytes per bucket (S3) or storage account (Azure), then per tier.
+InventorySizes = dict[str, dict[str, int]]
+
+S3_INVENTORY_STORAGE_CLASS_TIERS = {
+    "STANDARD": "Standard",
+    "REDUCED_REDUNDANCY": "Standard",
+    "EXPRESS_ONEZONE": "Standard",
+    "STANDARD_IA": "Standard-IA",
+    "ONEZONE_IA": "One Zone-IA",
+    "INTELLIGENT_TIERING": "Intelligent-Tiering",
+    "GLACIER_IR": "Glacier Instant Retrieval",
+    "GLACIER": "Glacier",
+    "DEEP_ARCHIVE": "Deep Archive",
+}
+# Intelligent-Tiering objects in the opt-in archive tiers need a restore,
+# like the matching CloudWatch storage types.
+S3_INTELLIGENT_TIERING_TIERS = {
+    "ARCHIVE": "Archive",
+    "DEEP_ARCHIVE": "Deep Archive",
+}
+# ORC and Parquet column names; the CSV fileSchema spells them in CamelCase.
+S3_INVENTORY_FIELDS = (
+    "storage_class",
+    "intelligent_tiering_access_tier",
+    "is_delete_marker",
+)
+S3_INVENTORY_SIZE_FIELD = "size"
+
+BLOB_INVENTORY_FIELDS = ("AccessTier", "Deleted")
+BLOB_INVENTORY_SIZE_FIELD = "Content-Length"
+BLOB_STORAGE_SCOPE = "https://storage.azure.com/.default"
+BLOB_API_VERSION = "2021-08-06"
+
+
+def _pyarrow() -> Any:
+    # Only ORC and Parquet inventories need pyarrow, so it is not a
+    # requirement of the CLI.
+    try:
+        import pyarrow
+        import pyarrow.compute
+        import pyarrow.orc
+        import pyarrow.parquet
+    except ImportError as e:
+        raise RuntimeError(
+            "Reading ORC or Parquet inventory files requires pyarrow "
+            "(pip install pyarrow)."
+        ) from e
+    return pyarrow
+
+
+def _snake_case(name: str) -> str:
+    return re.sub(r"(?<!^)(?=[A-Z])", "_", name.strip()).lower()
+
+
+def _local_file(manifest_path: str, key: str) -> str:
+    # Inventory files are listed by their key in the destination bucket or
+    # container; a local copy keeps that layout around the manifest.
+    directory = os.path.dirname(os.path.abspath(manifest_path))
+    while True:
+        candidate = os.path.join(directory, key)
+        if os.path.exists(candidate):
+            return candidate
+        parent = os.path.dirname(directory)
+        if parent == directory:
+            raise FileNotFoundError(
+                f"Inventory file {key} not found near {manifest_path}"
+            )
+        directory = parent
+
+
+@contextmanager
+def _seekable(stream: IO[bytes]) -> Iterator[IO[bytes]]:
+    seekable = getattr(stream, "seekable", None)
+    if seekable is not None and seekable():
+        yield stream
+        return
+    # ORC and Parquet keep their footer at the end: a download is spooled
+    # to disk, never held in memory.
+    with tempfile.TemporaryFile() as spooled:
+        shutil.copyfileobj(stream, spooled)
+        spooled.seek(0)
+        yield spooled
+
+
+def _csv_groups(
+    stream: IO[bytes],
+    file_name: str,
+    fields: tuple[str, ...],
+    size_field: str,
+    columns: list[str] | None,
+) -> Iterator[tuple[tuple, int]]:
+    if file_name.endswith(".gz"):
+        stream = gzip.GzipFile(fileobj=stream)
+    reader = csv.reader(io.TextIOWrapper(stream, encoding="utf-8", newline=""))
+    if columns is None:
+        columns = next(reader, [])
+    positions = {name: index for index, name in enumerate(columns)}
+    size_position = positions[size_field]
+    field_positions = [positions.get(field) for field in fields]
+    for record in reader:
+        size = record[size_position]
+        yield (
+            tuple(
+                record[position] if position is not None else None
+                for position in field_positions
+            ),
+            int(size) if size else 0,
+        )
+
+
+def _columnar_groups(
+    stream: IO[bytes],
+    file_format: str,
+    fields: tuple[str, ...],
+    size_field: str,
+) -> Iterator[tuple[tuple, int]]:
+    pyarrow = _pyarrow()
+    with _seekable(stream) as source:
+        if file_format == "parquet":
+            reader = pyarrow.parquet.ParquetFile(source)
+            names = reader.schema_arrow.names
+            present = [field for field in fields if field in names]
+            batches = reader.iter_batches(columns=[*present, size_field])
+        else:
+            reader = pyarrow.orc.ORCFile(source)
+            present = [field for field in fields if field in reader.schema.names]
+            batches = (
+                reader.read_stripe(index, columns=[*present, size_field])
+                for index in range(reader.nstripes)
+            )
+        # Objects are summed per batch by pyarrow; only the groups reach
+        # Python.
+        for batch in batches:
+            table = pyarrow.Table.from_batches([batch])
+            if not present:
+                total = pyarrow.compute.sum(table[size_field]).as_py()
+                yield (None,) * len(fields), int(total or 0)
+                continue
+            grouped = table.group_by(present).aggregate([(size_field, "sum")])
+            for group in grouped.to_pylist():
+                yield (
+                    tuple(group.get(field) for field in fields),
+                    int(group[f"{size_field}_sum"] or 0),
+                )
+
+
+def _groups(
+    stream: IO[bytes],
+    file_name: str,
+    file_format: str,
+    fields: tuple[str, ...],
+    size_field: str,
+    columns: list[str] | None = None,
+) -> Iterator[tuple[tuple, int]]:
+    """(field values, bytes) of one inventory file, read as a stream."""
+    if file_format == "csv":
+        return _csv_groups(stream, file_name, fields, size_field, columns)
+    if file_format in ("parquet", "orc"):
+        return _columnar_groups(stream, file_format, fields, size_field)
+    raise ValueError(f"Unsupported inventory format: {file_format}")
+
+
+def _is_true(value: Any) -> bool:
+    return str(value).strip().lower() == "true"
+
+
+def _s3_tier(storage_class: str | None, access_tier: str | None) -> str:
+    if not storage_class:
+        return "Unknown"
+    if storage_class == "INTELLIGENT_TIERING" and access_tier:
+        tier = S3_INTELLIGENT_TIERING_TIERS.get(access_tier)
+        if tier:
+            return tier
+    return S3_INVENTORY_STORAGE_CLASS_TIERS.get(storage_class, storage_class)
+
+
+def read_s3_inventory(location: str, s3_client: Any = None) -> InventorySizes:
+    """Bytes per tier of the bucket an S3 Inventory manifest.json covers.
+
+    `location` is a local manifest.json, next to its data files in the
+    destination bucket's layout, or an s3:// URL read with `s3_client`.
+    CSV, ORC and Parquet inventories are streamed file by file.
+    """
+    if location.startswith("s3://"):
+        bucket, _, key = location[len("s3://") :].partition("/")
+        with closing(s3_client.get_object(Bucket=bucket, Key=key)["Body"]) as body:
+            manifest = json.load(body)
+        destination = manifest["destinationBucket"].split(":::")[-1]
+
+        def open_file(file_key: str) -> IO[bytes]:
+            return s3_client.get_object(Bucket=destination, Key=file_key)["Body"]
+
+    else:
+        with open(location, encoding="utf-8") as manifest_file:
+            manifest = json.load(manifest_file)
+
+        def open_file(file_key: str) -> IO[bytes]:
+            return open(_local_file(location, file_key), "rb")
+
+    file_format = manifest["fileFormat"].lower()
+    columns = None
+    if file_format == "csv":
+        columns = [_snake_case(name) for name in manifest["fileSchema"].split(",")]
+
+    tier_bytes: dict[str, int] = defaultdict(int)
+    for entry in manifest.get("files", []):
+        with closing(open_file(entry["key"])) as stream:
+            for (storage_class, access_tier, deleted), size in _groups(
+                stream,
+                entry["key"],
+                file_format,
+                S3_INVENTORY_FIELDS,
+                S3_INVENTORY_SIZE_FIELD,
+                columns,
+            ):
+                if size and not _is_true(deleted):
+                    tier_bytes[_s3_tier(storage_class, access_tier)] += size
+    return {manifest["sourceBucket"]: dict(tier_bytes)}
+
+
+def _blob_account(endpoint: str) -> str:
+    return urlparse(endpoint).hostname.split(".")[0]
+
+
+def read_blob_inventory(location: str, credential: Any = None) -> InventorySizes:
+    """Bytes per access tier of the storage account a Blob Inventory run covers.
+
+    `location` is a local <rule>-manifest.json, next to its data files in
+    the destination container's layout, or the https:// URL of one, read
+    with `credential` (Storage Blob Data Reader).
+    """
+    if location.startswith("https://"):
+        token = credential.get_token(BLOB_STORAGE_SCOPE)
+        headers = {
+            "Authorization": f"Bearer {token.token}",
+            "x-ms-version": BLOB_API_VERSION,
+        }
+        response = requests.get(location, headers=headers, timeout=60)
+        response.raise_for_status()
+        manifest = response.json()
+        container_url = (
+            f"{manifest['endpoint'].rstrip('/')}/{manifest['destinationContainer']}"
+        )
+
+        def open_file(blob: str) -> IO[bytes]:
+            response = requests.get(
+                f"{container_url}/{blob}", headers=headers, stream=True, timeout=60
+            )
+            response.raise_for_status()
+            response.raw.decode_content = True
+            return response.raw
+
+    else:
+        with open(location, encoding="utf-8") as manifest_file:
+            manifest = json.load(manifest_file)
+
+        def open_file(blob: str) -> IO[bytes]:
+            return open(_local_file(location, blob), "rb")
+
+    rule = manifest.get("ruleDefinition", {})
+    # The rule's enum values are spelled "Blob" / "Container" and "Csv" /
+    # "Parquet".
+    if rule.get("objectType", "blob").lower() != "blob":
+        raise ValueError(
+            f"Inventory rule {manifest.get('ruleName')} lists containers, not blobs."
+        )
+    file_format = rule.get("format", "csv").lower()
+
+    tier_bytes: dict[str, int] = defaultdict(int)
+    for entry in manifest.get("files", []):
+        with closing(open_file(entry["blob"])) as stream:
+            for (access_tier, deleted), size in _groups(
+                stream,
+                entry["blob"],
+                file_format,
+                BLOB_INVENTORY_FIELDS,
+                BLOB_INVENTORY_SIZE_FIELD,
+            ):
+                if size and not _is_true(deleted):
+                    tier_bytes[(access_tier or "Unknown").capitalize()] += size
+    return {_blob_account(manifest["endpoint"]): dict(tier_bytes)}
+
+
+def read_inventories(
+    locations: list[str], read: Callable[[str], InventorySizes]
+) -> InventorySizes:
+    """The sizes of every manifest in `locations`; unreadable ones are skipped."""
+    sizes: InventorySizes = {}
+    for location in locations:
+        try:
+            for name, tier_bytes in read(location).items():
+                merged = sizes.setdefault(name, {})
+                for tier, size in tier_bytes.items():
+                    merged[tier] = merged.get(tier, 0) + size
+        # Missing or unreadable files and manifests (OSError covers requests'
+        # errors), malformed content (ValueError covers json and pyarrow).
+        except (
+            OSError,
+            ValueError,
+            KeyError,
+            RuntimeError,
+            csv.Error,
+            BotoCoreError,
+            ClientError,
+        ) as e:
+            logger.warning("Skipping inventory %s: %s", location, str(e))
+    return sizes
+
+
+def fill_unknown_sizes(
+    rows: list[dict[str, Any]],
+    sizes: InventorySizes,
+    resource_type: str,
+    source: str,
+    archive_tiers: set[str],
+    archive_flag: Callable[[int], str],
+) -> int:
+    """Size the rows of `resource_type` that metrics left unknown, by name.
+
+    Returns the number of rows filled.
+    """
+    filled = 0
+    for row in rows:
+        tier_bytes = sizes.get(row["name"])
+        if (
+            tier_bytes is None
+            or not row["size_unknown"]
+            or row["type"].lower() != resource_type.lower()
+        ):
+            continue
+        row["size_bytes"] = sum(tier_bytes.values())
+        row["tier_bytes"] = dict(tier_bytes) or None
+        row["size_unknown"] = False
+        row["notes"].append(f"sized from {source}")
+        archive_bytes = sum(
+            size for tier, size in tier_bytes.items() if tier in archive_tiers
+        )
+        if archive_bytes:
+            row["flags"].append(archive_flag(archive_bytes))
+        filled += 1
+    return filled
@@ -380,9 +380,29 @@ def _build_scope_section(
                     "Secret Key",
                     anonymize_string(provider_details.get("secretKey", "N/A")),
                 ],
-                ["Region", provider_details.get("region", "N/A")],
             ]
         )
+        regions = provider_details.get("regions")
+        if regions == "all":
+            scope_data.append(["Region(s)", "All enabled regions"])
+        elif regions:
+            scope_data.append(["Region(s)", _join_scope_values(regions)])
+        else:
+            scope_data.append(["Region", provider_details.get("region", "N/A")])
+        org_role = provider_details.get("orgRole")
+        if org_role:
+            org_accounts = provider_details.get("orgAccounts")
+            scope_data.append(
+                [
+                    "Account(s)",
+                    (
+                        _join_scope_values(org_accounts)
+                        if org_accounts
+                        else "All active organization accounts"
+                    ),
+                ]
+            )
+            scope_data.append(["Member Role", org_role])
     else:
         scope_data.append(["N/A", "N/A"])
 
@@ -0,0 +1,80 @@
+# core/utils_rollup.py
+from collections import defaultdict
+
+from .utils_db import connect, load_data
+
+# The tables each scope of a fan-out run (an AWS member account, an Azure
+# subscription or resource group) fills. Everything else in assessment.db is
+# reference data, which only the rollup needs.
+SCOPE_TABLES = ("resource_inventory", "cost_inventory")
+
+
+def create_scope_db(
+    source_db_path: str, scope_db_path: str, reference_tables: tuple[str, ...] = ()
+) -> None:
+    """An assessment.db holding the SCOPE_TABLES schema.
+
+    reference_tables are copied with their rows, for builders that read
+    them from the assessment.db they write to.
+    """
+    tables = SCOPE_TABLES + reference_tables
+    with connect(source_db_path) as source:
+        statements = [
+            row[0]
+            for row in source.execute(
+                "SELECT sql FROM sqlite_master WHERE tbl_name IN "
+                f"({', '.join('?' * len(tables))}) AND sql IS NOT NULL",
+                tables,
+            )
+        ]
+    with connect(scope_db_path) as target:
+        for statement in statements:
+            target.execute(statement)
+        target.commit()
+        if reference_tables:
+            target.execute("ATTACH DATABASE ? AS source", (source_db_path,))
+            for table in reference_tables:
+                target.execute(f"INSERT INTO {table} SELECT * FROM source.{table}")
+            target.commit()
+            target.execute("DETACH DATABASE source")
+
+
+def rollup_resource_inventory(db_path: str, scope_db_paths: list[str]) -> None:
+    counts: dict[tuple[int, str], int] = defaultdict(int)
+    for scope_db_path in scope_db_paths:
+        for row in load_data("resource_inventory", scope_db_path):
+            counts[(row["resource_type"], row["location"])] += row["count"]
+
+    with connect(db_path) as conn:
+        conn.executemany(
+            """
+            INSERT INTO resource_inventory (resource_type, location, count)
+            VALUES (?, ?, ?)
+            ON CONFLICT(resource_type, location) DO UPDATE SET count = excluded.count
+            """,
+            [
+                (resource_type, location, count)
+                for (resource_type, location), count in counts.items()
+            ],
+        )
+
+
+def rollup_cost_inventory(db_path: str, scope_db_paths: list[str]) -> None:
+    costs: dict[str, float] = defaultdict(float)
+    currencies: dict[str, str] = {}
+    for scope_db_path in scope_db_paths:
+        for row in load_data("cost_inventory", scope_db_path):
+            costs[row["month"]] += row["cost"]
+            currencies[row["month"]] = row["currency"]
+
+    with connect(db_path) as conn:
+        conn.executemany(
+            """
+            INSERT INTO cost_inventory (month, cost, currency)
+            VALUES (?, ?, ?)
+            ON CONFLICT(month) DO UPDATE SET
+                cost = excluded.cost,
+                currency = excluded.currency
+            """,
+            [(month, cost, currencies[month]) for month, cost in costs.items()],
+        )
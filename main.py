@@ -9,6 +9,7 @@ import getpass
 import traceback
 from rich.console import Console
 from rich.logging import RichHandler
+from collections import Counter
 from datetime import datetime
 from botocore.exceptions import NoCredentialsError, ProfileNotFound
 from azure.identity import DefaultAzureCredential, ClientSecretCredential
@@ -24,6 +25,8 @@ from core.engine import (
     sync_assessment,
     generate_report,
 )
+from core.utils_azure import CachedTokenCredential, token_cache_options
+from core.utils_cache import RESPONSE_CACHE_DIR, RESPONSE_CACHE_TTL_HOURS
 from core.utils_egress import estimate_egress
 from core.utils_report_egress import (
     generate_egress_html_report,
@@ -50,6 +53,7 @@ from utils.utils import (
     print_step,
     require_env,
     require_env_int,
+    resume_directory,
 )
 from utils.validate import validate_region, validate_config
 from utils import codes
@@ -211,6 +215,179 @@ def _aws_provider_from_prompt() -> dict:
     }
 
 
+def _apply_aws_options(provider_details: dict, args) -> dict:
+    # Collection tuning flags travel in providerDetails so they reach the
+    # engine through the same path as config-file settings. An explicit flag
+    # wins over a value from --config.
+    jobs = getattr(args, "jobs", None)
+    if jobs is not None:
+        provider_details["jobs"] = jobs
+    regions = getattr(args, "regions", None)
+    if regions is not None:
+        provider_details["regions"] = regions
+    if getattr(args, "no_raw", False):
+        provider_details["rawData"] = False
+    org_role = getattr(args, "org_role", None)
+    if org_role is not None:
+        provider_details["orgRole"] = org_role
+    org_accounts = getattr(args, "org_accounts", None)
+    if org_accounts is not None:
+        provider_details["orgAccounts"] = org_accounts
+    org_parallel = getattr(args, "org_parallel", None)
+    if org_parallel is not None:
+        provider_details["orgParallel"] = org_parallel
+    resume = getattr(args, "resume", None)
+    if resume is not None:
+        provider_details["resumePath"] = resume
+    inventory_backend = getattr(args, "inventory_backend", None)
+    if inventory_backend is not None:
+        provider_details["inventoryBackend"] = inventory_backend
+    config_aggregator = getattr(args, "config_aggregator", None)
+    if config_aggregator is not None:
+        provider_details["configAggregator"] = config_aggregator
+    tags = getattr(args, "tag", None)
+    if tags:
+        provider_details["tags"] = dict(tags)
+    # Lets Stage 3 keep the listings Stage 7 will reuse instead of repeating
+    # those calls.
+    if getattr(args, "egress", False):
+        provider_details["egress"] = True
+    egress_inventory = getattr(args, "egress_inventory", None)
+    if egress_inventory:
+        provider_details["egressInventory"] = egress_inventory
+    if getattr(args, "snapshot_lineage", False):
+        provider_details["snapshotLineage"] = True
+    return _apply_cache_options(provider_details, args)
+
+
+def _apply_azure_options(provider_details: dict, args) -> dict:
+    inventory_backend = getattr(args, "inventory_backend", None)
+    if inventory_backend is not None:
+        provider_details["inventoryBackend"] = inventory_backend
+    if getattr(args, "raw", False):
+        provider_details["rawData"] = True
+    if getattr(args, "token_cache", False):
+        provider_details["tokenCache"] = True
+    # Lets Stage 3 keep the resource listing Stage 7 will reuse.
+    if getattr(args, "egress", False):
+        provider_details["egress"] = True
+    egress_inventory = getattr(args, "egress_inventory", None)
+    if egress_inventory:
+        provider_details["egressInventory"] = egress_inventory
+    resource_groups = getattr(args, "resource_groups", None)
+    if resource_groups is not None:
+        provider_details["resourceGroups"] = resource_groups
+    subscriptions = getattr(args, "subscriptions", None)
+    if subscriptions is not None:
+        provider_details["subscriptions"] = subscriptions
+    management_group = getattr(args, "management_group", None)
+    if management_group is not None:
+        provider_details["managementGroup"] = management_group
+    scope_parallel = getattr(args, "scope_parallel", None)
+    if scope_parallel is not None:
+        provider_details["scopeParallel"] = scope_parallel
+    return _apply_cache_options(provider_details, args)
+
+
+def _apply_cache_options(provider_details: dict, args) -> dict:
+    # The cache holds raw API responses, so it is only kept when asked for:
+    # --cache, --cache-dir or providerDetails.cacheDir. A state-file scan
+    # makes no API calls.
+    if "tfstatePath" in provider_details:
+        return provider_details
+    cache_dir = getattr(args, "cache_dir", None)
+    if cache_dir is not None:
+        provider_details["cacheDir"] = cache_dir
+    elif getattr(args, "cache", False):
+        provider_details.setdefault("cacheDir", RESPONSE_CACHE_DIR)
+    cache_ttl = getattr(args, "cache_ttl", None)
+    if cache_ttl is not None:
+        provider_details["cacheTtl"] = cache_ttl
+    if getattr(args, "refresh", False):
+        provider_details["refresh"] = True
+    return provider_details
+
+
+def _org_coverage_logs(coverage: dict) -> str | None:
+    # Organizations mode skips accounts whose role cannot be used rather than
+    # failing the run; say so, so a partial rollup is never mistaken for the
+    # whole organization.
+    failed = coverage.get("accounts_failed", 0)
+    if not failed:
+        return None
+    return (
+        f"Assessed {coverage['accounts_total'] - failed} of "
+        f"{coverage['accounts_total']} accounts; {failed} skipped. "
+        f"See raw_data/org_accounts.json."
+    )
+
+
+def _scope_coverage_logs(coverage: dict) -> str | None:
+    # Same rule for Azure scopes: a subscription or resource group that
+    # cannot be read is skipped, and the rollup says so.
+    failed = coverage.get("scopes_failed", 0)
+    if not failed:
+        return None
+    return (
+        f"Assessed {coverage['scopes_total'] - failed} of "
+        f"{coverage['scopes_total']} scopes; {failed} skipped. "
+        f"See raw_data/azure_scopes.json."
+    )
+
+
+def _skipped_operations_logs(coverage: dict) -> str | None:
+    # Operations a previous run found denied or unavailable are not retried
+    # until their negative cache entry expires; the details are in run.log.
+    skipped = coverage.get("operations_skipped") or []
+    if not skipped:
+        return None
+    reasons = Counter(entry["reason"] for entry in skipped)
+    summary = ", ".join(f"{reason} x{count}" for reason, count in reasons.most_common())
+    return (
+        f"Skipped {len(skipped)} operations that failed in an earlier run "
+        f"({summary}). Use --refresh to retry them; see run.log."
+    )
+
+
+def _unavailable_operations_logs(coverage: dict) -> str | None:
+    # Services without an endpoint in a region are not called there; with
+    # several regions that is expected, but the counts must not be read as
+    # complete for those services.
+    unavailable = coverage.get("operations_unavailable") or []
+    if not unavailable:
+        return None
+    regions = Counter(entry["region"] for entry in unavailable)
+    summary = ", ".join(f"{region} x{count}" for region, count in regions.most_common())
+    return (
+        f"Did not query {len(unavailable)} operations whose service is not "
+        f"available in the region ({summary})."
+    )
+
+
+def _parse_list(value: str) -> list[str]:
+    items = [item.strip() for item in value.split(",") if item.strip()]
+    if not items:
+        raise argparse.ArgumentTypeError("expected a comma-separated list")
+    return items
+
+
+def _parse_regions(value: str) -> str | list[str]:
+    # "all" is resolved against the account's enabled regions at run time.
+    if value.strip().lower() == "all":
+        return "all"
+    regions = [region.strip() for region in value.split(",") if region.strip()]
+    if not regions:
+        raise argparse.ArgumentTypeError("expected 'all' or a comma-separated list")
+    return regions
+
+
+def _parse_tag(value: str) -> tuple[str, str]:
+    key, separator, tag_value = value.partition("=")
+    if not separator or not key.strip():
+        raise argparse.ArgumentTypeError("expected KEY=VALUE")
+    return key.strip(), tag_value.strip()
+
+
 def handle_aws(args):
     cloud_provider = 2
 
@@ -230,6 +407,7 @@ def handle_aws(args):
             config["name"] = (
                 f"Exit Assessment {datetime.now().strftime('%Y%m%d_%H%M%S')}"
             )
+        _apply_aws_options(config.setdefault("providerDetails", {}), args)
 
         run_assessment(
             config,
@@ -262,6 +440,7 @@ def handle_aws(args):
     else:
         exit_strategy, assessment_type = prompt_required_inputs()
         provider_details = _aws_provider_from_prompt()
+    _apply_aws_options(provider_details, args)
 
     config = build_config(
         cloud_provider, exit_strategy, assessment_type, provider_details, args
@@ -297,7 +476,14 @@ def _azure_cli_credential() -> DefaultAzureCredential:
 
 def _azure_provider_noninteractive(args) -> dict:
     subscription_id = require_env("ESC_SUBSCRIPTION_ID", "Azure subscription ID")
-    resource_group = require_env("ESC_RESOURCE_GROUP", "Azure resource group")
+    # A scope flag names what to assess; ESC_RESOURCE_GROUP is then optional.
+    if any(
+        getattr(args, name, None)
+        for name in ("resource_groups", "subscriptions", "management_group")
+    ):
+        resource_group = os.environ.get("ESC_RESOURCE_GROUP", "").strip() or None
+    else:
+        resource_group = require_env("ESC_RESOURCE_GROUP", "Azure resource group")
     tenant_id = require_env("AZURE_TENANT_ID", "Azure tenant ID")
     client_id = os.environ.get("AZURE_CLIENT_ID", "").strip()
     client_secret = os.environ.get("AZURE_CLIENT_SECRET", "").strip()
@@ -315,6 +501,7 @@ def _azure_provider_noninteractive(args) -> dict:
                 tenant_id=tenant_id,
                 client_id=client_id,
                 client_secret=client_secret,
+                **token_cache_options(getattr(args, "token_cache", False)),
             )
         else:
             if not client_id:
@@ -328,8 +515,9 @@ def _azure_provider_noninteractive(args) -> dict:
         "credential": credential,
         "tenantId": tenant_id,
         "subscriptionId": subscription_id,
-        "resourceGroupName": resource_group,
     }
+    if resource_group:
+        provider_details["resourceGroupName"] = resource_group
     if client_id:
         provider_details["clientId"] = client_id
     if not args.cli and client_secret:
@@ -338,7 +526,9 @@ def _azure_provider_noninteractive(args) -> dict:
 
 
 def _azure_provider_from_cli() -> dict:
-    credential = _azure_cli_credential()
+    # Every `az` token request is a subprocess; share the tokens with the
+    # assessment instead of asking again for each client.
+    credential = CachedTokenCredential(_azure_cli_credential())
     try:
         tenant_id = input("Enter Azure Tenant ID: ").strip()
         subscription_client = SubscriptionClient(credential)
@@ -378,14 +568,19 @@ def _azure_provider_from_cli() -> dict:
     }
 
 
-def _azure_provider_from_prompt() -> dict:
+def _azure_provider_from_prompt(args) -> dict:
     tenant_id = input("Enter Azure Tenant ID: ").strip()
     client_id = input("Enter Service Principal / Client ID: ").strip()
     client_secret = getpass.getpass("Enter Client Secret (input hidden): ").strip()
 
     try:
-        credential = ClientSecretCredential(
-            tenant_id=tenant_id, client_id=client_id, client_secret=client_secret
+        credential = CachedTokenCredential(
+            ClientSecretCredential(
+                tenant_id=tenant_id,
+                client_id=client_id,
+                client_secret=client_secret,
+                **token_cache_options(getattr(args, "token_cache", False)),
+            )
         )
         subscription_client = SubscriptionClient(credential)
 
@@ -416,6 +611,7 @@ def _azure_provider_from_prompt() -> dict:
         raise ConfigError
 
     return {
+        "credential": credential,
         "tenantId": tenant_id,
         "clientId": client_id,
         "clientSecret": client_secret,
@@ -443,6 +639,7 @@ def handle_azure(args):
             config["name"] = (
                 f"Exit Assessment {datetime.now().strftime('%Y%m%d_%H%M%S')}"
             )
+        _apply_azure_options(config.setdefault("providerDetails", {}), args)
 
         run_assessment(
             config,
@@ -472,7 +669,8 @@ def handle_azure(args):
         exit_strategy, assessment_type = prompt_required_inputs()
     else:
         exit_strategy, assessment_type = prompt_required_inputs()
-        provider_details = _azure_provider_from_prompt()
+        provider_details = _azure_provider_from_prompt(args)
+    _apply_azure_options(provider_details, args)
 
     config = build_config(
         cloud_provider, exit_strategy, assessment_type, provider_details, args
@@ -503,7 +701,7 @@ def run_assessment(
         try:
             validate_config(config)
             print_step("Configuration successfully validated.", status="ok")
-        except ValueError as e:
+        except (TypeError, ValueError) as e:
             print_step("Configuration validation failed.", status="error", logs=str(e))
             sys.exit(codes.CONFIG)
 
@@ -533,11 +731,18 @@ def run_assessment(
                 )
                 config["assessmentType"] = 1
 
-        # Create directories
+        # Create directories, or pick up the report an interrupted run left
+        # behind (--resume)
+        resume_path = config["providerDetails"].get("resumePath")
         try:
-            report_path, raw_data_path = create_directory()
-            add_run_log_handler(report_path)
-            print_step("Directory successfully created.", status="ok")
+            if resume_path:
+                report_path, raw_data_path = resume_directory(resume_path)
+                add_run_log_handler(report_path)
+                print_step(f"Resuming report in {report_path}.", status="ok")
+            else:
+                report_path, raw_data_path = create_directory()
+                add_run_log_handler(report_path)
+                print_step("Directory successfully created.", status="ok")
         except RuntimeError as e:
             print_step("Directory creation failed.", status="error", logs=str(e))
             sys.exit(codes.CONFIG)
@@ -639,7 +844,23 @@ def run_assessment(
             # partially-assessed state cannot pass for a complete one.
             coverage = result.get("coverage") or {}
             excluded = coverage.get("instances_excluded_other_provider", 0)
-            if excluded:
+            coverage_logs = [
+                logs
+                for logs in (
+                    _org_coverage_logs(coverage),
+                    _scope_coverage_logs(coverage),
+                    _skipped_operations_logs(coverage),
+                    _unavailable_operations_logs(coverage),
+                )
+                if logs
+            ]
+            if coverage_logs:
+                print_step(
+                    f"Building resource inventory for {provider_name}...",
+                    status="warning",
+                    logs=" ".join(coverage_logs),
+                )
+            elif excluded:
                 print_step(
                     f"Building resource inventory for {provider_name}...",
                     status="warning",
@@ -683,7 +904,17 @@ def run_assessment(
                 )
 
             # Handle the result
-            if cost_result["success"]:
+            cost_coverage = cost_result.get("coverage") or {}
+            org_logs = _org_coverage_logs(cost_coverage) or _scope_coverage_logs(
+                cost_coverage
+            )
+            if cost_result["success"] and org_logs:
+                print_step(
+                    f"Building cost inventory for {provider_name}...",
+                    status="warning",
+                    logs=org_logs,
+                )
+            elif cost_result["success"]:
                 print_step(
                     f"Building cost inventory for {provider_name}...", status="ok"
                 )
@@ -912,7 +1143,14 @@ def parse_arguments():
             "  python3 main.py aws --config config.json --dry-run  # Local report + payload.json, no remote sync\n"
             "  python3 main.py azure --config config.json --dry-run\n"
             "  python3 main.py aws --config config.json --egress    # Estimate egress data volume\n"
+            "  python3 main.py aws --profile PROFILE --jobs 4       # Fewer parallel API workers\n"
+            "  python3 main.py aws --profile PROFILE --regions all  # Sweep every enabled region\n"
+            "  python3 main.py aws --profile PROFILE --resume reports/20260101120000\n"
+            "  python3 main.py aws --profile MGMT --org-role CloudExitReadOnly\n"
+            "  python3 main.py aws --profile PROFILE --regions all --inventory-backend config\n"
+            "  python3 main.py aws --profile PROFILE --tag app=payments\n"
             "  python3 main.py azure --config config.json --egress\n"
+            "  python3 main.py azure --cli --management-group landing-zones\n"
             "  python3 main.py aws --tfstate infra.tfstate          # Assess a Terraform/OpenTofu state file\n"
             "  python3 main.py azure --tfstate infra.tfstate --dry-run\n"
         ),
@@ -939,6 +1177,34 @@ def parse_arguments():
         default=0,
         help="Increase log verbosity (-v for INFO, -vv for DEBUG + third-party).",
     )
+    common.add_argument(
+        "--cache",
+        action="store_true",
+        help=(
+            "Keep cloud list responses in an on-disk cache in "
+            f"{RESPONSE_CACHE_DIR}/ and reuse them in later runs."
+        ),
+    )
+    common.add_argument(
+        "--cache-dir",
+        type=str,
+        metavar="DIR",
+        help="Like --cache, with the cache in DIR.",
+    )
+    common.add_argument(
+        "--cache-ttl",
+        type=float,
+        metavar="HOURS",
+        help=(
+            "How long cached responses are reused "
+            f"(default: {RESPONSE_CACHE_TTL_HOURS})."
+        ),
+    )
+    common.add_argument(
+        "--refresh",
+        action="store_true",
+        help="Ignore cached responses and query the cloud APIs again.",
+    )
 
     # Subparser for AWS
     aws_parser = subparsers.add_parser(
@@ -984,6 +1250,112 @@ def parse_arguments():
             "Estimate how much data lives in the region and " "would need to move out."
         ),
     )
+    aws_parser.add_argument(
+        "--egress-inventory",
+        action="append",
+        metavar="MANIFEST",
+        help=(
+            "S3 Inventory manifest.json (local path or s3:// URL) sizing buckets "
+            "that have no CloudWatch size datapoint. Repeat for several buckets."
+        ),
+    )
+    aws_parser.add_argument(
+        "--snapshot-lineage",
+        action="store_true",
+        help=(
+            "Size EBS snapshots by the blocks unique to each one along its "
+            "volume's lineage (EBS direct APIs) instead of by volume size."
+        ),
+    )
+    aws_parser.add_argument(
+        "--jobs",
+        type=int,
+        metavar="N",
+        help=(
+            "Number of parallel API workers for the resource inventory "
+            "(default: 8). Lower it if the account is being throttled."
+        ),
+    )
+    aws_parser.add_argument(
+        "--regions",
+        type=_parse_regions,
+        metavar="all|REGION[,REGION...]",
+        help=(
+            "Assess several regions in one run: 'all' enabled regions or a "
+            "comma-separated list. Global services are counted once."
+        ),
+    )
+    aws_parser.add_argument(
+        "--no-raw",
+        action="store_true",
+        help=(
+            "Only count resources; do not write the raw API responses to "
+            "raw_data/resource_inventory_raw_data.jsonl."
+        ),
+    )
+
+    aws_parser.add_argument(
+        "--resume",
+        type=str,
+        metavar="REPORT_DIR",
+        help=(
+            "Complete the report an interrupted run left in REPORT_DIR: "
+            "resource types already inventoried there are not listed again."
+        ),
+    )
+
+    aws_parser.add_argument(
+        "--org-role",
+        type=str,
+        metavar="ROLE",
+        help=(
+            "Assess every active account of the AWS Organization by assuming "
+            "this read-only role in each member account. Results are rolled "
+            "up into one report."
+        ),
+    )
+    aws_parser.add_argument(
+        "--org-accounts",
+        type=_parse_list,
+        metavar="ID[,ID...]",
+        help="With --org-role: only assess these member accounts.",
+    )
+    aws_parser.add_argument(
+        "--org-parallel",
+        type=int,
+        metavar="N",
+        help="With --org-role: accounts assessed at the same time (default: 4).",
+    )
+
+    aws_parser.add_argument(
+        "--inventory-backend",
+        choices=["api", "config"],
+        help=(
+            "How resources are counted: 'api' lists every resource type "
+            "(default); 'config' counts the types AWS Config records with one "
+            "query per region and lists only the rest."
+        ),
+    )
+    aws_parser.add_argument(
+        "--config-aggregator",
+        type=str,
+        metavar="NAME",
+        help=(
+            "With --inventory-backend config: query this AWS Config "
+            "aggregator in the home region instead of each region's recorder."
+        ),
+    )
+    aws_parser.add_argument(
+        "--tag",
+        type=_parse_tag,
+        action="append",
+        metavar="KEY=VALUE",
+        help=(
+            "Only assess resources carrying this tag (repeat to require "
+            "several). Resources are found through the Resource Groups "
+            "Tagging API instead of each service's API."
+        ),
+    )
 
     # Subparser for Azure
     azure_parser = subparsers.add_parser(
@@ -1030,6 +1402,72 @@ def parse_arguments():
             "would need to move out."
         ),
     )
+    azure_parser.add_argument(
+        "--egress-inventory",
+        action="append",
+        metavar="MANIFEST",
+        help=(
+            "Blob Inventory manifest (local path or https:// URL) sizing storage "
+            "accounts that have no capacity metric. Repeat for several accounts."
+        ),
+    )
+    azure_parser.add_argument(
+        "--inventory-backend",
+        choices=["api", "graph"],
+        help=(
+            "How resources are counted: 'api' lists the resource group "
+            "(default); 'graph' runs one summarized Azure Resource Graph query."
+        ),
+    )
+    azure_parser.add_argument(
+        "--raw",
+        action="store_true",
+        help=(
+            "With --inventory-backend graph: also stream every resource's id, "
+            "name, type, location, kind, sku and tags to raw_data."
+        ),
+    )
+    azure_parser.add_argument(
+        "--token-cache",
+        action="store_true",
+        help=(
+            "Keep service principal access tokens in the OS-protected MSAL "
+            "token cache, so later runs reuse them until they expire."
+        ),
+    )
+    azure_parser.add_argument(
+        "--resource-groups",
+        type=_parse_list,
+        metavar="NAME[,NAME...]",
+        help="Assess these resource groups of the subscription in one report.",
+    )
+    azure_parser.add_argument(
+        "--subscriptions",
+        type=_parse_list,
+        metavar="ID[,ID...]",
+        help=(
+            "Assess these subscriptions as a whole, every resource group "
+            "included, in one report."
+        ),
+    )
+    azure_parser.add_argument(
+        "--management-group",
+        type=str,
+        metavar="ID",
+        help=(
+            "Assess every subscription under this management group, nested "
+            "groups included, in one report."
+        ),
+    )
+    azure_parser.add_argument(
+        "--scope-parallel",
+        type=int,
+        metavar="N",
+        help=(
+            "With --resource-groups, --subscriptions or --management-group: "
+            "scopes assessed at the same time (default: 4)."
+        ),
+    )
 
     return parser.parse_args()
 
@@ -258,6 +258,24 @@ class BuildTfstateScopeSectionTests(unittest.TestCase):
         self.assertEqual(list(rows), ["Access Key", "Secret Key", "Region"])
         self.assertEqual(rows["Region"], "eu-central-1")
 
+    def test_multi_region_run_lists_swept_regions(self):
+        provider_details = {
+            **self.fixture["provider_details"],
+            "regions": ["eu-central-1", "eu-west-1", "us-east-1", "us-west-2"],
+        }
+        rows = self._rows(self.fixture["metadata"], provider_details, None)
+
+        self.assertEqual(list(rows), ["Access Key", "Secret Key", "Region(s)"])
+        self.assertEqual(
+            rows["Region(s)"], "eu-central-1, eu-west-1, us-east-1, +1 more"
+        )
+
+    def test_all_regions_run_is_labelled(self):
+        provider_details = {**self.fixture["provider_details"], "regions": "all"}
+        rows = self._rows(self.fixture["metadata"], provider_details, None)
+
+        self.assertEqual(rows["Region(s)"], "All enabled regions")
+
 
 class BuildCostSectionTests(unittest.TestCase):
     def setUp(self):
@@ -318,6 +318,118 @@ class RunAssessmentExitCodeTests(unittest.TestCase):
                 main.run_assessment(VALID_CONFIG.copy(), "aws")
         self.assertEqual(ctx.exception.code, codes.RISK_ASSESSMENT)
 
+    def test_resume_reuses_the_given_report_directory(self):
+        config = json.loads(json.dumps(VALID_CONFIG))
+        config["providerDetails"]["resumePath"] = "reports/20260101120000"
+        with (
+            patch("main.validate_config"),
+            patch("main.resolve_mode", return_value=("offline", None)),
+            patch(
+                "main.resume_directory",
+                return_value=("reports/20260101120000", "reports/20260101120000/raw"),
+            ) as mock_resume,
+            patch("main.create_directory") as mock_create,
+            patch("main.add_run_log_handler"),
+            patch("main.verify_credentials", return_value=(True, "ok")),
+            patch("main.test_permissions", return_value=(True, True, True, "ok")),
+            patch(
+                "main.create_resource_inventory",
+                return_value={"success": True, "logs": ""},
+            ) as mock_inventory,
+            patch(
+                "main.create_cost_inventory", return_value={"success": True, "logs": ""}
+            ),
+            patch(
+                "main.perform_risk_assessment",
+                return_value={"success": True, "logs": ""},
+            ),
+            patch(
+                "main.generate_report", return_value={"success": True, "reports": {}}
+            ),
+            patch("main.print_step"),
+            patch("main.console.print"),
+        ):
+            main.run_assessment(config, "aws")
+
+        mock_resume.assert_called_once_with("reports/20260101120000")
+        mock_create.assert_not_called()
+        self.assertEqual(mock_inventory.call_args.args[2], "reports/20260101120000")
+
+    def test_skipped_operations_downgrade_stage3_to_warning(self):
+        coverage = {
+            "operations_skipped": [
+                {"operation": "ce.a", "region": "r", "reason": "AccessDenied"},
+                {"operation": "ce.b", "region": "r", "reason": "AccessDenied"},
+                {"operation": "ce.c", "region": "r", "reason": "OptInRequired"},
+            ]
+        }
+        patches = _base_patches()
+        mocks = [p.start() for p in patches]
+        patch(
+            "main.create_resource_inventory",
+            return_value={"success": True, "logs": "", "coverage": coverage},
+        ).start()
+        patch("main.validate_config").start()
+        patch("main.add_run_log_handler").start()
+        try:
+            main.run_assessment(VALID_CONFIG.copy(), "aws")
+        finally:
+            patch.stopall()
+
+        print_step = mocks[1]
+        stage3 = [
+            call
+            for call in print_step.call_args_list
+            if call.args[0].startswith("Building resource inventory")
+        ]
+        self.assertEqual(stage3[0].kwargs["status"], "warning")
+        self.assertIn("Skipped 3 operations", stage3[0].kwargs["logs"])
+        self.assertIn("AccessDenied x2, OptInRequired x1", stage3[0].kwargs["logs"])
+
+    def test_unavailable_operations_are_reported_in_stage3(self):
+        coverage = {
+            "operations_skipped": [],
+            "operations_unavailable": [
+                {
+                    "operation": "appflow.list_flows",
+                    "region": "me-south-1",
+                    "reason": "not available in region",
+                },
+                {
+                    "operation": "kendra.list_indices",
+                    "region": "me-south-1",
+                    "reason": "not available in region",
+                },
+                {
+                    "operation": "kendra.list_indices",
+                    "region": "ap-east-1",
+                    "reason": "not available in region",
+                },
+            ],
+        }
+        patches = _base_patches()
+        mocks = [p.start() for p in patches]
+        patch(
+            "main.create_resource_inventory",
+            return_value={"success": True, "logs": "", "coverage": coverage},
+        ).start()
+        patch("main.validate_config").start()
+        patch("main.add_run_log_handler").start()
+        try:
+            main.run_assessment(VALID_CONFIG.copy(), "aws")
+        finally:
+            patch.stopall()
+
+        print_step = mocks[1]
+        stage3 = [
+            call
+            for call in print_step.call_args_list
+            if call.args[0].startswith("Building resource inventory")
+        ]
+        self.assertEqual(stage3[0].kwargs["status"], "warning")
+        self.assertIn("Did not query 3 operations", stage3[0].kwargs["logs"])
+        self.assertIn("me-south-1 x2, ap-east-1 x1", stage3[0].kwargs["logs"])
+
     def test_full_success_exits_0(self):
         with (
             patch("main.validate_config"),
@@ -494,6 +606,224 @@ class NonInteractiveAWSTests(unittest.TestCase):
             config_arg["providerDetails"]["sessionToken"], "sts-session-token"
         )
 
+    def test_jobs_flag_is_carried_in_provider_details(self):
+        with (
+            patch.dict(os.environ, self._BASE_ENV, clear=False),
+            patch("main.validate_region"),
+            patch("main.run_assessment") as mock_run,
+            patch("main.console.print"),
+        ):
+            main.handle_aws(_ni_aws_args(jobs=4))
+
+        config_arg = mock_run.call_args[0][0]
+        self.assertEqual(config_arg["providerDetails"]["jobs"], 4)
+
+    def test_jobs_flag_overrides_config_file_value(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            config_path = Path(tmp_dir) / "aws.json"
+            config = json.loads(json.dumps(VALID_CONFIG))
+            config["providerDetails"]["jobs"] = 2
+            config_path.write_text(json.dumps(config), encoding="utf-8")
+
+            with (
+                patch("main.run_assessment") as mock_run,
+                patch("main.console.print"),
+            ):
+                main.handle_aws(_ni_aws_args(config=str(config_path), jobs=12))
+
+        config_arg = mock_run.call_args[0][0]
+        self.assertEqual(config_arg["providerDetails"]["jobs"], 12)
+
+    def test_jobs_flag_parses_as_integer(self):
+        with patch("sys.argv", ["main.py", "aws", "--profile", "p", "--jobs", "3"]):
+            args = main.parse_arguments()
+        self.assertEqual(args.jobs, 3)
+
+    def test_regions_flag_parses_all_or_list(self):
+        with patch("sys.argv", ["main.py", "aws", "--regions", "ALL"]):
+            self.assertEqual(main.parse_arguments().regions, "all")
+        with patch(
+            "sys.argv", ["main.py", "aws", "--regions", "eu-west-1, us-east-1,"]
+        ):
+            self.assertEqual(main.parse_arguments().regions, ["eu-west-1", "us-east-1"])
+        with (
+            patch("sys.argv", ["main.py", "aws", "--regions", " , "]),
+            patch("sys.stderr"),
+            self.assertRaises(SystemExit),
+        ):
+            main.parse_arguments()
+
+    def test_regions_flag_is_carried_in_provider_details(self):
+        with (
+            patch.dict(os.environ, self._BASE_ENV, clear=False),
+            patch("main.validate_region"),
+            patch("main.run_assessment") as mock_run,
+            patch("main.console.print"),
+        ):
+            main.handle_aws(_ni_aws_args(regions="all"))
+
+        config_arg = mock_run.call_args[0][0]
+        self.assertEqual(config_arg["providerDetails"]["regions"], "all")
+        self.assertEqual(config_arg["providerDetails"]["region"], "eu-central-1")
+
+    def test_no_raw_flag_disables_raw_data(self):
+        with (
+            patch.dict(os.environ, self._BASE_ENV, clear=False),
+            patch("main.validate_region"),
+            patch("main.run_assessment") as mock_run,
+            patch("main.console.print"),
+        ):
+            main.handle_aws(_ni_aws_args(no_raw=True))
+
+        config_arg = mock_run.call_args[0][0]
+        self.assertIs(config_arg["providerDetails"]["rawData"], False)
+
+    def test_egress_flag_is_recorded_for_call_planning(self):
+        with (
+            patch.dict(os.environ, self._BASE_ENV, clear=False),
+            patch("main.validate_region"),
+            patch("main.run_assessment") as mock_run,
+            patch("main.console.print"),
+        ):
+            main.handle_aws(_ni_aws_args(egress=True))
+
+        config_arg = mock_run.call_args[0][0]
+        self.assertIs(config_arg["providerDetails"]["egress"], True)
+        self.assertIs(mock_run.call_args.kwargs["egress"], True)
+
+    def test_org_flags_are_carried_in_provider_details(self):
+        with (
+            patch.dict(os.environ, self._BASE_ENV, clear=False),
+            patch("main.validate_region"),
+            patch("main.run_assessment") as mock_run,
+            patch("main.console.print"),
+        ):
+            main.handle_aws(
+                _ni_aws_args(
+                    org_role="CloudExitReadOnly",
+                    org_accounts=["123456789012"],
+                    org_parallel=2,
+                )
+            )
+
+        provider_details = mock_run.call_args[0][0]["providerDetails"]
+        self.assertEqual(provider_details["orgRole"], "CloudExitReadOnly")
+        self.assertEqual(provider_details["orgAccounts"], ["123456789012"])
+        self.assertEqual(provider_details["orgParallel"], 2)
+
+    def test_resume_flag_is_carried_in_provider_details(self):
+        with (
+            patch.dict(os.environ, self._BASE_ENV, clear=False),
+            patch("main.validate_region"),
+            patch("main.run_assessment") as mock_run,
+            patch("main.console.print"),
+        ):
+            main.handle_aws(_ni_aws_args(resume="reports/20260101120000"))
+
+        config_arg = mock_run.call_args[0][0]
+        self.assertEqual(
+            config_arg["providerDetails"]["resumePath"], "reports/20260101120000"
+        )
+
+    def test_inventory_backend_flags_are_carried_in_provider_details(self):
+        with (
+            patch.dict(os.environ, self._BASE_ENV, clear=False),
+            patch("main.validate_region"),
+            patch("main.run_assessment") as mock_run,
+            patch("main.console.print"),
+        ):
+            main.handle_aws(
+                _ni_aws_args(inventory_backend="config", config_aggregator="org")
+            )
+
+        provider_details = mock_run.call_args[0][0]["providerDetails"]
+        self.assertEqual(provider_details["inventoryBackend"], "config")
+        self.assertEqual(provider_details["configAggregator"], "org")
+
+    def test_azure_inventory_backend_flags_are_carried_in_provider_details(self):
+        with patch(
+            "sys.argv",
+            ["main.py", "azure", "--inventory-backend", "graph", "--raw"],
+        ):
+            args = main.parse_arguments()
+
+        provider_details = main._apply_azure_options({}, args)
+
+        self.assertEqual(provider_details["inventoryBackend"], "graph")
+        self.assertTrue(provider_details["rawData"])
+
+    def test_tag_flags_are_carried_in_provider_details(self):
+        with patch(
+            "sys.argv",
+            ["main.py", "aws", "--tag", "app=payments", "--tag", "env = prod"],
+        ):
+            args = main.parse_arguments()
+
+        provider_details = main._apply_aws_options({}, args)
+
+        self.assertEqual(provider_details["tags"], {"app": "payments", "env": "prod"})
+
+    def test_egress_inventory_flags_are_carried_in_provider_details(self):
+        with patch(
+            "sys.argv",
+            [
+                "main.py",
+                "aws",
+                "--egress",
+                "--egress-inventory",
+                "s3://inventory/logs/manifest.json",
+                "--egress-inventory",
+                "web/manifest.json",
+            ],
+        ):
+            args = main.parse_arguments()
+
+        provider_details = main._apply_aws_options({}, args)
+
+        self.assertEqual(
+            provider_details["egressInventory"],
+            ["s3://inventory/logs/manifest.json", "web/manifest.json"],
+        )
+
+    def test_snapshot_lineage_flag_is_carried_in_provider_details(self):
+        with patch("sys.argv", ["main.py", "aws", "--egress", "--snapshot-lineage"]):
+            args = main.parse_arguments()
+
+        provider_details = main._apply_aws_options({}, args)
+
+        self.assertTrue(provider_details["snapshotLineage"])
+
+    def test_response_cache_is_opt_in(self):
+        with (
+            patch.dict(os.environ, self._BASE_ENV, clear=False),
+            patch("main.validate_region"),
+            patch("main.run_assessment") as mock_run,
+            patch("main.console.print"),
+        ):
+            main.handle_aws(_ni_aws_args())
+            main.handle_aws(_ni_aws_args(cache=True))
+            main.handle_aws(
+                _ni_aws_args(cache_dir="/tmp/c", cache_ttl=1.5, refresh=True)
+            )
+
+        off, default, custom = (
+            call.args[0]["providerDetails"] for call in mock_run.call_args_list
+        )
+        self.assertNotIn("cacheDir", off)
+        self.assertEqual(default["cacheDir"], "cache")
+        self.assertNotIn("refresh", default)
+        self.assertEqual(
+            (custom["cacheDir"], custom["cacheTtl"], custom["refresh"]),
+            ("/tmp/c", 1.5, True),
+        )
+
+    def test_org_accounts_flag_parses_list(self):
+        with patch(
+            "sys.argv",
+            ["main.py", "aws", "--org-role", "r", "--org-accounts", "1, 2,"],
+        ):
+            self.assertEqual(main.parse_arguments().org_accounts, ["1", "2"])
+
     def test_missing_exit_strategy_exits_config(self):
         env = {k: v for k, v in self._BASE_ENV.items() if k != "ESC_EXIT_STRATEGY"}
         with (
@@ -608,6 +938,42 @@ class NonInteractiveAzureTests(unittest.TestCase):
                 main.handle_azure(_ni_azure_args())
         self.assertEqual(ctx.exception.code, codes.CONFIG)
 
+    def test_scope_flags_make_the_resource_group_optional(self):
+        env = {k: v for k, v in self._BASE_ENV.items() if k != "ESC_RESOURCE_GROUP"}
+        with (
+            patch.dict(os.environ, env, clear=False),
+            patch("main.ClientSecretCredential"),
+            patch("main.run_assessment") as mock_run,
+            patch("main.console.print"),
+        ):
+            main.handle_azure(
+                _ni_azure_args(subscriptions=["sub-a", "sub-b"], scope_parallel=2)
+            )
+
+        provider_details = mock_run.call_args[0][0]["providerDetails"]
+        self.assertNotIn("resourceGroupName", provider_details)
+        self.assertEqual(provider_details["subscriptions"], ["sub-a", "sub-b"])
+        self.assertEqual(provider_details["scopeParallel"], 2)
+
+    def test_scope_flags_are_carried_in_provider_details(self):
+        with patch(
+            "sys.argv",
+            [
+                "main.py",
+                "azure",
+                "--resource-groups",
+                "rg-a, rg-b",
+                "--management-group",
+                "landing-zones",
+            ],
+        ):
+            args = main.parse_arguments()
+
+        provider_details = main._apply_azure_options({}, args)
+
+        self.assertEqual(provider_details["resourceGroups"], ["rg-a", "rg-b"])
+        self.assertEqual(provider_details["managementGroup"], "landing-zones")
+
 
 class EgressStageTests(unittest.TestCase):
     _ESTIMATE_OK = {
@@ -1,48 +1,192 @@
 # tests/test_utils_aws.py
+import json
 import logging
 import os
+import sqlite3
 import tempfile
 import unittest
-from datetime import date, datetime, timezone
+from datetime import UTC, date, datetime, timezone
+from typing import Any, ClassVar
 from unittest.mock import MagicMock, patch
 
+import boto3
 import botocore.exceptions
+from botocore.awsrequest import AWSResponse
+from botocore.config import Config
 
 from core.utils_aws import (
-    convert_datetime,
+    AWS_DEFAULT_JOBS,
+    CallPlan,
+    InventoryCheckpoints,
+    InventoryUnit,
+    RawDataWriter,
+    RequestScheduler,
+    TokenBucket,
+    assume_role_session,
+    aws_response_cache,
+    aws_session,
+    client_config,
+    compact_raw_data,
+    cost_filter,
+    count_resources,
     get_missing_months_aws,
+    iter_pages,
+    json_default,
+    operation_parameters,
     paginate,
     paginate_or_call,
+    resolve_aws_regions,
+    service_available,
+    store_call_plan,
+    take_call_plan,
 )
+from core.utils_cache import ResponseCache
 
 
-class ConvertDatetimeTests(unittest.TestCase):
-    def test_converts_datetime_in_flat_dict(self):
-        dt = datetime(2026, 1, 15, 12, 30, 0)
-        result = convert_datetime({"created": dt, "name": "test"})
-        self.assertEqual(result["created"], "2026-01-15T12:30:00")
-        self.assertEqual(result["name"], "test")
+class AwsResponseCacheTests(unittest.TestCase):
+    def test_runs_uncached_when_the_account_cannot_be_identified(self):
+        session = MagicMock()
+        session.client.return_value.get_caller_identity.side_effect = (
+            botocore.exceptions.EndpointConnectionError(endpoint_url="https://sts")
+        )
+
+        with self.assertLogs("core.engine.aws", "WARNING"):
+            cache = aws_response_cache(
+                session, {"region": "eu-west-1", "cacheDir": "unused"}
+            )
+
+        self.assertIsNone(cache)
+
+
+class JsonDefaultTests(unittest.TestCase):
+    def test_serialises_nested_datetimes_without_mutating_input(self):
+        created = datetime(2026, 1, 15, 12, 30, 0)
+        record = {"items": [{"ts": created, "name": "test"}], "day": date(2026, 3, 1)}
+
+        line = json.dumps(record, default=json_default)
+
+        self.assertEqual(
+            json.loads(line),
+            {
+                "items": [{"ts": "2026-01-15T12:30:00", "name": "test"}],
+                "day": "2026-03-01",
+            },
+        )
+        self.assertIs(record["items"][0]["ts"], created)
+
+    def test_rejects_unknown_types(self):
+        with self.assertRaises(TypeError):
+            json.dumps({"value": object()}, default=json_default)
+
+
+class IterPagesTests(unittest.TestCase):
+    def test_yields_one_list_per_page(self):
+        paginator = MagicMock()
+        paginator.paginate.return_value = iter([{"Items": [1, 2]}, {}, {"Items": [3]}])
+        client = MagicMock()
+        client.can_paginate.return_value = True
+        client.get_paginator.return_value = paginator
+
+        self.assertEqual(
+            list(iter_pages(client, "list_things", "Items")), [[1, 2], [], [3]]
+        )
+
+    def test_single_call_is_one_page(self):
+        client = MagicMock()
+        client.can_paginate.return_value = False
+        client.list_things.return_value = {"Items": ["a"]}
+
+        self.assertEqual(list(iter_pages(client, "list_things", "Items")), [["a"]])
+
+    def _ec2_client(self, paginable=True):
+        client = MagicMock()
+        client.meta.service_model.service_name = "ec2"
+        client.can_paginate.return_value = paginable
+        client.get_paginator.return_value.paginate.return_value = iter([])
+        client.describe_snapshots.return_value = {}
+        return client
+
+    def test_applies_operation_parameters_and_page_size(self):
+        client = self._ec2_client()
+
+        list(iter_pages(client, "describe_snapshots", "Snapshots"))
+
+        client.get_paginator.return_value.paginate.assert_called_once_with(
+            OwnerIds=["self"], PaginationConfig={"PageSize": 1000}
+        )
+
+    def test_caller_arguments_take_precedence(self):
+        client = self._ec2_client()
+
+        list(
+            iter_pages(
+                client,
+                "describe_snapshots",
+                "Snapshots",
+                OwnerIds=["123456789012"],
+                PaginationConfig={"PageSize": 5},
+            )
+        )
+
+        client.get_paginator.return_value.paginate.assert_called_once_with(
+            OwnerIds=["123456789012"], PaginationConfig={"PageSize": 5}
+        )
+
+    def test_single_call_gets_parameters_without_page_size(self):
+        client = self._ec2_client(paginable=False)
 
-    def test_converts_datetime_in_list(self):
-        dt = datetime(2026, 3, 1)
-        result = convert_datetime([dt, "keep"])
-        self.assertEqual(result[0], "2026-03-01T00:00:00")
-        self.assertEqual(result[1], "keep")
+        list(iter_pages(client, "describe_snapshots", "Snapshots"))
 
-    def test_converts_nested_datetime(self):
-        dt = datetime(2026, 6, 15)
-        result = convert_datetime({"items": [{"ts": dt}]})
-        self.assertEqual(result["items"][0]["ts"], "2026-06-15T00:00:00")
+        client.describe_snapshots.assert_called_once_with(OwnerIds=["self"])
 
-    def test_leaves_non_datetime_values_unchanged(self):
-        data = {"count": 5, "name": "ec2", "tags": ["a", "b"]}
-        result = convert_datetime(data)
-        self.assertEqual(result, {"count": 5, "name": "ec2", "tags": ["a", "b"]})
 
-    def test_handles_empty_structures(self):
-        self.assertEqual(convert_datetime({}), {})
-        self.assertEqual(convert_datetime([]), [])
-        self.assertIsNone(convert_datetime(None))
+class OperationParametersTests(unittest.TestCase):
+    def test_unknown_operation_has_no_parameters(self):
+        self.assertEqual(operation_parameters("ec2", "describe_vpcs"), ({}, None))
+
+    def test_returns_a_copy(self):
+        params, _ = operation_parameters("iam", "list_policies")
+        params["Scope"] = "All"
+
+        self.assertEqual(
+            operation_parameters("iam", "list_policies"), ({"Scope": "Local"}, 1000)
+        )
+
+
+class CountResourcesTests(unittest.TestCase):
+    def test_counts_pages_and_streams_each_one(self):
+        paginator = MagicMock()
+        paginator.paginate.return_value = iter(
+            [{"Items": [{"at": datetime(2026, 1, 1)}]}, {"Items": [{"id": 2}]}]
+        )
+        client = MagicMock()
+        client.can_paginate.return_value = True
+        client.get_paginator.return_value = paginator
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "raw.jsonl")
+            with RawDataWriter(path) as writer:
+                count = count_resources(
+                    client, "list_things", "Items", {"service": "svc"}, writer
+                )
+            with open(path, encoding="utf-8") as raw_file:
+                lines = [json.loads(line) for line in raw_file]
+
+        self.assertEqual(count, 2)
+        self.assertEqual(
+            lines,
+            [
+                {"service": "svc", "resources": [{"at": "2026-01-01T00:00:00"}]},
+                {"service": "svc", "resources": [{"id": 2}]},
+            ],
+        )
+
+    def test_counts_without_a_writer(self):
+        client = MagicMock()
+        client.can_paginate.return_value = False
+        client.list_things.return_value = {"Items": [1, 2, 3]}
+
+        self.assertEqual(count_resources(client, "list_things", "Items", {}, None), 3)
 
 
 class GetMissingMonthsAwsTests(unittest.TestCase):
@@ -183,6 +327,66 @@ class BuildAwsCostInventoryErrorTests(unittest.TestCase):
                 pass  # Expected: current code catches but does not re-raise sqlite3.Error
 
 
+class BuildAwsCostInventoryRegionFilterTests(unittest.TestCase):
+    @patch("core.utils_aws.connect")
+    @patch("core.utils_aws.boto3.Session")
+    def test_cost_filter_covers_every_swept_region(
+        self, mock_session_cls, mock_connect
+    ):
+        mock_ce = mock_session_cls.return_value.client.return_value
+        mock_ce.get_cost_and_usage.return_value = {"ResultsByTime": []}
+
+        from core.utils_aws import build_aws_cost_inventory
+
+        with tempfile.TemporaryDirectory() as tmp:
+            os.makedirs(os.path.join(tmp, "data"), exist_ok=True)
+            build_aws_cost_inventory(
+                2,
+                {
+                    "accessKey": "AK",
+                    "secretKey": "SK",
+                    "region": "us-east-1",
+                    "regions": ["us-east-1", "eu-west-1"],
+                },
+                tmp,
+                tmp,
+            )
+
+        kwargs = mock_ce.get_cost_and_usage.call_args.kwargs
+        self.assertEqual(
+            kwargs["Filter"],
+            {"Dimensions": {"Key": "REGION", "Values": ["us-east-1", "eu-west-1"]}},
+        )
+
+    def test_tag_scope_narrows_the_cost_filter(self):
+        self.assertEqual(
+            cost_filter(["eu-west-1"], {"app": "payments", "env": "prod"}),
+            {
+                "And": [
+                    {"Dimensions": {"Key": "REGION", "Values": ["eu-west-1"]}},
+                    {"Tags": {"Key": "app", "Values": ["payments"]}},
+                    {"Tags": {"Key": "env", "Values": ["prod"]}},
+                ]
+            },
+        )
+
+    def test_account_id_narrows_the_cost_filter_to_the_linked_account(self):
+        self.assertEqual(
+            cost_filter(["eu-west-1"], account_id="222222222222"),
+            {
+                "And": [
+                    {"Dimensions": {"Key": "REGION", "Values": ["eu-west-1"]}},
+                    {
+                        "Dimensions": {
+                            "Key": "LINKED_ACCOUNT",
+                            "Values": ["222222222222"],
+                        }
+                    },
+                ]
+            },
+        )
+
+
 class BuildAwsResourceInventoryErrorTests(unittest.TestCase):
     @patch("core.utils_aws.load_data")
     @patch("core.utils_aws.boto3.Session")
@@ -209,11 +413,11 @@ class BuildAwsResourceInventoryErrorTests(unittest.TestCase):
 
 class BuildAwsResourceInventoryPerServiceTests(unittest.TestCase):
     @patch("core.utils_aws.connect")
-    @patch("core.utils_aws.paginate_or_call")
+    @patch("core.utils_aws.iter_pages")
     @patch("core.utils_aws.boto3.Session")
     @patch("core.utils_aws.load_data")
     def test_failed_service_is_skipped_and_logged_at_debug(
-        self, mock_load_data, mock_session_cls, mock_poc, mock_connect
+        self, mock_load_data, mock_session_cls, mock_iter_pages, mock_connect
     ):
         mock_load_data.return_value = [
             {
@@ -231,14 +435,18 @@ class BuildAwsResourceInventoryPerServiceTests(unittest.TestCase):
                 "status": "t",
             },
         ]
+
         # First service raises (e.g. AccessDenied); second returns resources.
-        mock_poc.side_effect = [
-            botocore.exceptions.ClientError(
-                {"Error": {"Code": "AccessDenied", "Message": "no"}},
-                "DescribeInstances",
-            ),
-            [{"InstanceId": "i-1"}],
-        ]
+        # Keyed by operation: the workers may call in any order.
+        def pages_side_effect(client, operation_name, result_key):
+            if operation_name == "describe_instances":
+                raise botocore.exceptions.ClientError(
+                    {"Error": {"Code": "AccessDenied", "Message": "no"}},
+                    "DescribeInstances",
+                )
+            return iter([[{"InstanceId": "i-1"}]])
+
+        mock_iter_pages.side_effect = pages_side_effect
         mock_connect.return_value.__enter__.return_value = MagicMock()
 
         from core.utils_aws import build_aws_resource_inventory
@@ -258,7 +466,7 @@ class BuildAwsResourceInventoryPerServiceTests(unittest.TestCase):
                 )
 
         # Loop continued past the failing service to the next one.
-        self.assertEqual(mock_poc.call_count, 2)
+        self.assertEqual(mock_iter_pages.call_count, 2)
         # The failure was recorded at DEBUG, naming the failed service...
         self.assertTrue(
             any(
@@ -270,6 +478,821 @@ class BuildAwsResourceInventoryPerServiceTests(unittest.TestCase):
         self.assertFalse(any(r.levelno >= logging.WARNING for r in cm.records))
 
 
+def _named_client(service, **kwargs):
+    client = MagicMock(name=service)
+    client.meta.service_model.service_name = service
+    return client
+
+
+class _InventoryRunTestCase(unittest.TestCase):
+    _RESOURCE_TYPES: ClassVar[list[dict[str, Any]]] = [
+        {
+            "code": "AWS.ec2.describe_instances.Reservations",
+            "id": 1,
+            "name": "EC2",
+            "csp": 2,
+            "status": "t",
+        },
+        {
+            "code": "AWS.ec2.describe_volumes.Volumes",
+            "id": 2,
+            "name": "EBS",
+            "csp": 2,
+            "status": "t",
+        },
+        {
+            "code": "AWS.s3.list_buckets.Buckets",
+            "id": 3,
+            "name": "S3",
+            "csp": 2,
+            "status": "t",
+        },
+    ]
+
+    _RESULTS: ClassVar[dict[str, list[Any]]] = {
+        "describe_instances": [{"InstanceId": "i-1"}, {"InstanceId": "i-2"}],
+        "describe_volumes": [],
+        "list_buckets": [{"Name": "b-1"}],
+    }
+
+    def _run(self, provider_details, **kwargs):
+        with (
+            patch("core.utils_aws.load_data", return_value=self._RESOURCE_TYPES),
+            patch("core.utils_aws.boto3.Session") as mock_session_cls,
+            patch("core.utils_aws.iter_pages") as mock_iter_pages,
+            patch("core.utils_aws.connect") as mock_connect,
+            tempfile.TemporaryDirectory() as tmp,
+        ):
+            session = mock_session_cls.return_value
+            session.client.side_effect = _named_client
+            mock_iter_pages.side_effect = (
+                lambda client, operation_name, result_key, **kwargs: iter(
+                    [self._RESULTS[kwargs.get("TypeName", operation_name)]]
+                )
+            )
+            cursor = mock_connect.return_value.__enter__.return_value.cursor()
+
+            report_path = os.path.join(tmp, "report")
+            raw_data_path = os.path.join(tmp, "raw")
+            os.makedirs(os.path.join(report_path, "data"), exist_ok=True)
+            os.makedirs(raw_data_path, exist_ok=True)
+
+            from core.utils_aws import build_aws_resource_inventory
+
+            build_aws_resource_inventory(
+                2,
+                {"accessKey": "AK", "secretKey": "SK", "region": "us-east-1"}
+                | provider_details,
+                report_path,
+                raw_data_path,
+                **kwargs,
+            )
+            raw_file_path = os.path.join(
+                raw_data_path, "resource_inventory_raw_data.jsonl"
+            )
+            raw_data = None
+            if os.path.exists(raw_file_path):
+                # Workers append pages as they arrive; order is not significant.
+                with open(raw_file_path, encoding="utf-8") as raw_file:
+                    raw_data = sorted(
+                        (json.loads(line) for line in raw_file),
+                        key=lambda entry: (entry["operation"], entry["region"]),
+                    )
+
+        rows = [call.args[1] for call in cursor.execute.call_args_list]
+        return session, raw_data, rows
+
+
+class BuildAwsResourceInventoryConcurrencyTests(_InventoryRunTestCase):
+    def test_creates_one_client_per_service_with_sized_pool(self):
+        session, _, _ = self._run({"jobs": 16})
+
+        services = [call.args[0] for call in session.client.call_args_list]
+        self.assertEqual(services, ["ec2", "s3"])
+        config = session.client.call_args.kwargs["config"]
+        self.assertEqual(config.max_pool_connections, 16)
+        self.assertEqual(config.retries["mode"], "adaptive")
+
+    def test_raw_data_and_rows_match_sequential_run(self):
+        _, parallel_raw, parallel_rows = self._run({"jobs": 4})
+        _, sequential_raw, sequential_rows = self._run({"jobs": 1})
+
+        self.assertEqual(parallel_raw, sequential_raw)
+        self.assertEqual(
+            [entry["operation"] for entry in parallel_raw],
+            ["describe_instances", "describe_volumes", "list_buckets"],
+        )
+        # Empty results are kept in the raw data but never become a row.
+        self.assertEqual(parallel_rows, [(1, "us-east-1", 2), (3, "us-east-1", 1)])
+        self.assertEqual(parallel_rows, sequential_rows)
+
+    def test_no_raw_counts_without_writing_raw_data(self):
+        _, raw_data, rows = self._run({"rawData": False})
+
+        self.assertIsNone(raw_data)
+        self.assertEqual(rows, [(1, "us-east-1", 2), (3, "us-east-1", 1)])
+
+
+class BuildAwsResourceInventoryMultiRegionTests(_InventoryRunTestCase):
+    _RESOURCE_TYPES: ClassVar[list[dict[str, Any]]] = [
+        *_InventoryRunTestCase._RESOURCE_TYPES,
+        {
+            "code": "AWS.iam.list_roles.Roles",
+            "id": 4,
+            "name": "IAM",
+            "csp": 2,
+            "status": "t",
+        },
+    ]
+
+    _RESULTS: ClassVar[dict[str, list[Any]]] = {
+        **_InventoryRunTestCase._RESULTS,
+        "list_roles": [{"RoleName": "admin"}],
+    }
+
+    def test_regional_types_are_collected_per_region_and_globals_once(self):
+        session, raw_data, rows = self._run(
+            {"regions": ["us-east-1", "eu-west-1"], "jobs": 4}
+        )
+
+        clients = [
+            (call.args[0], call.kwargs["region_name"])
+            for call in session.client.call_args_list
+        ]
+        self.assertEqual(
+            clients,
+            [
+                ("ec2", "us-east-1"),
+                ("ec2", "eu-west-1"),
+                ("s3", "us-east-1"),
+                ("iam", "us-east-1"),
+            ],
+        )
+        self.assertEqual(
+            [(entry["operation"], entry["region"]) for entry in raw_data],
+            [
+                ("describe_instances", "eu-west-1"),
+                ("describe_instances", "us-east-1"),
+                ("describe_volumes", "eu-west-1"),
+                ("describe_volumes", "us-east-1"),
+                ("list_buckets", "us-east-1"),
+                ("list_roles", "us-east-1"),
+            ],
+        )
+        # One row per (resource_type, location); global services are not
+        # multiplied by the number of regions.
+        self.assertEqual(
+            rows,
+            [
+                (1, "us-east-1", 2),
+                (1, "eu-west-1", 2),
+                (3, "us-east-1", 1),
+                (4, "us-east-1", 1),
+            ],
+        )
+
+
+class ServiceAvailableTests(unittest.TestCase):
+    def test_endpoint_data_rules_out_regions_without_the_service(self):
+        self.assertTrue(service_available("ec2", "eu-central-2"))
+        self.assertFalse(service_available("apprunner", "eu-central-2"))
+
+    def test_global_services_and_unknown_regions_are_not_ruled_out(self):
+        self.assertTrue(service_available("iam", "eu-central-2"))
+        self.assertTrue(service_available("apprunner", "xx-future-1"))
+
+
+class BuildAwsResourceInventoryAvailabilityTests(_InventoryRunTestCase):
+    _RESOURCE_TYPES: ClassVar[list[dict[str, Any]]] = [
+        *_InventoryRunTestCase._RESOURCE_TYPES,
+        {
+            "code": "AWS.apprunner.list_services.ServiceSummaryList",
+            "id": 5,
+            "name": "App Runner",
+            "csp": 2,
+            "status": "t",
+        },
+    ]
+
+    _RESULTS: ClassVar[dict[str, list[Any]]] = {
+        **_InventoryRunTestCase._RESULTS,
+        "list_services": [{"ServiceName": "web"}],
+    }
+
+    def test_services_without_an_endpoint_in_the_region_are_not_called(self):
+        session, _, rows = self._run({"regions": ["eu-west-1", "eu-central-2"]})
+
+        clients = [
+            (call.args[0], call.kwargs["region_name"])
+            for call in session.client.call_args_list
+        ]
+        self.assertIn(("apprunner", "eu-west-1"), clients)
+        self.assertNotIn(("apprunner", "eu-central-2"), clients)
+        self.assertIn((5, "eu-west-1", 1), rows)
+        self.assertNotIn((5, "eu-central-2", 1), rows)
+
+
+class BuildAwsResourceInventoryCloudControlTests(_InventoryRunTestCase):
+    _RESOURCE_TYPES: ClassVar[list[dict[str, Any]]] = [
+        *_InventoryRunTestCase._RESOURCE_TYPES,
+        {
+            "code": "AWS::ApiGatewayV2::Api",
+            "id": 6,
+            "name": "API Gateway",
+            "csp": 2,
+            "status": "t",
+        },
+        {
+            "code": "AWS::IAM::OIDCProvider",
+            "id": 7,
+            "name": "IAM",
+            "csp": 2,
+            "status": "t",
+        },
+        {
+            "code": "AWS::S3::AccessPoint",
+            "id": 8,
+            "name": "S3 Access Point",
+            "csp": 2,
+            "status": "t",
+        },
+    ]
+
+    _RESULTS: ClassVar[dict[str, list[Any]]] = {
+        **_InventoryRunTestCase._RESULTS,
+        "AWS::ApiGatewayV2::Api": [{"Identifier": "a1"}, {"Identifier": "a2"}],
+        "AWS::IAM::OIDCProvider": [{"Identifier": "arn:aws:iam::1:oidc/x"}],
+        "AWS::S3::AccessPoint": [{"Identifier": "ap"}],
+    }
+
+    def test_cloudformation_types_are_listed_through_cloud_control(self):
+        _, raw_data, rows = self._run({"regions": ["us-east-1", "eu-west-1"]})
+
+        self.assertIn((6, "us-east-1", 2), rows)
+        self.assertIn((6, "eu-west-1", 2), rows)
+        # IAM is global: listed once, in the home region.
+        self.assertIn((7, "us-east-1", 1), rows)
+        self.assertNotIn((7, "eu-west-1", 1), rows)
+        # Access points are regional, though S3 buckets are not.
+        self.assertIn((8, "us-east-1", 1), rows)
+        self.assertIn((8, "eu-west-1", 1), rows)
+        self.assertIn(
+            {
+                "service": "cloudcontrol",
+                "operation": "list_resources:AWS::ApiGatewayV2::Api",
+                "region": "eu-west-1",
+                "resources": [{"Identifier": "a1"}, {"Identifier": "a2"}],
+            },
+            raw_data,
+        )
+
+    def test_unit_for_code(self):
+        self.assertEqual(
+            InventoryUnit.for_code("AWS::EKS::Nodegroup", "eu-west-1").params,
+            {"TypeName": "AWS::EKS::Nodegroup"},
+        )
+        self.assertEqual(
+            InventoryUnit.for_code("AWS.ec2.describe_volumes. Volumes", "eu-west-1"),
+            (
+                "AWS.ec2.describe_volumes. Volumes",
+                "ec2",
+                "describe_volumes",
+                "Volumes",
+                "eu-west-1",
+                None,
+            ),
+        )
+        self.assertIsNone(InventoryUnit.for_code("AWS::EKS", "eu-west-1"))
+        self.assertIsNone(InventoryUnit.for_code("Azure.compute", "eu-west-1"))
+
+
+class BuildAwsResourceInventoryPrecountedTests(_InventoryRunTestCase):
+    def test_precounted_types_are_not_listed_in_their_regions(self):
+        _, _, rows = self._run(
+            {"regions": ["us-east-1", "eu-west-1"]},
+            precounted={("AWS.ec2.describe_instances.Reservations", "eu-west-1")},
+        )
+
+        self.assertIn((1, "us-east-1", 2), rows)
+        self.assertNotIn((1, "eu-west-1", 2), rows)
+        self.assertIn((3, "us-east-1", 1), rows)
+
+
+class BuildAwsResourceInventoryCallPlanTests(_InventoryRunTestCase):
+    def test_egress_run_keeps_the_listings_stage_7_shares(self):
+        self._run({"accessKey": "AK-PLAN", "egress": True})
+
+        plan = take_call_plan({"accessKey": "AK-PLAN"})
+        self.assertIsNotNone(plan)
+        self.assertTrue(
+            plan.has_pages("ec2", "us-east-1", "describe_volumes", "Volumes")
+        )
+        self.assertTrue(plan.has_pages("s3", "us-east-1", "list_buckets", "Buckets"))
+        # Only the inventory needs instances, so that call was streamed.
+        self.assertFalse(
+            plan.has_pages("ec2", "us-east-1", "describe_instances", "Reservations")
+        )
+
+    def test_plans_of_accounts_sharing_an_access_key_stay_apart(self):
+        def member(account_id):
+            return {
+                "accessKey": "AK-ORG",
+                "accountId": account_id,
+                "roleArn": f"arn:aws:iam::{account_id}:role/CloudExitReadOnly",
+            }
+
+        first, second = CallPlan("us-east-1"), CallPlan("us-east-1")
+        store_call_plan(member("222222222222"), first)
+        store_call_plan(member("333333333333"), second)
+
+        self.assertIsNone(take_call_plan({"accessKey": "AK-ORG"}))
+        self.assertIs(take_call_plan(member("333333333333")), second)
+        self.assertIs(take_call_plan(member("222222222222")), first)
+
+    def test_no_plan_is_kept_without_egress(self):
+        self._run({"accessKey": "AK-NO-EGRESS"})
+
+        self.assertIsNone(take_call_plan({"accessKey": "AK-NO-EGRESS"}))
+
+
+class BuildAwsResourceInventoryFailureCacheTests(_InventoryRunTestCase):
+    def _build(self, cache_dir, fail):
+        listed = []
+
+        def pages(client, operation_name, result_key):
+            # A generator: a listing served from the cache is never iterated.
+            listed.append(operation_name)
+            if operation_name in fail:
+                raise fail[operation_name]
+            yield self._RESULTS[operation_name]
+
+        with (
+            patch("core.utils_aws.load_data", return_value=self._RESOURCE_TYPES),
+            patch("core.utils_aws.boto3.Session") as mock_session_cls,
+            patch("core.utils_aws.iter_pages", side_effect=pages),
+            patch("core.utils_aws.connect"),
+            patch("core.utils_aws.InventoryCheckpoints"),
+            tempfile.TemporaryDirectory() as tmp,
+        ):
+            mock_session_cls.return_value.client.side_effect = _named_client
+
+            from core.utils_aws import build_aws_resource_inventory
+
+            coverage = build_aws_resource_inventory(
+                2,
+                {
+                    "accessKey": "AK",
+                    "secretKey": "SK",
+                    "region": "us-east-1",
+                    "accountId": "111111111111",
+                    "cacheDir": cache_dir,
+                    "rawData": False,
+                },
+                tmp,
+                tmp,
+            )
+        return sorted(listed), coverage
+
+    def test_denied_operations_are_skipped_by_the_next_run(self):
+        denied = botocore.exceptions.ClientError(
+            {"Error": {"Code": "UnauthorizedOperation"}}, "DescribeVolumes"
+        )
+        with tempfile.TemporaryDirectory() as cache_dir:
+            first, first_coverage = self._build(
+                cache_dir,
+                {
+                    "describe_volumes": denied,
+                    # Transient failures are simply retried next time.
+                    "describe_instances": RuntimeError("connection reset"),
+                },
+            )
+            # list_buckets comes from the response cache on the second run.
+            second, coverage = self._build(cache_dir, {})
+
+        self.assertEqual(
+            first, ["describe_instances", "describe_volumes", "list_buckets"]
+        )
+        self.assertEqual(first_coverage["operations_skipped"], [])
+        self.assertEqual(second, ["describe_instances"])
+        self.assertEqual(
+            coverage["operations_skipped"],
+            [
+                {
+                    "operation": "ec2.describe_volumes",
+                    "region": "us-east-1",
+                    "reason": "UnauthorizedOperation",
+                }
+            ],
+        )
+
+
+class InventoryCheckpointsTests(unittest.TestCase):
+    def test_records_survive_a_new_instance(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            db_path = os.path.join(tmp, "assessment.db")
+            checkpoints = InventoryCheckpoints(db_path)
+            checkpoints.record("ec2", "describe_volumes", "eu-west-1", 3, 120)
+            checkpoints.record("ec2", "describe_volumes", "eu-west-1", 4, 240)
+
+            completed = InventoryCheckpoints(db_path).completed()
+
+        self.assertEqual(
+            completed, {("ec2", "describe_volumes", "eu-west-1"): (4, 240)}
+        )
+
+    def test_compaction_keeps_only_completed_units(self):
+        lines = [
+            {"service": "ec2", "operation": "describe_volumes", "region": "r1"},
+            {"service": "s3", "operation": "list_buckets", "region": "r1"},
+            {"service": "ec2", "operation": "describe_volumes", "region": "r1"},
+        ]
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "raw.jsonl")
+            with RawDataWriter(path) as writer:
+                for line in lines:
+                    writer.write(line)
+                end = writer.flush()
+            # A line torn by the crash, after the last checkpoint.
+            with open(path, "a", encoding="utf-8") as raw_file:
+                raw_file.write('{"service": "ec2", "oper')
+
+            compact_raw_data(path, {("ec2", "describe_volumes", "r1"): (2, end)})
+            with open(path, encoding="utf-8") as raw_file:
+                kept = [json.loads(line) for line in raw_file]
+
+        self.assertEqual(kept, [lines[0], lines[2]])
+
+
+class BuildAwsResourceInventoryResumeTests(_InventoryRunTestCase):
+    def _report(self, tmp):
+        report_path = os.path.join(tmp, "report")
+        raw_data_path = os.path.join(report_path, "raw_data")
+        os.makedirs(os.path.join(report_path, "data"))
+        os.makedirs(raw_data_path)
+        db_path = os.path.join(report_path, "data", "assessment.db")
+        with sqlite3.connect(db_path) as conn:
+            conn.execute(
+                "CREATE TABLE resource_inventory (resource_type INTEGER, "
+                "location TEXT, count INTEGER, UNIQUE(resource_type, location))"
+            )
+        return report_path, raw_data_path, db_path
+
+    def _build(self, report_path, raw_data_path, fail=()):
+        def pages(client, operation_name, result_key):
+            if operation_name in fail:
+                raise RuntimeError("ExpiredToken")
+            return iter([self._RESULTS[operation_name]])
+
+        with (
+            patch("core.utils_aws.load_data", return_value=self._RESOURCE_TYPES),
+            patch("core.utils_aws.boto3.Session") as mock_session_cls,
+            patch("core.utils_aws.iter_pages", side_effect=pages) as mock_pages,
+        ):
+            mock_session_cls.return_value.client.side_effect = _named_client
+
+            from core.utils_aws import build_aws_resource_inventory
+
+            build_aws_resource_inventory(
+                2,
+                {"accessKey": "AK", "secretKey": "SK", "region": "us-east-1"},
+                report_path,
+                raw_data_path,
+            )
+        return [call.args[1] for call in mock_pages.call_args_list]
+
+    def test_resumed_run_only_lists_the_missing_units(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            report_path, raw_data_path, db_path = self._report(tmp)
+
+            first = self._build(report_path, raw_data_path, fail={"list_buckets"})
+            resumed = self._build(report_path, raw_data_path)
+
+            with sqlite3.connect(db_path) as conn:
+                rows = sorted(conn.execute("SELECT * FROM resource_inventory"))
+            with open(
+                os.path.join(raw_data_path, "resource_inventory_raw_data.jsonl"),
+                encoding="utf-8",
+            ) as raw_file:
+                raw_operations = sorted(
+                    json.loads(line)["operation"] for line in raw_file
+                )
+
+        self.assertEqual(
+            sorted(first), ["describe_instances", "describe_volumes", "list_buckets"]
+        )
+        self.assertEqual(resumed, ["list_buckets"])
+        self.assertEqual(rows, [(1, "us-east-1", 2), (3, "us-east-1", 1)])
+        self.assertEqual(
+            raw_operations, ["describe_instances", "describe_volumes", "list_buckets"]
+        )
+
+
+class CallPlanTests(unittest.TestCase):
+    def _client(self, pages):
+        client = _named_client("ec2")
+        client.can_paginate.return_value = True
+        client.get_paginator.return_value.paginate.side_effect = lambda **kwargs: (
+            iter(pages)
+        )
+        return client
+
+    def test_cached_listing_is_reused_by_the_next_run(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            pages = [{"Snapshots": [{"StartTime": datetime(2026, 1, 1)}]}]
+            first_cache = ResponseCache(tmp, "111111111111")
+            self.addCleanup(first_cache.close)
+            first_client = self._client(pages)
+            first = list(
+                CallPlan("us-east-1", first_cache).iter_pages(
+                    first_client, "eu-west-1", "describe_snapshots", "Snapshots"
+                )
+            )
+
+            cache = ResponseCache(tmp, "111111111111")
+            self.addCleanup(cache.close)
+            client = self._client(pages)
+            second = list(
+                CallPlan("us-east-1", cache).iter_pages(
+                    client, "eu-west-1", "describe_snapshots", "Snapshots"
+                )
+            )
+
+        self.assertEqual(first, [[{"StartTime": datetime(2026, 1, 1)}]])
+        # Cached pages are stored as JSON, so datetimes come back as strings.
+        self.assertEqual(second, [[{"StartTime": "2026-01-01T00:00:00"}]])
+        client.get_paginator.assert_not_called()
+        self.assertEqual((cache.hits, cache.misses), (1, 0))
+
+    def test_shared_call_runs_once_for_every_consumer(self):
+        plan = CallPlan("us-east-1")
+        plan.add("inventory", "ec2", "eu-west-1", "describe_snapshots", "Snapshots")
+        # Same listing once the OwnerIds default is applied.
+        plan.add(
+            "egress",
+            "ec2",
+            "eu-west-1",
+            "describe_snapshots",
+            "Snapshots",
+            OwnerIds=["self"],
+        )
+        client = self._client([{"Snapshots": ["snap-1"]}, {"Snapshots": ["snap-2"]}])
+
+        first = list(
+            plan.iter_pages(client, "eu-west-1", "describe_snapshots", "Snapshots")
+        )
+        self.assertTrue(
+            plan.has_pages("ec2", "eu-west-1", "describe_snapshots", "Snapshots")
+        )
+        second = list(
+            plan.iter_pages(
+                client,
+                "eu-west-1",
+                "describe_snapshots",
+                "Snapshots",
+                OwnerIds=["self"],
+            )
+        )
+
+        self.assertEqual(first, [["snap-1"], ["snap-2"]])
+        self.assertEqual(second, first)
+        client.get_paginator.return_value.paginate.assert_called_once()
+        # The last consumer releases the pages.
+        self.assertFalse(
+            plan.has_pages("ec2", "eu-west-1", "describe_snapshots", "Snapshots")
+        )
+
+    def test_unplanned_call_streams_every_time(self):
+        plan = CallPlan("us-east-1")
+        client = self._client([{"Volumes": ["vol-1"]}])
+
+        for _ in range(2):
+            self.assertEqual(
+                list(
+                    plan.iter_pages(client, "us-east-1", "describe_volumes", "Volumes")
+                ),
+                [["vol-1"]],
+            )
+
+        self.assertEqual(client.get_paginator.return_value.paginate.call_count, 2)
+
+    def test_describe_merges_global_services_into_the_home_region(self):
+        plan = CallPlan("us-east-1")
+        plan.add("inventory", "s3", "us-east-1", "list_buckets", "Buckets")
+        plan.add("egress", "s3", "eu-west-1", "list_buckets", "Buckets")
+        plan.add("egress", "s3", "eu-central-1", "list_buckets", "Buckets")
+        plan.add("inventory", "ec2", "eu-west-1", "describe_snapshots", "Snapshots")
+
+        self.assertEqual(
+            plan.describe(),
+            [
+                "AWS call plan: 2 distinct calls, 1 shared between consumers",
+                (
+                    '  ec2.describe_snapshots.Snapshots [eu-west-1] {"OwnerIds": ["self"]}'
+                    " <- inventory"
+                ),
+                "  s3.list_buckets.Buckets [us-east-1] <- inventory, egress",
+            ],
+        )
+
+
+class TokenBucketTests(unittest.TestCase):
+    def test_throttling_halves_the_rate_down_to_a_floor(self):
+        bucket = TokenBucket(4.0)
+
+        bucket.throttled()
+        self.assertEqual(bucket.rate, 2.0)
+        for _ in range(10):
+            bucket.throttled()
+        self.assertEqual(bucket.rate, TokenBucket.MIN_RATE)
+
+    def test_successes_recover_up_to_the_table_rate(self):
+        bucket = TokenBucket(20.0)
+        bucket.throttled()
+
+        bucket.succeeded()
+        self.assertEqual(bucket.rate, 11.0)
+        for _ in range(20):
+            bucket.succeeded()
+        self.assertEqual(bucket.rate, 20.0)
+
+    @patch("core.utils_aws.time.sleep")
+    def test_acquire_waits_once_the_burst_is_spent(self, mock_sleep):
+        bucket = TokenBucket(2.0)
+        with patch("core.utils_aws.time.monotonic", return_value=0.0):
+            bucket._updated = 0.0
+            bucket.acquire()
+            bucket.acquire()
+            mock_sleep.assert_not_called()
+
+            mock_sleep.side_effect = lambda seconds: setattr(
+                bucket, "_tokens", bucket._tokens + seconds * bucket.rate
+            )
+            bucket.acquire()
+
+        mock_sleep.assert_called_once_with(0.5)
+
+
+class _RawBody:
+    def __init__(self, body):
+        self._body = body
+
+    def stream(self):
+        yield self._body
+
+
+class RequestSchedulerTests(unittest.TestCase):
+    _THROTTLED = (
+        b"<Response><Errors><Error><Code>RequestLimitExceeded</Code>"
+        b"<Message>Request limit exceeded.</Message></Error></Errors>"
+        b"<RequestID>1</RequestID></Response>"
+    )
+    _OK = (
+        b'<DescribeRegionsResponse xmlns="http://ec2.amazonaws.com/doc/2016-11-15/">'
+        b"<regionInfo/></DescribeRegionsResponse>"
+    )
+
+    def _client(self, scheduler, responses):
+        client = boto3.Session(
+            aws_access_key_id="AK", aws_secret_access_key="SK"
+        ).client(
+            "ec2",
+            region_name="eu-west-1",
+            config=Config(retries={"mode": "standard", "total_max_attempts": 1}),
+        )
+        scheduler.attach(client)
+        # Registered after the scheduler, so its token is taken first.
+        client.meta.events.register(
+            "before-send",
+            lambda request, **kwargs: self._response(request, responses.pop(0)),
+        )
+        return client
+
+    def _response(self, request, response):
+        status, body = response
+        return AWSResponse(request.url, status, {}, _RawBody(body))
+
+    def test_throttling_response_tightens_the_shared_bucket(self):
+        scheduler = RequestScheduler(rates={"ec2": 8.0})
+        client = self._client(scheduler, [(503, self._THROTTLED), (200, self._OK)])
+
+        with self.assertRaises(botocore.exceptions.ClientError):
+            client.describe_regions()
+        bucket = scheduler.bucket("ec2", "eu-west-1")
+        self.assertEqual(bucket.rate, 4.0)
+
+        client.describe_regions()
+        self.assertEqual(bucket.rate, 4.4)
+
+    def test_clients_of_a_service_and_region_share_one_bucket(self):
+        scheduler = RequestScheduler()
+
+        self.assertIs(
+            scheduler.bucket("ec2", "eu-west-1"), scheduler.bucket("ec2", "eu-west-1")
+        )
+        self.assertIsNot(
+            scheduler.bucket("ec2", "eu-west-1"), scheduler.bucket("ec2", "us-east-1")
+        )
+        self.assertEqual(scheduler.bucket("unknown", "eu-west-1").rate, 10.0)
+
+
+class ResolveAwsRegionsTests(unittest.TestCase):
+    def test_defaults_to_home_region(self):
+        session = MagicMock()
+
+        self.assertEqual(
+            resolve_aws_regions(session, {"region": "eu-central-1"}),
+            ["eu-central-1"],
+        )
+        session.client.assert_not_called()
+
+    def test_explicit_list_is_deduplicated_in_order(self):
+        regions = resolve_aws_regions(
+            MagicMock(),
+            {
+                "region": "eu-central-1",
+                "regions": ["us-east-1", "eu-west-1", "us-east-1"],
+            },
+        )
+
+        self.assertEqual(regions, ["us-east-1", "eu-west-1"])
+
+    def test_all_resolves_to_enabled_regions(self):
+        session = MagicMock()
+        session.client.return_value.describe_regions.return_value = {
+            "Regions": [{"RegionName": "us-east-1"}, {"RegionName": "eu-west-1"}]
+        }
+
+        regions = resolve_aws_regions(
+            session, {"region": "eu-central-1", "regions": "all"}
+        )
+
+        self.assertEqual(regions, ["eu-west-1", "us-east-1"])
+        session.client.return_value.describe_regions.assert_called_once_with()
+
+
+class ClientConfigTests(unittest.TestCase):
+    def test_pool_never_shrinks_below_botocore_default(self):
+        self.assertEqual(client_config(1).max_pool_connections, 10)
+        self.assertEqual(
+            client_config(AWS_DEFAULT_JOBS).max_pool_connections,
+            max(AWS_DEFAULT_JOBS, 10),
+        )
+
+    def test_keeps_adaptive_retries(self):
+        self.assertEqual(client_config(32).retries["max_attempts"], 8)
+
+
+class AwsSessionTests(unittest.TestCase):
+    _PROVIDER_DETAILS: ClassVar[dict[str, str]] = {
+        "accessKey": "AK",
+        "secretKey": "SK",
+        "region": "eu-central-1",
+    }
+
+    def test_assumed_role_credentials_come_from_sts(self):
+        session = MagicMock()
+        session.client.return_value.assume_role.return_value = {
+            "Credentials": {
+                "AccessKeyId": "ASIA_MEMBER",
+                "SecretAccessKey": "member-secret",
+                "SessionToken": "member-token",
+                "Expiration": datetime(2099, 1, 1, tzinfo=UTC),
+            }
+        }
+
+        assumed = assume_role_session(
+            session, "arn:aws:iam::222222222222:role/Audit", "eu-central-1"
+        )
+
+        credentials = assumed.get_credentials().get_frozen_credentials()
+        self.assertEqual(credentials.access_key, "ASIA_MEMBER")
+        self.assertEqual(credentials.token, "member-token")
+        session.client.return_value.assume_role.assert_called_once_with(
+            RoleArn="arn:aws:iam::222222222222:role/Audit",
+            RoleSessionName="cloudexit",
+        )
+
+    @patch("core.utils_aws.assume_role_session")
+    def test_role_is_assumed_once_per_role_arn(self, mock_assume):
+        details = {
+            **self._PROVIDER_DETAILS,
+            "roleArn": "arn:aws:iam::444444444444:role/Audit",
+        }
+
+        first = aws_session(details)
+        second = aws_session(dict(details))
+
+        self.assertIs(first, second)
+        mock_assume.assert_called_once()
+
+    @patch("core.utils_aws.assume_role_session")
+    def test_without_role_arn_uses_the_given_keys(self, mock_assume):
+        session = aws_session(self._PROVIDER_DETAILS)
+
+        self.assertEqual(session._session.get_credentials().access_key, "AK")
+        mock_assume.assert_not_called()
+
+
 class PaginateTests(unittest.TestCase):
     def _fake_client(self, pages):
         """Build a stub client whose paginator yields the given pages."""
@@ -0,0 +1,208 @@
+# tests/test_utils_aws_config.py
+import json
+import os
+import sqlite3
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+
+import botocore.exceptions
+
+from core.utils_aws_config import (
+    build_aws_config_resource_inventory,
+    config_query,
+    recorded_types,
+)
+
+PROVIDER_DETAILS = {
+    "accessKey": "AK",
+    "secretKey": "SK",
+    "region": "eu-west-1",
+    "regions": ["eu-west-1", "eu-central-1"],
+    "inventoryBackend": "config",
+}
+
+RESOURCE_TYPES = [
+    {"code": "AWS.ec2.describe_volumes.Volumes", "id": 2, "csp": 2, "status": "t"},
+    {"code": "AWS.lambda.list_functions.Functions", "id": 4, "csp": 2, "status": "t"},
+    {"code": "AWS.s3.list_buckets.Buckets", "id": 3, "csp": 2, "status": "t"},
+]
+
+
+def _result(resource_type, region, count):
+    return json.dumps(
+        {"resourceType": resource_type, "awsRegion": region, "COUNT(*)": count}
+    )
+
+
+class ConfigQueryTests(unittest.TestCase):
+    def test_query_groups_by_type_and_region(self):
+        self.assertEqual(
+            config_query(["AWS::EC2::Volume", "AWS::Lambda::Function"], "111"),
+            "SELECT resourceType, awsRegion, COUNT(*) WHERE accountId = '111' "
+            "AND resourceType IN ('AWS::EC2::Volume', 'AWS::Lambda::Function') "
+            "GROUP BY resourceType, awsRegion",
+        )
+
+    def test_recorded_types_follow_the_recording_group(self):
+        self.assertIn("AWS::EC2::Volume", recorded_types({}))
+        self.assertEqual(
+            recorded_types(
+                {
+                    "recordingGroup": {
+                        "allSupported": False,
+                        "resourceTypes": ["AWS::EC2::Volume", "AWS::S3::Bucket"],
+                    }
+                }
+            ),
+            {"AWS::EC2::Volume"},
+        )
+        self.assertNotIn(
+            "AWS::EC2::Volume",
+            recorded_types(
+                {
+                    "recordingGroup": {
+                        "allSupported": False,
+                        "exclusionByResourceTypes": {
+                            "resourceTypes": ["AWS::EC2::Volume"]
+                        },
+                    }
+                }
+            ),
+        )
+
+
+class BuildAwsConfigResourceInventoryTests(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        self.report_path = os.path.join(self._tmp.name, "report")
+        self.raw_data_path = os.path.join(self._tmp.name, "raw")
+        os.makedirs(os.path.join(self.report_path, "data"))
+        os.makedirs(self.raw_data_path)
+        self.db_path = os.path.join(self.report_path, "data", "assessment.db")
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute(
+                "CREATE TABLE resource_inventory (resource_type INTEGER, "
+                "location TEXT, count INTEGER, UNIQUE(resource_type, location))"
+            )
+
+        self.clients = {}
+        session = MagicMock()
+        session.client.side_effect = lambda service, region_name, **kwargs: (
+            self.clients.setdefault((service, region_name), MagicMock())
+        )
+        for patcher in (
+            patch("core.utils_aws_config.aws_session", return_value=session),
+            patch("core.utils_aws_config.load_data", return_value=RESOURCE_TYPES),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _config(self, region, results=(), recording=True):
+        client = self.clients.setdefault(("config", region), MagicMock())
+        client.describe_configuration_recorders.return_value = {
+            "ConfigurationRecorders": [{"name": "default"}]
+        }
+        client.describe_configuration_recorder_status.return_value = {
+            "ConfigurationRecordersStatus": [
+                {"name": "default", "recording": recording}
+            ]
+        }
+        client.describe_configuration_aggregators.return_value = {
+            "ConfigurationAggregators": [
+                {"OrganizationAggregationSource": {"AllAwsRegions": True}}
+            ]
+        }
+        client.get_paginator.return_value.paginate.return_value = [
+            {"Results": list(results)}
+        ]
+        return client
+
+    def _build(self, provider_details):
+        with patch(
+            "core.utils_aws_config.build_aws_resource_inventory",
+            return_value={"operations_skipped": []},
+        ) as mock_build:
+            coverage = build_aws_config_resource_inventory(
+                2, provider_details, self.report_path, self.raw_data_path
+            )
+        with sqlite3.connect(self.db_path) as conn:
+            rows = sorted(conn.execute("SELECT * FROM resource_inventory"))
+        return coverage, mock_build, rows
+
+    def test_recorded_types_are_counted_by_config_and_the_rest_listed(self):
+        self._config("eu-west-1", [_result("AWS::EC2::Volume", "eu-west-1", 7)])
+        # Recording is off in eu-central-1, so that region is listed in full.
+        self._config("eu-central-1", recording=False)
+
+        coverage, mock_build, rows = self._build(PROVIDER_DETAILS)
+
+        self.assertEqual(coverage, {"operations_skipped": []})
+        self.assertEqual(rows, [(2, "eu-west-1", 7)])
+        self.assertEqual(
+            mock_build.call_args.kwargs["precounted"],
+            {
+                ("AWS.ec2.describe_volumes.Volumes", "eu-west-1"),
+                ("AWS.lambda.list_functions.Functions", "eu-west-1"),
+            },
+        )
+        with open(
+            os.path.join(self.raw_data_path, "resource_inventory_config.json"),
+            encoding="utf-8",
+        ) as raw_file:
+            self.assertEqual(
+                json.load(raw_file),
+                [
+                    {
+                        "resourceType": "AWS::EC2::Volume",
+                        "region": "eu-west-1",
+                        "count": 7,
+                    }
+                ],
+            )
+
+    def test_aggregator_counts_the_account_in_every_assessed_region(self):
+        client = self._config(
+            "eu-west-1",
+            [
+                _result("AWS::EC2::Volume", "eu-west-1", 3),
+                _result("AWS::Lambda::Function", "eu-central-1", 2),
+                _result("AWS::Lambda::Function", "us-east-1", 9),
+            ],
+        )
+
+        _, mock_build, rows = self._build(
+            {
+                **PROVIDER_DETAILS,
+                "configAggregator": "org",
+                "accountId": "222222222222",
+            }
+        )
+
+        self.assertEqual(rows, [(2, "eu-west-1", 3), (4, "eu-central-1", 2)])
+        self.assertEqual(len(mock_build.call_args.kwargs["precounted"]), 4)
+        query = client.get_paginator.return_value.paginate.call_args.kwargs
+        self.assertEqual(query["ConfigurationAggregatorName"], "org")
+        self.assertIn("accountId = '222222222222'", query["Expression"])
+
+    def test_falls_back_to_listing_when_the_aggregator_is_missing(self):
+        client = self._config("eu-west-1")
+        client.describe_configuration_aggregators.side_effect = (
+            botocore.exceptions.ClientError(
+                {"Error": {"Code": "NoSuchConfigurationAggregatorException"}},
+                "DescribeConfigurationAggregators",
+            )
+        )
+
+        with self.assertLogs("core.engine.aws", level="WARNING"):
+            _, mock_build, rows = self._build(
+                {**PROVIDER_DETAILS, "configAggregator": "missing"}
+            )
+
+        self.assertEqual(rows, [])
+        self.assertNotIn("precounted", mock_build.call_args.kwargs)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,316 @@
+# tests/test_utils_aws_org.py
+import json
+import os
+import sqlite3
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+
+from core.utils_aws_org import (
+    account_provider_details,
+    build_aws_org_cost_inventory,
+    build_aws_org_resource_inventory,
+    list_org_accounts,
+)
+
+PROVIDER_DETAILS = {
+    "accessKey": "AK",
+    "secretKey": "SK",
+    "region": "eu-central-1",
+    "orgRole": "CloudExitReadOnly",
+}
+
+CALLER = "111111111111"
+MEMBER = "222222222222"
+BROKEN = "333333333333"
+
+SCHEMA = (
+    (
+        "CREATE TABLE resource_inventory (resource_type INTEGER, location TEXT, "
+        "count INTEGER, UNIQUE(resource_type, location))"
+    ),
+    "CREATE TABLE cost_inventory (month TEXT UNIQUE, cost REAL, currency TEXT)",
+    "CREATE TABLE resourcetype (id INTEGER, code TEXT)",
+)
+
+
+def _session(accounts):
+    session = MagicMock()
+    clients = {"organizations": MagicMock(), "sts": MagicMock(), "ce": MagicMock()}
+    clients["organizations"].get_paginator.return_value.paginate.return_value = [
+        {"Accounts": accounts}
+    ]
+    clients["sts"].get_caller_identity.return_value = {"Account": CALLER}
+    session.client.side_effect = lambda service, **kwargs: clients[service]
+    return session
+
+
+class ListOrgAccountsTests(unittest.TestCase):
+    @patch("core.utils_aws_org.aws_session")
+    def test_only_active_accounts_are_listed(self, mock_aws_session):
+        mock_aws_session.return_value = _session(
+            [
+                {"Id": CALLER, "Name": "management", "Status": "ACTIVE"},
+                {"Id": MEMBER, "Name": "workloads", "State": "ACTIVE"},
+                {"Id": BROKEN, "Name": "closed", "State": "SUSPENDED"},
+            ]
+        )
+
+        self.assertEqual(
+            list_org_accounts(PROVIDER_DETAILS),
+            [
+                {"id": CALLER, "name": "management"},
+                {"id": MEMBER, "name": "workloads"},
+            ],
+        )
+
+    @patch("core.utils_aws_org.aws_session")
+    def test_org_accounts_narrows_the_selection(self, mock_aws_session):
+        mock_aws_session.return_value = _session(
+            [{"Id": CALLER, "Name": "management"}, {"Id": MEMBER, "Name": "workloads"}]
+        )
+
+        accounts = list_org_accounts({**PROVIDER_DETAILS, "orgAccounts": [MEMBER]})
+
+        self.assertEqual(accounts, [{"id": MEMBER, "name": "workloads"}])
+
+
+class AccountProviderDetailsTests(unittest.TestCase):
+    def test_member_account_assumes_the_org_role(self):
+        details = account_provider_details(
+            {**PROVIDER_DETAILS, "orgParallel": 2, "egress": True, "jobs": 4},
+            MEMBER,
+            CALLER,
+        )
+
+        self.assertEqual(
+            details,
+            {
+                "accessKey": "AK",
+                "secretKey": "SK",
+                "region": "eu-central-1",
+                "jobs": 4,
+                "accountId": MEMBER,
+                "roleArn": f"arn:aws:iam::{MEMBER}:role/CloudExitReadOnly",
+            },
+        )
+
+    def test_caller_account_uses_the_caller_credentials(self):
+        details = account_provider_details(PROVIDER_DETAILS, CALLER, CALLER)
+
+        self.assertNotIn("roleArn", details)
+        self.assertEqual(details["accountId"], CALLER)
+
+
+class OrgFanOutTests(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        self.report_path = os.path.join(self._tmp.name, "report")
+        self.raw_data_path = os.path.join(self.report_path, "raw_data")
+        os.makedirs(os.path.join(self.report_path, "data"))
+        os.makedirs(self.raw_data_path)
+        self.db_path = os.path.join(self.report_path, "data", "assessment.db")
+        with sqlite3.connect(self.db_path) as conn:
+            for statement in SCHEMA:
+                conn.execute(statement)
+
+        session = _session(
+            [
+                {"Id": CALLER, "Name": "management"},
+                {"Id": MEMBER, "Name": "workloads"},
+                {"Id": BROKEN, "Name": "no-role"},
+            ]
+        )
+
+        def aws_session(details):
+            if details.get("roleArn", "").startswith(f"arn:aws:iam::{BROKEN}:"):
+                raise RuntimeError("AccessDenied on sts:AssumeRole")
+            return session
+
+        self.session = session
+        # The cost builder reaches the accounts through the same sessions.
+        for target in ("core.utils_aws_org.aws_session", "core.utils_aws.aws_session"):
+            patcher = patch(target, side_effect=aws_session)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _read(self, query, db_path=None):
+        with sqlite3.connect(db_path or self.db_path) as conn:
+            return sorted(conn.execute(query).fetchall())
+
+    def test_resource_inventory_is_rolled_up_across_accounts(self):
+        def fake_inventory(csp, details, report_path, raw_data_path):
+            count = 2 if details["accountId"] == CALLER else 3
+            with sqlite3.connect(
+                os.path.join(report_path, "data", "assessment.db")
+            ) as conn:
+                conn.execute(
+                    "INSERT INTO resource_inventory VALUES (?, ?, ?)",
+                    (7, "eu-central-1", count),
+                )
+            if details["accountId"] == MEMBER:
+                return {"operations_skipped": [{"operation": "ce.x", "reason": "r"}]}
+            return {
+                "operations_unavailable": [
+                    {
+                        "operation": "appflow.list_flows",
+                        "region": "eu-central-1",
+                        "reason": "not available in region",
+                    }
+                ]
+            }
+
+        with patch(
+            "core.utils_aws_org.build_aws_resource_inventory",
+            side_effect=fake_inventory,
+        ):
+            coverage = build_aws_org_resource_inventory(
+                2, PROVIDER_DETAILS, self.report_path, self.raw_data_path
+            )
+
+        self.assertEqual(
+            coverage,
+            {
+                "accounts_total": 3,
+                "accounts_failed": 1,
+                "operations_skipped": [
+                    {"operation": "ce.x", "reason": "r", "account": MEMBER}
+                ],
+                "operations_unavailable": [
+                    {
+                        "operation": "appflow.list_flows",
+                        "region": "eu-central-1",
+                        "reason": "not available in region",
+                        "account": CALLER,
+                    }
+                ],
+            },
+        )
+        self.assertEqual(
+            self._read("SELECT * FROM resource_inventory"), [(7, "eu-central-1", 5)]
+        )
+        # Member databases carry only the assessment tables, not the dataset.
+        member_db = os.path.join(
+            self.report_path, "accounts", MEMBER, "data", "assessment.db"
+        )
+        self.assertEqual(
+            self._read(
+                "SELECT name FROM sqlite_master WHERE type = 'table'", member_db
+            ),
+            [("cost_inventory",), ("resource_inventory",)],
+        )
+        with open(
+            os.path.join(self.raw_data_path, "org_accounts.json"), encoding="utf-8"
+        ) as manifest_file:
+            manifest = json.load(manifest_file)
+        self.assertEqual(manifest["role"], "CloudExitReadOnly")
+        self.assertEqual(manifest["accounts"][MEMBER]["resource_inventory"], "ok")
+        self.assertIn(
+            "AccessDenied", manifest["accounts"][BROKEN]["resource_inventory"]
+        )
+
+    def test_cost_inventory_sums_each_month(self):
+        def fake_costs(csp, details, report_path, raw_data_path):
+            with sqlite3.connect(
+                os.path.join(report_path, "data", "assessment.db")
+            ) as conn:
+                conn.execute(
+                    "INSERT INTO cost_inventory VALUES ('2026-09-01', 10.5, 'USD')"
+                )
+            return {}
+
+        with patch(
+            "core.utils_aws_org.build_aws_cost_inventory", side_effect=fake_costs
+        ):
+            build_aws_org_cost_inventory(
+                2, PROVIDER_DETAILS, self.report_path, self.raw_data_path
+            )
+
+        self.assertEqual(
+            self._read("SELECT * FROM cost_inventory"), [("2026-09-01", 21.0, "USD")]
+        )
+
+    def test_payer_account_counts_only_its_own_costs(self):
+        own_costs = {CALLER: 10.0, MEMBER: 5.0}
+
+        def get_cost_and_usage(Filter, **kwargs):
+            accounts = [
+                condition["Dimensions"]["Values"][0]
+                for condition in Filter.get("And", [])
+                if condition.get("Dimensions", {}).get("Key") == "LINKED_ACCOUNT"
+            ]
+            # Unfiltered, the payer sees the consolidated organization.
+            amount = sum(own_costs[account] for account in accounts or own_costs)
+            return {
+                "ResultsByTime": [
+                    {
+                        "TimePeriod": {"Start": "2026-09-01"},
+                        "Groups": [
+                            {
+                                "Metrics": {
+                                    "UnblendedCost": {
+                                        "Amount": str(amount),
+                                        "Unit": "USD",
+                                    }
+                                }
+                            }
+                        ],
+                    }
+                ]
+            }
+
+        self.session.client("ce").get_cost_and_usage.side_effect = get_cost_and_usage
+
+        coverage = build_aws_org_cost_inventory(
+            2, PROVIDER_DETAILS, self.report_path, self.raw_data_path
+        )
+
+        self.assertEqual(coverage["accounts_failed"], 1)
+        self.assertEqual(
+            self._read("SELECT cost FROM cost_inventory WHERE month = '2026-09-01'"),
+            [(15.0,)],
+        )
+
+    def test_account_whose_inventory_failed_is_not_ok(self):
+        def fake_inventory(csp, details, report_path, raw_data_path):
+            # build_aws_resource_inventory logs its errors and returns None.
+            return None if details["accountId"] == MEMBER else {}
+
+        with (
+            patch(
+                "core.utils_aws_org.build_aws_resource_inventory",
+                side_effect=fake_inventory,
+            ),
+            self.assertLogs("core.engine.aws", "WARNING") as logs,
+        ):
+            coverage = build_aws_org_resource_inventory(
+                2, PROVIDER_DETAILS, self.report_path, self.raw_data_path
+            )
+
+        self.assertEqual(coverage["accounts_failed"], 2)
+        self.assertTrue(any(MEMBER in line for line in logs.output))
+        with open(
+            os.path.join(self.raw_data_path, "org_accounts.json"), encoding="utf-8"
+        ) as manifest_file:
+            manifest = json.load(manifest_file)
+        self.assertIn("error", manifest["accounts"][MEMBER]["resource_inventory"])
+        self.assertEqual(manifest["accounts"][CALLER]["resource_inventory"], "ok")
+
+    def test_fails_when_no_account_could_be_assessed(self):
+        with (
+            patch(
+                "core.utils_aws_org.build_aws_resource_inventory",
+                side_effect=RuntimeError("boom"),
+            ),
+            self.assertRaises(RuntimeError) as ctx,
+        ):
+            build_aws_org_resource_inventory(
+                2, PROVIDER_DETAILS, self.report_path, self.raw_data_path
+            )
+
+        self.assertIn("None of the 3 accounts", str(ctx.exception))
+
+
+if __name__ == "__main__":
+    unittest.main()
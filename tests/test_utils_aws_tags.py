@@ -0,0 +1,185 @@
+# tests/test_utils_aws_tags.py
+import json
+import os
+import sqlite3
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+
+from core.utils_aws_tags import (
+    arn_resource_type,
+    build_aws_tag_resource_inventory,
+    parse_arn,
+)
+
+RESOURCE_TYPES = [
+    {"code": "AWS.ec2.describe_volumes.Volumes", "id": 2, "csp": 2, "status": "t"},
+    {"code": "AWS.s3.list_buckets.Buckets", "id": 3, "csp": 2, "status": "t"},
+    {
+        "code": "AWS.rds.describe_db_instances.DBInstances",
+        "id": 4,
+        "csp": 2,
+        "status": "t",
+    },
+    {
+        "code": "AWS.elbv2.describe_load_balancers.LoadBalancers",
+        "id": 5,
+        "csp": 2,
+        "status": "t",
+    },
+    {
+        "code": "AWS.elb.describe_load_balancers.LoadBalancerDescriptions",
+        "id": 6,
+        "csp": 2,
+        "status": "t",
+    },
+]
+
+TAGGED = {
+    "eu-west-1": [
+        "arn:aws:ec2:eu-west-1:111111111111:volume/vol-1",
+        "arn:aws:ec2:eu-west-1:111111111111:volume/vol-2",
+        "arn:aws:rds:eu-west-1:111111111111:db:payments",
+        "arn:aws:s3:::payments-invoices",
+        "arn:aws:ec2:eu-west-1:111111111111:vpc-endpoint/vpce-1",
+        "arn:aws:elasticloadbalancing:eu-west-1:1:loadbalancer/app/payments/50dc",
+        "arn:aws:elasticloadbalancing:eu-west-1:1:loadbalancer/payments-classic",
+    ],
+    "eu-central-1": [
+        "arn:aws:ec2:eu-central-1:111111111111:volume/vol-3",
+        "arn:aws:s3:::payments-invoices",
+    ],
+}
+
+
+class ParseArnTests(unittest.TestCase):
+    def test_resource_type_is_the_first_part_of_the_resource(self):
+        self.assertEqual(
+            parse_arn("arn:aws:ec2:eu-west-1:111111111111:volume/vol-1"),
+            ("ec2", "eu-west-1", "volume"),
+        )
+        self.assertEqual(
+            parse_arn("arn:aws:rds:eu-west-1:111111111111:db:payments"),
+            ("rds", "eu-west-1", "db"),
+        )
+        self.assertEqual(
+            parse_arn("arn:aws:apigateway:eu-west-1::/restapis/a1b2"),
+            ("apigateway", "eu-west-1", "restapis"),
+        )
+        self.assertEqual(parse_arn("arn:aws:s3:::bucket"), ("s3", "", ""))
+
+    def test_classic_load_balancers_have_their_own_resource_type(self):
+        self.assertEqual(
+            arn_resource_type(
+                "arn:aws:elasticloadbalancing:eu-west-1:1:loadbalancer/web"
+            )[2],
+            "AWS.elb.describe_load_balancers.LoadBalancerDescriptions",
+        )
+        self.assertEqual(
+            arn_resource_type(
+                "arn:aws:elasticloadbalancing:eu-west-1:1:loadbalancer/net/web/1a2b"
+            )[2],
+            "AWS.elbv2.describe_load_balancers.LoadBalancers",
+        )
+        self.assertEqual(arn_resource_type("not-an-arn"), ("not-an-arn", "", None))
+
+
+class BuildAwsTagResourceInventoryTests(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        self.report_path = os.path.join(self._tmp.name, "report")
+        self.raw_data_path = os.path.join(self._tmp.name, "raw")
+        os.makedirs(os.path.join(self.report_path, "data"))
+        os.makedirs(self.raw_data_path)
+        self.db_path = os.path.join(self.report_path, "data", "assessment.db")
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute(
+                "CREATE TABLE resource_inventory (resource_type INTEGER, "
+                "location TEXT, count INTEGER, UNIQUE(resource_type, location))"
+            )
+
+    def test_tagged_resources_are_counted_per_type_and_region(self):
+        session = MagicMock()
+        session.client.side_effect = lambda service, region_name, **kwargs: (
+            MagicMock(region=region_name)
+        )
+
+        def pages(client, operation_name, result_key, **kwargs):
+            self.assertEqual(
+                kwargs["TagFilters"], [{"Key": "app", "Values": ["payments"]}]
+            )
+            yield [{"ResourceARN": arn} for arn in TAGGED[client.region]]
+
+        with (
+            patch("core.utils_aws_tags.aws_session", return_value=session),
+            patch("core.utils_aws_tags.load_data", return_value=RESOURCE_TYPES),
+            patch("core.utils_aws_tags.iter_pages", side_effect=pages),
+        ):
+            build_aws_tag_resource_inventory(
+                2,
+                {
+                    "accessKey": "AK",
+                    "secretKey": "SK",
+                    "region": "eu-west-1",
+                    "regions": ["eu-west-1", "eu-central-1"],
+                    "tags": {"app": "payments"},
+                },
+                self.report_path,
+                self.raw_data_path,
+            )
+
+        self.assertEqual(
+            [call.args[0] for call in session.client.call_args_list],
+            ["resourcegroupstaggingapi", "resourcegroupstaggingapi"],
+        )
+        with sqlite3.connect(self.db_path) as conn:
+            rows = sorted(conn.execute("SELECT * FROM resource_inventory"))
+        # The bucket has no region in its ARN: counted once, in the home region.
+        self.assertEqual(
+            rows,
+            [
+                (2, "eu-central-1", 1),
+                (2, "eu-west-1", 2),
+                (3, "eu-west-1", 1),
+                (4, "eu-west-1", 1),
+                (5, "eu-west-1", 1),
+                (6, "eu-west-1", 1),
+            ],
+        )
+        with open(
+            os.path.join(self.raw_data_path, "resource_inventory_raw_data.jsonl"),
+            encoding="utf-8",
+        ) as raw_file:
+            records = [json.loads(line) for line in raw_file]
+        self.assertEqual(
+            [record["region"] for record in records], ["eu-west-1", "eu-central-1"]
+        )
+
+    def test_errors_are_logged_and_the_inventory_is_none(self):
+        session = MagicMock()
+        with (
+            patch("core.utils_aws_tags.aws_session", return_value=session),
+            patch("core.utils_aws_tags.load_data", return_value=RESOURCE_TYPES),
+            patch(
+                "core.utils_aws_tags.iter_pages",
+                side_effect=RuntimeError("throttled"),
+            ),
+            self.assertLogs("core.engine.aws", level="ERROR"),
+        ):
+            result = build_aws_tag_resource_inventory(
+                2,
+                {
+                    "region": "eu-west-1",
+                    "regions": ["eu-west-1"],
+                    "tags": {"app": "payments"},
+                },
+                self.report_path,
+                self.raw_data_path,
+            )
+
+        self.assertIsNone(result)
+
+
+if __name__ == "__main__":
+    unittest.main()
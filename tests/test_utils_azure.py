@@ -1,14 +1,29 @@
 # tests/test_utils_azure.py
+import json
+import os
+import sqlite3
+import tempfile
+import time
 import unittest
 from datetime import date
+from typing import Any, ClassVar
 from unittest.mock import MagicMock, patch
 
+import requests
+from azure.core.credentials import AccessToken
 from azure.core.exceptions import AzureError, ClientAuthenticationError
+from azure.mgmt.resource.resources.models import GenericResourceExpanded, Sku
 
 from core.utils_azure import (
+    CachedTokenCredential,
+    azure_credential,
+    build_azure_graph_resource_inventory,
     get_missing_months_azure,
     is_resource_inventory_empty,
+    list_resource_group,
+    query_resource_graph,
 )
+from core.utils_cache import ResponseCache
 
 
 class GetMissingMonthsAzureTests(unittest.TestCase):
@@ -86,10 +101,92 @@ class IsResourceInventoryEmptyTests(unittest.TestCase):
             is_resource_inventory_empty(MagicMock(), "sub-123", "rg-test")
 
 
+class ListResourceGroupTests(unittest.TestCase):
+    def test_cached_listing_round_trips_the_resource_models(self):
+        resource = GenericResourceExpanded(
+            location="westeurope", sku=Sku(name="Standard_LRS"), kind="StorageV2"
+        )
+        resource.id = "/subscriptions/sub/resourceGroups/rg/providers/x/st1"
+        resource.name = "st1"
+        resource.type = "Microsoft.Storage/storageAccounts"
+        client = MagicMock()
+        client.resources.list_by_resource_group.return_value = iter([resource])
+
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = ResponseCache(tmp, "sub")
+            self.addCleanup(cache.close)
+            list_resource_group(client, "rg", cache)
+            cached = list_resource_group(client, "rg", cache)
+
+        client.resources.list_by_resource_group.assert_called_once_with("rg")
+        self.assertEqual(
+            [(r.id, r.type, r.location, r.sku.name) for r in cached],
+            [(resource.id, resource.type, "westeurope", "Standard_LRS")],
+        )
+
+    def test_without_resource_group_the_subscription_is_listed(self):
+        client = MagicMock()
+        client.resources.list.return_value = iter([])
+
+        self.assertEqual(list_resource_group(client, None), [])
+
+        client.resources.list.assert_called_once_with()
+        client.resources.list_by_resource_group.assert_not_called()
+
+
+class CachedTokenCredentialTests(unittest.TestCase):
+    def test_token_is_reused_until_shortly_before_it_expires(self):
+        inner = MagicMock()
+        inner.get_token.side_effect = [
+            AccessToken("first", int(time.time()) + 3600),
+            AccessToken("second", int(time.time()) + 3600),
+        ]
+        credential = CachedTokenCredential(inner)
+
+        tokens = [
+            credential.get_token("https://management.azure.com/.default").token
+            for _ in range(3)
+        ]
+        self.assertEqual(tokens, ["first"] * 3)
+        inner.get_token.assert_called_once()
+
+        # Within the refresh margin the token is fetched again.
+        with patch("core.utils_azure.time.time", return_value=time.time() + 3400):
+            token = credential.get_token("https://management.azure.com/.default")
+        self.assertEqual(token.token, "second")
+
+    def test_claims_challenge_bypasses_the_cache(self):
+        inner = MagicMock()
+        inner.get_token.return_value = AccessToken("t", int(time.time()) + 3600)
+        credential = CachedTokenCredential(inner)
+
+        credential.get_token("scope")
+        credential.get_token("scope", claims='{"access_token": {}}')
+
+        self.assertEqual(inner.get_token.call_count, 2)
+
+    @patch("core.utils_azure.ClientSecretCredential")
+    def test_one_credential_per_run(self, mock_cred_cls):
+        provider_details = {
+            "tenantId": "t",
+            "clientId": "c",
+            "clientSecret": "s",
+            "tokenCache": True,
+        }
+
+        first = azure_credential(provider_details)
+        second = azure_credential(provider_details)
+
+        self.assertIs(first, second)
+        self.assertIs(provider_details["credential"], first)
+        mock_cred_cls.assert_called_once()
+        options = mock_cred_cls.call_args.kwargs["cache_persistence_options"]
+        self.assertEqual(options.name, "cloudexit")
+
+
 class BuildAzureResourceInventoryErrorTests(unittest.TestCase):
-    @patch("core.utils_azure.is_resource_inventory_empty")
     @patch("core.utils_azure.ClientSecretCredential")
-    def test_auth_error_is_reraised(self, mock_cred_cls, mock_empty_check):
+    def test_auth_error_is_reraised(self, mock_cred_cls):
         mock_cred_cls.side_effect = ClientAuthenticationError(
             message="Invalid credentials"
         )
@@ -110,9 +207,12 @@ class BuildAzureResourceInventoryErrorTests(unittest.TestCase):
                 "/fake/raw",
             )
 
-    @patch("core.utils_azure.is_resource_inventory_empty", return_value=True)
+    @patch("core.utils_azure.list_resource_group", return_value=[])
+    @patch("core.utils_azure.ResourceManagementClient")
     @patch("core.utils_azure.ClientSecretCredential")
-    def test_returns_early_when_inventory_empty(self, mock_cred_cls, mock_empty_check):
+    def test_returns_early_when_inventory_empty(
+        self, mock_cred_cls, mock_client_cls, mock_list
+    ):
         from core.utils_azure import build_azure_resource_inventory
 
         # Should not raise, returns early
@@ -129,7 +229,158 @@ class BuildAzureResourceInventoryErrorTests(unittest.TestCase):
             "/fake/raw",
         )
         self.assertIsNone(result)
-        mock_empty_check.assert_called_once()
+        # The emptiness check and the inventory share one listing.
+        mock_list.assert_called_once()
+
+
+def _credential():
+    credential = MagicMock()
+    credential.get_token.return_value = AccessToken("token", int(time.time()) + 3600)
+    return credential
+
+
+def _graph_response(data, skip_token=None):
+    response = MagicMock()
+    response.json.return_value = {"data": data}
+    if skip_token:
+        response.json.return_value["$skipToken"] = skip_token
+    return response
+
+
+class ResourceGraphTests(unittest.TestCase):
+    PROVIDER_DETAILS: ClassVar[dict[str, Any]] = {
+        "credential": _credential(),
+        "subscriptionId": "sub",
+        "resourceGroupName": "rg-payments",
+        "inventoryBackend": "graph",
+    }
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        self.report_path = os.path.join(self._tmp.name, "report")
+        self.raw_data_path = os.path.join(self._tmp.name, "raw")
+        os.makedirs(os.path.join(self.report_path, "data"))
+        os.makedirs(self.raw_data_path)
+        self.db_path = os.path.join(self.report_path, "data", "assessment.db")
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute(
+                "CREATE TABLE resource_inventory (resource_type INTEGER, "
+                "location TEXT, count INTEGER, UNIQUE(resource_type, location))"
+            )
+
+    def _build(self, provider_details, responses):
+        with (
+            patch("core.utils_azure.requests.post", side_effect=responses) as post,
+            patch(
+                "core.utils_azure.load_data",
+                return_value=[
+                    {
+                        "code": "Microsoft.Compute/disks",
+                        "id": 11,
+                        "csp": 1,
+                        "status": "t",
+                    }
+                ],
+            ),
+        ):
+            build_azure_graph_resource_inventory(
+                1, provider_details, self.report_path, self.raw_data_path
+            )
+        with sqlite3.connect(self.db_path) as conn:
+            rows = sorted(conn.execute("SELECT * FROM resource_inventory"))
+        return post, rows
+
+    def test_query_follows_skip_tokens(self):
+        with patch(
+            "core.utils_azure.requests.post",
+            side_effect=[_graph_response([1], "next"), _graph_response([2])],
+        ) as post:
+            pages = list(query_resource_graph(MagicMock(), "sub", "Resources"))
+
+        self.assertEqual(pages, [[1], [2]])
+        self.assertEqual(
+            post.call_args.kwargs["json"]["options"],
+            {"resultFormat": "objectArray", "$top": 1000, "$skipToken": "next"},
+        )
+
+    def test_summary_rows_are_written_without_enumerating(self):
+        post, rows = self._build(
+            self.PROVIDER_DETAILS,
+            [
+                _graph_response(
+                    [
+                        {
+                            "type": "microsoft.compute/disks",
+                            "location": "westeurope",
+                            "count_": 3,
+                        },
+                        {
+                            "type": "microsoft.network/publicipaddresses",
+                            "location": "westeurope",
+                            "count_": 1,
+                        },
+                    ]
+                )
+            ],
+        )
+
+        self.assertEqual(rows, [(11, "westeurope", 3)])
+        post.assert_called_once()
+        self.assertIn(
+            "resourceGroup =~ 'rg-payments' | summarize",
+            post.call_args.kwargs["json"]["query"],
+        )
+        self.assertFalse(
+            os.path.exists(
+                os.path.join(self.raw_data_path, "resource_inventory_raw_data.jsonl")
+            )
+        )
+
+    def test_without_resource_group_the_subscription_is_summarized(self):
+        details = dict(self.PROVIDER_DETAILS)
+        del details["resourceGroupName"]
+
+        post, _ = self._build(details, [_graph_response([])])
+
+        self.assertEqual(
+            post.call_args.kwargs["json"]["query"],
+            "Resources | summarize count_ = count() by type, location",
+        )
+
+    def test_raw_detail_is_streamed_on_request(self):
+        disk = {"id": "/d1", "type": "microsoft.compute/disks"}
+        self._build(
+            {**self.PROVIDER_DETAILS, "rawData": True},
+            [
+                _graph_response(
+                    [
+                        {
+                            "type": "microsoft.compute/disks",
+                            "location": "westeurope",
+                            "count_": 1,
+                        }
+                    ]
+                ),
+                _graph_response([disk]),
+            ],
+        )
+
+        with open(
+            os.path.join(self.raw_data_path, "resource_inventory_raw_data.jsonl"),
+            encoding="utf-8",
+        ) as raw_file:
+            self.assertEqual([json.loads(line) for line in raw_file], [disk])
+
+    @patch("core.utils_azure.build_azure_resource_inventory")
+    def test_falls_back_to_listing_when_graph_fails(self, mock_build):
+        with self.assertLogs("core.engine.azure", level="WARNING"):
+            self._build(
+                self.PROVIDER_DETAILS,
+                requests.ConnectionError("unreachable"),
+            )
+
+        mock_build.assert_called_once()
 
 
 class BuildAzureCostInventoryErrorTests(unittest.TestCase):
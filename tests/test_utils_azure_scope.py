@@ -0,0 +1,255 @@
+# tests/test_utils_azure_scope.py
+import json
+import os
+import sqlite3
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+
+from core.utils_azure_scope import (
+    build_azure_scope_cost_inventory,
+    build_azure_scope_resource_inventory,
+    list_management_group_subscriptions,
+    list_scopes,
+    permission_scope,
+    scope_provider_details,
+)
+
+SUB = "00000000-0000-0000-0000-000000000001"
+OTHER = "00000000-0000-0000-0000-000000000002"
+BROKEN = "00000000-0000-0000-0000-000000000003"
+
+PROVIDER_DETAILS = {
+    "credential": MagicMock(),
+    "tenantId": "tenant",
+    "subscriptionId": SUB,
+    "resourceGroupName": "rg-main",
+}
+
+SCHEMA = (
+    (
+        "CREATE TABLE resource_inventory (resource_type INTEGER, location TEXT, "
+        "count INTEGER, UNIQUE(resource_type, location))"
+    ),
+    "CREATE TABLE cost_inventory (month TEXT UNIQUE, cost REAL, currency TEXT)",
+    "CREATE TABLE resourcetype (id INTEGER, code TEXT)",
+    "CREATE TABLE risk (id INTEGER)",
+)
+
+
+def _response(payload):
+    response = MagicMock()
+    response.json.return_value = payload
+    return response
+
+
+class ListScopesTests(unittest.TestCase):
+    def test_resource_groups_of_the_subscription(self):
+        scopes = list_scopes(
+            {**PROVIDER_DETAILS, "resourceGroups": ["rg-a", "rg-b", "rg-a"]},
+            MagicMock(),
+        )
+
+        self.assertEqual(
+            scopes,
+            [
+                {"subscriptionId": SUB, "resourceGroupName": "rg-a"},
+                {"subscriptionId": SUB, "resourceGroupName": "rg-b"},
+            ],
+        )
+
+    def test_whole_subscription_replaces_its_resource_groups(self):
+        scopes = list_scopes(
+            {
+                **PROVIDER_DETAILS,
+                "resourceGroups": ["rg-a"],
+                "subscriptions": [SUB, OTHER],
+            },
+            MagicMock(),
+        )
+
+        self.assertEqual(
+            scopes,
+            [
+                {"subscriptionId": SUB, "resourceGroupName": None},
+                {"subscriptionId": OTHER, "resourceGroupName": None},
+            ],
+        )
+
+    @patch("core.utils_azure_scope.requests.get")
+    def test_management_group_subscriptions_follow_next_link(self, mock_get):
+        mock_get.side_effect = [
+            _response(
+                {
+                    "value": [
+                        {
+                            "name": "child",
+                            "type": "Microsoft.Management/managementGroups",
+                        },
+                        {
+                            "name": SUB,
+                            "type": "Microsoft.Management/managementGroups/subscriptions",
+                        },
+                    ],
+                    "nextLink": "https://management.azure.com/next?page=2",
+                }
+            ),
+            _response(
+                {
+                    "value": [
+                        {
+                            "name": OTHER,
+                            "type": "Microsoft.Management/managementGroups/subscriptions",
+                        }
+                    ]
+                }
+            ),
+        ]
+
+        subscriptions = list_management_group_subscriptions(MagicMock(), "landing")
+
+        self.assertEqual(subscriptions, [SUB, OTHER])
+        self.assertIn(
+            "/managementGroups/landing/descendants", mock_get.call_args_list[0].args[0]
+        )
+        self.assertEqual(
+            mock_get.call_args_list[1].args[0],
+            "https://management.azure.com/next?page=2",
+        )
+
+
+class ScopeProviderDetailsTests(unittest.TestCase):
+    def test_scope_shares_the_credential_and_drops_the_scope_fields(self):
+        credential = MagicMock()
+        details = scope_provider_details(
+            {**PROVIDER_DETAILS, "subscriptions": [OTHER], "scopeParallel": 2},
+            {"subscriptionId": OTHER, "resourceGroupName": None},
+            credential,
+        )
+
+        self.assertIs(details["credential"], credential)
+        self.assertEqual(details["subscriptionId"], OTHER)
+        self.assertNotIn("resourceGroupName", details)
+        self.assertNotIn("subscriptions", details)
+        self.assertNotIn("scopeParallel", details)
+
+    def test_permission_scope(self):
+        self.assertEqual(
+            permission_scope(PROVIDER_DETAILS),
+            f"/subscriptions/{SUB}/resourceGroups/rg-main",
+        )
+        self.assertEqual(
+            permission_scope({**PROVIDER_DETAILS, "subscriptions": [OTHER]}),
+            f"/subscriptions/{SUB}",
+        )
+        self.assertEqual(
+            permission_scope({**PROVIDER_DETAILS, "managementGroup": "landing"}),
+            "/providers/Microsoft.Management/managementGroups/landing",
+        )
+
+
+class ScopeFanOutTests(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        self.report_path = os.path.join(self._tmp.name, "report")
+        self.raw_data_path = os.path.join(self.report_path, "raw_data")
+        os.makedirs(os.path.join(self.report_path, "data"))
+        os.makedirs(self.raw_data_path)
+        self.db_path = os.path.join(self.report_path, "data", "assessment.db")
+        with sqlite3.connect(self.db_path) as conn:
+            for statement in SCHEMA:
+                conn.execute(statement)
+            conn.execute("INSERT INTO resourcetype VALUES (7, 'microsoft.x/y')")
+        self.provider_details = {
+            **PROVIDER_DETAILS,
+            "resourceGroups": ["rg-a"],
+            "subscriptions": [OTHER, BROKEN],
+        }
+
+    def _read(self, query, db_path=None):
+        with sqlite3.connect(db_path or self.db_path) as conn:
+            return sorted(conn.execute(query).fetchall())
+
+    def test_resource_inventory_is_rolled_up_across_scopes(self):
+        credentials = set()
+
+        def fake_inventory(csp, details, report_path, raw_data_path):
+            credentials.add(id(details["credential"]))
+            if details["subscriptionId"] == BROKEN:
+                raise RuntimeError("AuthorizationFailed")
+            count = 2 if "resourceGroupName" in details else 3
+            with sqlite3.connect(
+                os.path.join(report_path, "data", "assessment.db")
+            ) as conn:
+                conn.execute(
+                    "INSERT INTO resource_inventory VALUES (?, ?, ?)",
+                    (7, "westeurope", count),
+                )
+
+        with patch(
+            "core.utils_azure_scope.build_azure_resource_inventory",
+            side_effect=fake_inventory,
+        ):
+            coverage = build_azure_scope_resource_inventory(
+                1, self.provider_details, self.report_path, self.raw_data_path
+            )
+
+        self.assertEqual(coverage, {"scopes_total": 3, "scopes_failed": 1})
+        # Every scope shares one credential, and with it its tokens.
+        self.assertEqual(len(credentials), 1)
+        self.assertEqual(
+            self._read("SELECT * FROM resource_inventory"), [(7, "westeurope", 5)]
+        )
+        # Scope databases carry the resource types the builders map against.
+        scope_db = os.path.join(
+            self.report_path, "scopes", f"{SUB}_rg-a", "data", "assessment.db"
+        )
+        self.assertEqual(
+            self._read("SELECT name FROM sqlite_master WHERE type = 'table'", scope_db),
+            [("cost_inventory",), ("resource_inventory",), ("resourcetype",)],
+        )
+        self.assertEqual(
+            self._read("SELECT * FROM resource_inventory", scope_db),
+            [(7, "westeurope", 2)],
+        )
+        with open(
+            os.path.join(self.raw_data_path, "azure_scopes.json"), encoding="utf-8"
+        ) as manifest_file:
+            manifest = json.load(manifest_file)["scopes"]
+        self.assertEqual(
+            manifest[f"/subscriptions/{SUB}/resourceGroups/rg-a"],
+            {
+                "path": os.path.join("scopes", f"{SUB}_rg-a"),
+                "resource_inventory": "ok",
+            },
+        )
+        self.assertIn(
+            "AuthorizationFailed",
+            manifest[f"/subscriptions/{BROKEN}"]["resource_inventory"],
+        )
+
+    def test_cost_inventory_sums_each_month(self):
+        def fake_costs(csp, details, report_path, raw_data_path):
+            with sqlite3.connect(
+                os.path.join(report_path, "data", "assessment.db")
+            ) as conn:
+                conn.execute(
+                    "INSERT INTO cost_inventory VALUES ('2026-09-01', 10.5, 'EUR')"
+                )
+
+        with patch(
+            "core.utils_azure_scope.build_azure_cost_inventory", side_effect=fake_costs
+        ):
+            coverage = build_azure_scope_cost_inventory(
+                1, self.provider_details, self.report_path, self.raw_data_path
+            )
+
+        self.assertEqual(coverage, {"scopes_total": 3, "scopes_failed": 0})
+        self.assertEqual(
+            self._read("SELECT * FROM cost_inventory"), [("2026-09-01", 31.5, "EUR")]
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
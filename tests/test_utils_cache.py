@@ -0,0 +1,192 @@
+# tests/test_utils_cache.py
+import itertools
+import os
+import stat
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from core.utils_cache import (
+    ResponseCache,
+    SnapshotBlocks,
+    close_response_caches,
+    response_cache,
+)
+
+
+class ResponseCacheTests(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        self.directory = self._tmp.name
+
+    def _cache(self, scope="111111111111", **kwargs):
+        cache = ResponseCache(self.directory, scope, **kwargs)
+        self.addCleanup(cache.close)
+        return cache
+
+    def test_response_is_reused_by_a_later_run_of_the_same_scope(self):
+        self._cache().put("eu-west-1", "ec2.describe_volumes", {}, '[{"id": 1}]')
+
+        cache = self._cache()
+
+        self.assertEqual(
+            cache.get("eu-west-1", "ec2.describe_volumes", {}), [{"id": 1}]
+        )
+        self.assertIsNone(cache.get("us-east-1", "ec2.describe_volumes", {}))
+        self.assertIsNone(cache.get("eu-west-1", "ec2.describe_volumes", {"x": 1}))
+        self.assertIsNone(
+            self._cache("222222222222").get("eu-west-1", "ec2.describe_volumes", {})
+        )
+        self.assertEqual((cache.hits, cache.misses), (1, 2))
+
+    def test_expired_responses_are_not_served(self):
+        cache = self._cache(ttl_hours=1)
+        with patch("core.utils_cache.time.time", return_value=1000.0):
+            cache.put("r", "op", {}, "[]")
+        with patch("core.utils_cache.time.time", return_value=1000.0 + 3599):
+            self.assertEqual(cache.get("r", "op", {}), [])
+        with patch("core.utils_cache.time.time", return_value=1000.0 + 3601):
+            self.assertIsNone(cache.get("r", "op", {}))
+
+    def test_refresh_bypasses_reads_but_still_writes(self):
+        self._cache().put("r", "op", {}, "[1]")
+
+        refreshing = self._cache(refresh=True)
+        self.assertIsNone(refreshing.get("r", "op", {}))
+        refreshing.put("r", "op", {}, "[2]")
+
+        self.assertEqual(self._cache().get("r", "op", {}), [2])
+
+    def test_least_recently_used_entries_are_evicted_beyond_the_cap(self):
+        body = "[" + "1," * 30 + "1]"
+        cache = self._cache(max_bytes=16 * len(body))
+        with patch("core.utils_cache.time.time", side_effect=itertools.count(1)):
+            for index in range(16):
+                cache.put("r", f"op{index}", {}, body)
+            cache.get("r", "op0", {})
+            cache.put("r", "op16", {}, body)
+
+            self.assertIsNotNone(cache.get("r", "op0", {}))
+            self.assertIsNone(cache.get("r", "op1", {}))
+            self.assertIsNotNone(cache.get("r", "op16", {}))
+
+    def test_pages_are_stored_once_the_listing_completes(self):
+        cache = self._cache()
+
+        first = list(cache.pages("r", "op", {}, iter([[1, 2], [3]])))
+
+        def unreachable():
+            raise AssertionError("listed again")
+            yield
+
+        self.assertEqual(first, [[1, 2], [3]])
+        self.assertEqual(list(cache.pages("r", "op", {}, unreachable())), first)
+
+    def test_interrupted_or_oversized_listings_are_not_stored(self):
+        cache = self._cache(max_bytes=16 * 8)
+
+        def failing():
+            yield [1]
+            raise RuntimeError("ExpiredToken")
+
+        with self.assertRaises(RuntimeError):
+            list(cache.pages("r", "failing", {}, failing()))
+        self.assertEqual(
+            list(cache.pages("r", "large", {}, iter([[1] * 10]))), [[1] * 10]
+        )
+
+        self.assertIsNone(cache.get("r", "failing", {}))
+        self.assertIsNone(cache.get("r", "large", {}))
+
+    def test_failures_are_remembered_until_they_expire(self):
+        cache = self._cache()
+        with patch("core.utils_cache.time.time", return_value=1000.0):
+            cache.record_failure("eu-west-1", "ce.get_cost", "AccessDenied", 1)
+
+        later = self._cache()
+        with patch("core.utils_cache.time.time", return_value=1000.0 + 3599):
+            self.assertEqual(later.failure("eu-west-1", "ce.get_cost"), "AccessDenied")
+            self.assertIsNone(later.failure("us-east-1", "ce.get_cost"))
+            self.assertIsNone(
+                self._cache(refresh=True).failure("eu-west-1", "ce.get_cost")
+            )
+        with patch("core.utils_cache.time.time", return_value=1000.0 + 3601):
+            self.assertIsNone(later.failure("eu-west-1", "ce.get_cost"))
+
+    def test_bucket_regions_never_expire_and_stay_in_their_account(self):
+        with patch("core.utils_cache.time.time", return_value=1000.0):
+            self._cache(ttl_hours=1).store_bucket_regions(
+                {"logs": "eu-west-1", "data": "us-east-1"}
+            )
+
+        with patch("core.utils_cache.time.time", return_value=1000.0 + 86400):
+            cache = self._cache(ttl_hours=1)
+            self.assertEqual(
+                cache.bucket_regions(["logs", "new"]), {"logs": "eu-west-1"}
+            )
+        self.assertEqual(self._cache("222222222222").bucket_regions(["logs"]), {})
+        self.assertEqual(self._cache(refresh=True).bucket_regions(["logs"]), {})
+
+    def test_snapshot_blocks_never_expire_and_keep_their_parent(self):
+        with patch("core.utils_cache.time.time", return_value=1000.0):
+            self._cache(ttl_hours=1).store_snapshot_blocks(
+                {
+                    "snap-1": SnapshotBlocks(None, 4096),
+                    "snap-2": SnapshotBlocks("snap-1", 512, full_listing=True),
+                }
+            )
+
+        with patch("core.utils_cache.time.time", return_value=1000.0 + 86400):
+            self.assertEqual(
+                self._cache(ttl_hours=1).snapshot_blocks(["snap-1", "snap-2", "x"]),
+                {
+                    "snap-1": SnapshotBlocks(None, 4096, False),
+                    "snap-2": SnapshotBlocks("snap-1", 512, True),
+                },
+            )
+        self.assertEqual(self._cache(refresh=True).snapshot_blocks(["snap-1"]), {})
+
+    def test_caching_is_off_without_cache_dir(self):
+        self.assertIsNone(response_cache({}, "scope"))
+
+        cache = response_cache(
+            {"cacheDir": self.directory, "cacheTtl": 2, "refresh": True}, "scope"
+        )
+        self.addCleanup(cache.close)
+        self.assertEqual((cache.ttl, cache.refresh), (7200, True))
+
+    def test_one_cache_is_shared_per_scope_until_closed(self):
+        details = {"cacheDir": self.directory}
+        cache = response_cache(details, "111111111111")
+        self.addCleanup(close_response_caches)
+
+        self.assertIs(response_cache(details, "111111111111"), cache)
+        self.assertIsNot(response_cache(details, "222222222222"), cache)
+
+        close_response_caches()
+        self.assertTrue(cache.closed)
+        self.assertIsNot(response_cache(details, "111111111111"), cache)
+
+    @unittest.skipUnless(os.name == "posix", "POSIX permissions")
+    def test_cache_is_only_readable_by_its_owner(self):
+        directory = os.path.join(self.directory, "cache")
+        ResponseCache(directory, "scope").close()
+
+        self.assertEqual(stat.S_IMODE(os.stat(directory).st_mode), 0o700)
+        self.assertEqual(
+            stat.S_IMODE(os.stat(os.path.join(directory, "responses.db")).st_mode),
+            0o600,
+        )
+
+        # A directory that already exists is tightened too.
+        existing = os.path.join(self.directory, "existing")
+        os.mkdir(existing)
+        os.chmod(existing, 0o755)
+        ResponseCache(existing, "scope").close()
+
+        self.assertEqual(stat.S_IMODE(os.stat(existing).st_mode), 0o700)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,21 +1,33 @@
 # tests/test_utils_egress_aws.py
+import tempfile
+import threading
+import time
 import unittest
+from datetime import timedelta
 from unittest.mock import MagicMock, patch
 
 from botocore.exceptions import ClientError
 
+from core.utils_aws import CallPlan, store_call_plan
+from core.utils_cache import ResponseCache, SnapshotBlocks
 from core.utils_egress import GIB
 from core.utils_egress_aws import (
     EGRESS_RESOURCE_REGISTRY,
+    BucketRegionIndex,
+    ItemPool,
+    MetricPlanner,
+    SnapshotLineage,
     _collect_backup_vaults,
     _collect_dynamodb_tables,
     _collect_ebs_snapshots,
     _collect_ebs_volumes,
     _collect_rds_instances,
+    _collect_region,
     _collect_s3_buckets,
     _list_buckets_in_region,
     collect_aws_egress,
     fetch_latest_metric_values,
+    plan_egress_calls,
 )
 
 REGION = "eu-central-1"
@@ -134,6 +146,33 @@ class ListBucketsInRegionTests(unittest.TestCase):
 
         self.assertEqual(names, ["data-eu"])
 
+    def test_bucket_regions_are_resolved_once_per_account(self):
+        s3_client = MagicMock()
+        s3_client.get_bucket_location.side_effect = lambda Bucket: {
+            "LocationConstraint": REGION if Bucket == "data-eu" else None
+        }
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+
+        def index():
+            cache = ResponseCache(directory.name, "111111111111")
+            self.addCleanup(cache.close)
+            return BucketRegionIndex(cache)
+
+        run = index()
+        # Every region of a sweep resolves the same account-wide listing.
+        for _ in range(2):
+            self.assertEqual(
+                run.resolve(s3_client, ["data-eu", "legacy-us"]),
+                {"data-eu": REGION, "legacy-us": "us-east-1"},
+            )
+        self.assertEqual(s3_client.get_bucket_location.call_count, 2)
+
+        # A later run only resolves the buckets it has not seen.
+        index().resolve(s3_client, ["data-eu", "legacy-us", "new-bucket"])
+        self.assertEqual(s3_client.get_bucket_location.call_count, 3)
+        s3_client.get_bucket_location.assert_called_with(Bucket="new-bucket")
+
     def test_bucket_is_skipped_when_location_lookup_is_denied(self):
         s3_client = MagicMock()
         s3_client.list_buckets.side_effect = [
@@ -169,7 +208,7 @@ class S3BucketCollectorTests(unittest.TestCase):
             "ReplicationConfigurationNotFoundError", "GetBucketReplication"
         )
         cloudwatch = MagicMock()
-        cloudwatch.list_metrics.return_value = {"Metrics": metrics}
+        _mock_paginator(cloudwatch, [{"Metrics": metrics}])
         cloudwatch.get_metric_data.return_value = {
             "MetricDataResults": [
                 {"Id": query_id, "Values": [value]}
@@ -218,6 +257,42 @@ class S3BucketCollectorTests(unittest.TestCase):
         )
         self.assertTrue(any("restore required" in flag for flag in row["flags"]))
 
+    def test_bucket_locations_are_looked_up_once_per_account(self):
+        clients = self._clients({"data-eu": REGION, "data-us": None}, [], {})
+
+        def list_buckets(**kwargs):
+            # Neither filtered by nor returning BucketRegion.
+            if kwargs:
+                raise _client_error("InvalidRequest", "ListBuckets")
+            return {"Buckets": [{"Name": "data-eu"}, {"Name": "data-us"}]}
+
+        clients["s3"].list_buckets.side_effect = list_buckets
+        session = _mock_session(clients)
+        entry = EGRESS_RESOURCE_REGISTRY[S3_CODE]
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+
+        def run(regions):
+            cache = ResponseCache(directory.name, "111111111111")
+            self.addCleanup(cache.close)
+            with ItemPool(4, cache) as pool:
+                return [
+                    [
+                        row["name"]
+                        for row in _collect_s3_buckets(
+                            session, region, S3_CODE, entry, pool=pool
+                        )
+                    ]
+                    for region in regions
+                ]
+
+        # The second region of a sweep reuses the first one's lookups...
+        self.assertEqual(run([REGION, "us-east-1"]), [["data-eu"], ["data-us"]])
+        self.assertEqual(clients["s3"].get_bucket_location.call_count, 2)
+        # ...and a later run those kept in the response cache.
+        self.assertEqual(run([REGION]), [["data-eu"]])
+        self.assertEqual(clients["s3"].get_bucket_location.call_count, 2)
+
     def test_no_datapoints_records_unknown_size(self):
         clients = self._clients(
             bucket_locations={"fresh-bucket": REGION},
@@ -248,6 +323,90 @@ class S3BucketCollectorTests(unittest.TestCase):
         self.assertTrue(any("replication" in note for note in rows[0]["notes"]))
 
 
+class MetricPlannerTests(unittest.TestCase):
+    def test_region_metrics_are_listed_once_and_fetched_in_shared_batches(self):
+        buckets = [f"bucket-{index}" for index in range(400)]
+        instances = [
+            {
+                "DBInstanceIdentifier": f"db-{index}",
+                "Engine": "postgres",
+                "AllocatedStorage": 10,
+            }
+            for index in range(200)
+        ]
+        s3_client = MagicMock()
+        s3_client.list_buckets.return_value = {
+            "Buckets": [{"Name": name} for name in buckets]
+        }
+        rds_client = MagicMock()
+        _mock_paginator(rds_client, [{"DBInstances": instances}])
+        cloudwatch = MagicMock()
+        list_metrics = _mock_paginator(
+            cloudwatch,
+            [
+                {
+                    "Metrics": [
+                        S3BucketCollectorTests._size_metric(name, "StandardStorage")
+                        for name in buckets
+                    ]
+                }
+            ],
+        )
+
+        def get_metric_data(MetricDataQueries, **kwargs):
+            return {
+                "MetricDataResults": [
+                    {"Id": query["Id"], "Values": [float(GIB)]}
+                    for query in MetricDataQueries
+                ]
+            }
+
+        cloudwatch.get_metric_data.side_effect = get_metric_data
+        clients = {"s3": s3_client, "rds": rds_client, "cloudwatch": cloudwatch}
+        for service in ("ec2", "dynamodb", "backup"):
+            clients[service] = MagicMock()
+
+        rows = _collect_region(_mock_session(clients), REGION)
+
+        list_metrics.paginate.assert_called_once_with(
+            Namespace="AWS/S3", MetricName="BucketSizeBytes"
+        )
+        cloudwatch.list_metrics.assert_not_called()
+        # 400 bucket and 200 instance queries, each set over its own window.
+        calls = cloudwatch.get_metric_data.call_args_list
+        batches = [call.kwargs["MetricDataQueries"] for call in calls]
+        self.assertEqual([len(batch) for batch in batches], [400, 200])
+        windows = [call.kwargs["EndTime"] - call.kwargs["StartTime"] for call in calls]
+        self.assertEqual(windows, [timedelta(days=3), timedelta(hours=3)])
+        periods = {
+            query["MetricStat"]["Metric"]["Namespace"]: query["MetricStat"]["Period"]
+            for batch in batches
+            for query in batch
+        }
+        self.assertEqual(periods, {"AWS/S3": 86400, "AWS/RDS": 3600})
+        sizes = {row["name"]: row["size_bytes"] for row in rows}
+        self.assertEqual(sizes["bucket-399"], GIB)
+        self.assertEqual(sizes["db-199"], 9 * GIB)
+
+    def test_failed_batch_leaves_only_its_queries_without_values(self):
+        cloudwatch = MagicMock()
+        cloudwatch.get_metric_data.side_effect = [
+            _client_error("Throttling", "GetMetricData"),
+            {"MetricDataResults": [{"Id": "q500", "Values": [7.0]}]},
+        ]
+        planner = MetricPlanner(cloudwatch)
+        received = []
+        spec = {"namespace": "AWS/RDS", "metric_name": "m", "dimensions": []}
+        planner.add(
+            [{**spec, "id": f"db{index}"} for index in range(501)], received.append
+        )
+
+        planner.fetch()
+
+        self.assertIsNone(received[0]["db0"])
+        self.assertEqual(received[0]["db500"], 7.0)
+
+
 class EbsCollectorTests(unittest.TestCase):
     def test_volume_size_is_allocated_upper_bound(self):
         ec2_client = MagicMock()
@@ -292,6 +451,149 @@ class EbsCollectorTests(unittest.TestCase):
         self.assertTrue(any("shares blocks" in note for note in rows[0]["notes"]))
 
 
+class SnapshotLineageTests(unittest.TestCase):
+    SNAPSHOTS = (
+        {
+            "SnapshotId": "snap-3",
+            "VolumeId": "vol-1",
+            "VolumeSize": 1024,
+            "StartTime": "2026-10-03",
+        },
+        {
+            "SnapshotId": "snap-1",
+            "VolumeId": "vol-1",
+            "VolumeSize": 1024,
+            "StartTime": "2026-10-01",
+        },
+        {
+            "SnapshotId": "snap-2",
+            "VolumeId": "vol-1",
+            "VolumeSize": 1024,
+            "StartTime": "2026-10-02",
+        },
+        {"SnapshotId": "snap-copy", "VolumeId": "vol-ffffffff", "VolumeSize": 8},
+        {"SnapshotId": "snap-new", "VolumeId": "vol-2", "State": "pending"},
+    )
+
+    def _ebs_client(self):
+        ebs_client = MagicMock()
+
+        def list_snapshot_blocks(SnapshotId, MaxResults, NextToken=None):
+            if SnapshotId == "snap-copy":
+                raise _client_error("AccessDeniedException", "ListSnapshotBlocks")
+            if NextToken is None:
+                return {
+                    "Blocks": [{"BlockIndex": 0, "BlockToken": "a"}],
+                    "BlockSize": 512,
+                    "NextToken": "page-2",
+                }
+            return {"Blocks": [{"BlockIndex": 9, "BlockToken": "b"}], "BlockSize": 512}
+
+        def list_changed_blocks(FirstSnapshotId, SecondSnapshotId, MaxResults):
+            return {
+                "ChangedBlocks": [
+                    {"BlockIndex": 1, "SecondBlockToken": "c"},
+                    # Only in the older snapshot: no data in the newer one.
+                    {"BlockIndex": 2, "FirstBlockToken": "d"},
+                ],
+                "BlockSize": 512,
+            }
+
+        ebs_client.list_snapshot_blocks.side_effect = list_snapshot_blocks
+        ebs_client.list_changed_blocks.side_effect = list_changed_blocks
+        return ebs_client
+
+    def test_snapshots_are_sized_by_the_blocks_they_add_to_their_lineage(self):
+        ec2_client = MagicMock()
+        _mock_paginator(ec2_client, [{"Snapshots": self.SNAPSHOTS}])
+        ebs_client = self._ebs_client()
+        entry = EGRESS_RESOURCE_REGISTRY[SNAPSHOT_CODE]
+
+        with ItemPool(4, snapshot_lineage=True) as pool:
+            rows = _collect_ebs_snapshots(
+                _mock_session({"ec2": ec2_client, "ebs": ebs_client}),
+                REGION,
+                SNAPSHOT_CODE,
+                entry,
+                pool=pool,
+            )
+
+        sizes = {row["name"]: row["size_bytes"] for row in rows}
+        self.assertEqual(
+            sizes,
+            {
+                "snap-1": 1024,
+                "snap-2": 512,
+                "snap-3": 512,
+                # Unreadable: back to the volume size.
+                "snap-copy": 8 * GIB,
+                "snap-new": None,
+            },
+        )
+        self.assertEqual(
+            sorted(
+                (call.kwargs["FirstSnapshotId"], call.kwargs["SecondSnapshotId"])
+                for call in ebs_client.list_changed_blocks.call_args_list
+            ),
+            [("snap-1", "snap-2"), ("snap-2", "snap-3")],
+        )
+        self.assertNotIn("allocated (upper bound)", rows[0]["flags"])
+
+    def test_cached_counts_are_reused_while_their_parent_is_unchanged(self):
+        with tempfile.TemporaryDirectory() as directory:
+            cache = ResponseCache(directory, "111111111111")
+            self.addCleanup(cache.close)
+            cache.store_snapshot_blocks(
+                {
+                    "snap-1": SnapshotBlocks(None, 1),
+                    "snap-2": SnapshotBlocks("snap-1", 2),
+                    "snap-3": SnapshotBlocks("x", 3),
+                }
+            )
+            ebs_client = self._ebs_client()
+
+            sizes = SnapshotLineage(cache).unique_bytes(ebs_client, self.SNAPSHOTS[:3])
+
+            # snap-3's predecessor changed since it was counted.
+            self.assertEqual(sizes, {"snap-1": 1, "snap-2": 2, "snap-3": 512})
+            ebs_client.list_snapshot_blocks.assert_not_called()
+            ebs_client.list_changed_blocks.assert_called_once_with(
+                FirstSnapshotId="snap-2",
+                SecondSnapshotId="snap-3",
+                MaxResults=10000,
+            )
+            self.assertEqual(
+                cache.snapshot_blocks(["snap-3"]),
+                {"snap-3": SnapshotBlocks("snap-2", 512)},
+            )
+
+    def test_full_listing_fallback_is_not_counted_again(self):
+        with tempfile.TemporaryDirectory() as directory:
+            cache = ResponseCache(directory, "111111111111")
+            self.addCleanup(cache.close)
+            ebs_client = self._ebs_client()
+            # snap-2 does not descend from snap-1 (re-encrypted, say).
+            ebs_client.list_changed_blocks.side_effect = _client_error(
+                "ValidationException", "ListChangedBlocks"
+            )
+
+            first = SnapshotLineage(cache).unique_bytes(ebs_client, self.SNAPSHOTS[1:3])
+            self.assertEqual(first, {"snap-1": 1024, "snap-2": 1024})
+            self.assertEqual(
+                cache.snapshot_blocks(["snap-2"]),
+                {"snap-2": SnapshotBlocks("snap-1", 1024, full_listing=True)},
+            )
+
+            ebs_client.reset_mock()
+            second = SnapshotLineage(cache).unique_bytes(
+                ebs_client, self.SNAPSHOTS[1:3]
+            )
+
+            self.assertEqual(second, first)
+            ebs_client.list_snapshot_blocks.assert_not_called()
+            ebs_client.list_changed_blocks.assert_not_called()
+
+
 class RdsCollectorTests(unittest.TestCase):
     def _clients(self, instances, metric_results):
         rds_client = MagicMock()
@@ -393,6 +695,76 @@ class DynamoDbCollectorTests(unittest.TestCase):
         self.assertFalse(rows[0]["size_unknown"])
 
 
+class ItemPoolTests(unittest.TestCase):
+    def test_tables_are_described_in_parallel_in_listing_order(self):
+        names = [f"table-{index}" for index in range(20)]
+        dynamodb_client = MagicMock()
+        _mock_paginator(dynamodb_client, [{"TableNames": names}])
+        threads = set()
+
+        def describe_table(TableName):
+            threads.add(threading.get_ident())
+            time.sleep(0.01)
+            if TableName == "table-3":
+                raise _client_error("AccessDenied", "DescribeTable")
+            return {"Table": {"TableSizeBytes": int(TableName.split("-")[1])}}
+
+        dynamodb_client.describe_table.side_effect = describe_table
+        entry = EGRESS_RESOURCE_REGISTRY[DYNAMODB_CODE]
+
+        with ItemPool(4) as pool:
+            rows = _collect_dynamodb_tables(
+                _mock_session({"dynamodb": dynamodb_client}),
+                REGION,
+                DYNAMODB_CODE,
+                entry,
+                pool=pool,
+            )
+
+        self.assertGreater(len(threads), 1)
+        self.assertEqual([row["name"] for row in rows], names)
+        self.assertEqual(rows[5]["size_bytes"], 5)
+        self.assertTrue(rows[3]["size_unknown"])
+
+    def test_bucket_location_and_replication_lookups_keep_bucket_order(self):
+        s3_client = MagicMock()
+        s3_client.list_buckets.side_effect = [
+            _client_error("InvalidRequest", "ListBuckets"),
+            {"Buckets": [{"Name": f"bucket-{index}"} for index in range(10)]},
+        ]
+        s3_client.get_bucket_location.side_effect = lambda Bucket: {
+            "LocationConstraint": REGION if Bucket != "bucket-4" else "us-west-2"
+        }
+
+        def get_bucket_replication(Bucket):
+            if Bucket != "bucket-7":
+                raise _client_error(
+                    "ReplicationConfigurationNotFoundError", "GetBucketReplication"
+                )
+            return {"ReplicationConfiguration": {"Rules": [{}]}}
+
+        s3_client.get_bucket_replication.side_effect = get_bucket_replication
+        cloudwatch = MagicMock()
+        _mock_paginator(cloudwatch, [{"Metrics": []}])
+        entry = EGRESS_RESOURCE_REGISTRY[S3_CODE]
+
+        with ItemPool(4) as pool:
+            rows = _collect_s3_buckets(
+                _mock_session({"s3": s3_client, "cloudwatch": cloudwatch}),
+                REGION,
+                S3_CODE,
+                entry,
+                pool=pool,
+            )
+
+        self.assertEqual(
+            [row["name"] for row in rows],
+            [f"bucket-{index}" for index in range(10) if index != 4],
+        )
+        replicated = [row["name"] for row in rows if row["notes"]]
+        self.assertEqual(replicated, ["bucket-7"])
+
+
 class BackupVaultCollectorTests(unittest.TestCase):
     def test_vault_is_flagged_not_sized_with_recovery_point_note(self):
         backup_client = MagicMock()
@@ -475,6 +847,63 @@ class CollectAwsEgressTests(unittest.TestCase):
         # is that the S3 failure is contained and other rows still arrive.
         self.assertTrue(any(row["id"] == "vol-1" for row in rows))
 
+    @patch("core.utils_egress_aws.boto3")
+    def test_listings_from_stage_3_are_not_called_again(self, mock_boto3):
+        details = {**self._PROVIDER_DETAILS, "accessKey": "AK-SHARED"}
+        plan = CallPlan(REGION)
+        plan.add("inventory", "ec2", REGION, "describe_volumes", "Volumes")
+        plan.add("inventory", "s3", REGION, "list_buckets", "Buckets")
+        plan_egress_calls(plan, [REGION])
+
+        # Stage 3 runs both listings first.
+        inventory_ec2 = MagicMock()
+        inventory_ec2.meta.service_model.service_name = "ec2"
+        _mock_paginator(inventory_ec2, [{"Volumes": [{"VolumeId": "vol-1"}]}])
+        inventory_s3 = MagicMock()
+        inventory_s3.meta.service_model.service_name = "s3"
+        inventory_s3.can_paginate.return_value = False
+        inventory_s3.list_buckets.return_value = {"Buckets": []}
+        list(plan.iter_pages(inventory_ec2, REGION, "describe_volumes", "Volumes"))
+        list(plan.iter_pages(inventory_s3, REGION, "list_buckets", "Buckets"))
+        store_call_plan(details, plan)
+
+        clients = self._empty_clients()
+        for service in ("ec2", "s3"):
+            clients[service].meta.service_model.service_name = service
+        mock_boto3.Session.return_value = _mock_session(clients)
+
+        rows, _ = collect_aws_egress(details)
+
+        self.assertTrue(any(row["id"] == "vol-1" for row in rows))
+        paginated = [
+            call.args[0] for call in clients["ec2"].get_paginator.call_args_list
+        ]
+        self.assertNotIn("describe_volumes", paginated)
+        self.assertIn("describe_snapshots", paginated)
+        clients["s3"].list_buckets.assert_not_called()
+
+    @patch("core.utils_egress_aws._collect_region")
+    @patch("core.utils_egress_aws.boto3")
+    def test_swept_regions_share_one_session_and_keep_order(
+        self, mock_boto3, mock_collect_region
+    ):
+        mock_collect_region.side_effect = lambda session, region, plan, pool: [
+            {"id": region}
+        ]
+
+        rows, _ = collect_aws_egress(
+            {**self._PROVIDER_DETAILS, "regions": ["us-east-1", REGION, "eu-west-1"]}
+        )
+
+        self.assertEqual(
+            [row["id"] for row in rows], ["us-east-1", REGION, "eu-west-1"]
+        )
+        mock_boto3.Session.assert_called_once()
+        sessions = {call.args[0] for call in mock_collect_region.call_args_list}
+        self.assertEqual(len(sessions), 1)
+        pools = {call.args[3] for call in mock_collect_region.call_args_list}
+        self.assertEqual(len(pools), 1)
+
 
 if __name__ == "__main__":
     unittest.main()
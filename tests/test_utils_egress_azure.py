@@ -4,12 +4,16 @@ from unittest.mock import MagicMock, patch
 
 import requests
 
+from core.utils_azure import store_resource_snapshot, take_resource_snapshot
 from core.utils_egress import GIB, format_bytes
 from core.utils_egress_azure import (
+    AllocatedSizes,
+    MonitorMetrics,
     build_egress_inventory,
     collect_azure_egress,
     fetch_monitor_metrics,
     filter_data_bearing_resources,
+    metrics_queries,
 )
 
 
@@ -187,6 +191,113 @@ class FetchMonitorMetricsTests(unittest.TestCase):
         self.assertIsNone(result)
 
 
+def _batch_entry(resource_id, name, series):
+    return {
+        "resourceid": resource_id,
+        "value": [{"name": {"value": name}, "timeseries": series}],
+    }
+
+
+class MonitorMetricsBatchTests(unittest.TestCase):
+    def _accounts(self, count):
+        accounts = []
+        for index in range(count):
+            resource = _mock_resource(
+                "Microsoft.Storage/storageAccounts",
+                f"sa{index}",
+                f"/subscriptions/sub/resourceGroups/rg/providers/"
+                f"Microsoft.Storage/storageAccounts/sa{index}",
+            )
+            resource.location = "westeurope"
+            accounts.append(resource)
+        return accounts
+
+    def test_queries_are_sent_in_regional_batches_of_50(self):
+        accounts = self._accounts(60)
+        session = MagicMock()
+
+        def post(url, params, json, **kwargs):
+            if params["metricnames"] == "UsedCapacity":
+                values = [
+                    _batch_entry(
+                        resource_id,
+                        "UsedCapacity",
+                        [{"metadatavalues": [], "data": [{"average": 5.0}]}],
+                    )
+                    for resource_id in json["resourceids"]
+                ]
+            else:
+                values = [
+                    _batch_entry(
+                        resource_id,
+                        "BlobCapacity",
+                        [
+                            {
+                                "metadatavalues": [
+                                    {"name": {"value": "tier"}, "value": "Archive"}
+                                ],
+                                "data": [{"average": 3.0}],
+                            }
+                        ],
+                    )
+                    for resource_id in json["resourceids"]
+                ]
+            response = MagicMock()
+            response.json.return_value = {"values": values}
+            return response
+
+        session.post.side_effect = post
+        metrics = MonitorMetrics(_mock_credential(), session)
+
+        metrics.prefetch(
+            [
+                query
+                for resource, entry in filter_data_bearing_resources(accounts)
+                for query in metrics_queries(resource, entry)
+            ]
+        )
+        with patch("core.utils_egress_azure.fetch_monitor_metrics") as mock_fetch:
+            rows, _ = build_egress_inventory(
+                MagicMock(), MagicMock(), accounts, metrics
+            )
+
+        mock_fetch.assert_not_called()
+        self.assertEqual(session.post.call_count, 4)
+        batch_sizes = sorted(
+            len(call.kwargs["json"]["resourceids"])
+            for call in session.post.call_args_list
+        )
+        self.assertEqual(batch_sizes, [10, 10, 50, 50])
+        first = session.post.call_args_list[0]
+        self.assertEqual(
+            first.args[0],
+            "https://westeurope.metrics.monitor.azure.com/subscriptions/sub/"
+            "metrics:getBatch",
+        )
+        self.assertEqual(rows[0]["size_bytes"], 5)
+        self.assertEqual(rows[0]["tier_bytes"], {"Archive": 3})
+
+    def test_failed_batch_falls_back_to_one_request_per_resource(self):
+        accounts = self._accounts(1)
+        session = MagicMock()
+        session.post.side_effect = requests.ConnectionError("regional outage")
+        metrics = MonitorMetrics(_mock_credential(), session)
+        metrics.prefetch(
+            metrics_queries(accounts[0], {"strategy": "storage_account_metrics"})
+        )
+
+        with patch(
+            "core.utils_egress_azure.fetch_monitor_metrics",
+            return_value={"UsedCapacity": [{"dimension": None, "value": 7.0}]},
+        ) as mock_fetch:
+            self.assertEqual(
+                metrics.get(accounts[0].id, ["UsedCapacity"]),
+                {"UsedCapacity": [{"dimension": None, "value": 7.0}]},
+            )
+
+        self.assertIs(mock_fetch.call_args.kwargs["session"], session)
+
+
 class StorageAccountTierSplitTests(unittest.TestCase):
     @patch("core.utils_egress_azure.fetch_monitor_metrics")
     def test_hot_cool_archive_split_and_archive_flag(self, mock_fetch):
@@ -277,6 +388,44 @@ class AllocatedSizeTests(unittest.TestCase):
         self.assertIn("size unavailable", rows[0]["flags"])
         self.assertTrue(any("size lookup failed" in f["message"] for f in findings))
 
+    @patch("core.utils_egress_azure.query_resource_graph")
+    def test_prefetched_sizes_replace_get_by_id(self, mock_graph):
+        mock_graph.return_value = iter(
+            [
+                [{"id": "/subscriptions/sub-id/DISK1", "size": 64}],
+                [{"id": "/subscriptions/sub-id/snap1", "size": 32}],
+            ]
+        )
+        disk = _mock_resource(
+            "Microsoft.Compute/disks", "disk1", "/subscriptions/sub-id/disk1"
+        )
+        snapshot = _mock_resource(
+            "Microsoft.Compute/snapshots", "snap1", "/subscriptions/sub-id/snap1"
+        )
+        fresh = _mock_resource(
+            "Microsoft.Compute/disks", "disk2", "/subscriptions/sub-id/disk2"
+        )
+        resource_client = MagicMock()
+        resource_client.resources.get_by_id.return_value.properties = {"diskSizeGB": 8}
+        sizes = AllocatedSizes(resource_client)
+
+        sizes.prefetch(MagicMock(), "sub-id", "rg")
+        rows, _ = build_egress_inventory(
+            MagicMock(), resource_client, [disk, snapshot, fresh], sizes=sizes
+        )
+
+        query = mock_graph.call_args.args[2]
+        self.assertIn("'microsoft.compute/disks', 'microsoft.compute/snapshots'", query)
+        self.assertIn("resourceGroup =~ 'rg'", query)
+        self.assertIn("properties.diskSizeGB", query)
+        self.assertEqual(
+            [row["size_bytes"] for row in rows], [64 * GIB, 32 * GIB, 8 * GIB]
+        )
+        # Only the disk Resource Graph did not return is fetched on its own.
+        resource_client.resources.get_by_id.assert_called_once_with(
+            "/subscriptions/sub-id/disk2", "2024-03-02"
+        )
+
 
 class VaultDetectionTests(unittest.TestCase):
     @patch("core.utils_egress_azure.fetch_monitor_metrics")
@@ -324,6 +473,31 @@ class CollectAzureEgressTests(unittest.TestCase):
         self.assertNotIn("findings", rows[0])
         self.assertEqual(archive_tiers, {"Archive"})
 
+    @patch("core.utils_egress_azure.fetch_monitor_metrics")
+    @patch("core.utils_egress_azure.ResourceManagementClient")
+    def test_stage_3_listing_is_reused(self, mock_rmc_cls, mock_fetch):
+        mock_fetch.side_effect = [
+            {"UsedCapacity": [{"dimension": None, "value": float(GIB)}]},
+            {"BlobCapacity": []},
+        ]
+        provider_details = {
+            "credential": _mock_credential(),
+            "subscriptionId": "sub-id",
+            "resourceGroupName": "rg",
+            "egress": True,
+        }
+        store_resource_snapshot(
+            provider_details,
+            [_mock_resource("Microsoft.Storage/storageAccounts", "sa1", "/sa1")],
+        )
+
+        rows, _ = collect_azure_egress(provider_details)
+
+        self.assertEqual([row["name"] for row in rows], ["sa1"])
+        mock_rmc_cls.return_value.resources.list_by_resource_group.assert_not_called()
+        # The snapshot serves one run only.
+        self.assertIsNone(take_resource_snapshot(provider_details))
+
 
 if __name__ == "__main__":
     unittest.main()
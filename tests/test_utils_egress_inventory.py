@@ -0,0 +1,212 @@
+# tests/test_utils_egress_inventory.py
+import gzip
+import importlib.util
+import io
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import MagicMock
+
+from core.utils_egress import new_row
+from core.utils_egress_inventory import (
+    fill_unknown_sizes,
+    read_blob_inventory,
+    read_inventories,
+    read_s3_inventory,
+)
+
+S3_SCHEMA = (
+    "Bucket, Key, Size, StorageClass, IsDeleteMarker, IntelligentTieringAccessTier"
+)
+
+S3_ROWS = [
+    ["logs", "a", "100", "STANDARD", "false", ""],
+    ["logs", "b", "", "STANDARD", "true", ""],
+    ["logs", "c", "40", "GLACIER", "false", ""],
+    ["logs", "d", "7", "INTELLIGENT_TIERING", "false", "DEEP_ARCHIVE"],
+    ["logs", "e", "3", "INTELLIGENT_TIERING", "false", "FREQUENT"],
+]
+
+
+def _gzip_csv(rows):
+    return gzip.compress("".join(",".join(row) + "\n" for row in rows).encode())
+
+
+class InventoryTestCase(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        self.root = self._tmp.name
+
+    def _write(self, path, content):
+        path = os.path.join(self.root, path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        mode = "wb" if isinstance(content, bytes) else "w"
+        with open(path, mode) as out:
+            out.write(content)
+        return path
+
+
+class S3InventoryTests(InventoryTestCase):
+    def _manifest(self, file_format, files):
+        return {
+            "sourceBucket": "logs",
+            "destinationBucket": "arn:aws:s3:::inventory-dest",
+            "fileFormat": file_format,
+            "fileSchema": S3_SCHEMA,
+            "files": [{"key": key} for key in files],
+        }
+
+    def test_local_csv_files_are_summed_per_tier(self):
+        data = "inv/logs/daily/data"
+        self._write(f"{data}/part-1.csv.gz", _gzip_csv(S3_ROWS[:3]))
+        self._write(f"{data}/part-2.csv.gz", _gzip_csv(S3_ROWS[3:]))
+        manifest = self._write(
+            "inv/logs/daily/2026-10-16T01-00Z/manifest.json",
+            json.dumps(
+                self._manifest(
+                    "CSV", [f"{data}/part-1.csv.gz", f"{data}/part-2.csv.gz"]
+                )
+            ),
+        )
+
+        sizes = read_s3_inventory(manifest)
+
+        # The delete marker holds no data; Intelligent-Tiering objects in
+        # Deep Archive Access are counted as Deep Archive.
+        self.assertEqual(
+            sizes,
+            {
+                "logs": {
+                    "Standard": 100,
+                    "Glacier": 40,
+                    "Deep Archive": 7,
+                    "Intelligent-Tiering": 3,
+                }
+            },
+        )
+
+    def test_manifest_and_files_are_streamed_from_the_destination_bucket(self):
+        manifest = self._manifest("CSV", ["logs/daily/data/part-1.csv.gz"])
+        s3_client = MagicMock()
+        s3_client.get_object.side_effect = lambda Bucket, Key: {
+            "Body": io.BytesIO(
+                json.dumps(manifest).encode()
+                if Key.endswith("manifest.json")
+                else _gzip_csv(S3_ROWS[:1])
+            )
+        }
+
+        sizes = read_s3_inventory(
+            "s3://inventory-dest/logs/daily/2026-10-16T01-00Z/manifest.json",
+            s3_client,
+        )
+
+        self.assertEqual(sizes, {"logs": {"Standard": 100}})
+        s3_client.get_object.assert_called_with(
+            Bucket="inventory-dest", Key="logs/daily/data/part-1.csv.gz"
+        )
+
+    @unittest.skipUnless(importlib.util.find_spec("pyarrow"), "needs pyarrow")
+    def test_parquet_files_are_grouped_per_batch(self):
+        import pyarrow
+        import pyarrow.parquet
+
+        table = pyarrow.table(
+            {
+                "key": ["a", "b", "c"],
+                "size": [10, 20, None],
+                "storage_class": ["STANDARD", "GLACIER", "STANDARD"],
+                "is_delete_marker": [False, False, True],
+            }
+        )
+        pyarrow.parquet.write_table(
+            table, os.path.join(self.root, "part-1.parquet"), row_group_size=2
+        )
+        manifest = self._write(
+            "manifest.json",
+            json.dumps(self._manifest("Parquet", ["part-1.parquet"])),
+        )
+
+        self.assertEqual(
+            read_s3_inventory(manifest), {"logs": {"Standard": 10, "Glacier": 20}}
+        )
+
+
+class BlobInventoryTests(InventoryTestCase):
+    def test_local_csv_is_summed_per_access_tier(self):
+        self._write(
+            "2026/10/16/01-00-00/sizes/sizes_1.csv",
+            "Name,Content-Length,AccessTier,Deleted\n"
+            "data/a.parquet,500,Hot,false\n"
+            "data/b.parquet,200,Archive,false\n"
+            "data/c.parquet,900,Hot,true\n"
+            "data/d.parquet,100,,false\n",
+        )
+        manifest = self._write(
+            "2026/10/16/01-00-00/sizes/sizes-manifest.json",
+            json.dumps(
+                {
+                    "destinationContainer": "inventory",
+                    "endpoint": "https://lakeprod.blob.core.windows.net",
+                    "files": [{"blob": "2026/10/16/01-00-00/sizes/sizes_1.csv"}],
+                    "ruleDefinition": {"format": "Csv", "objectType": "Blob"},
+                    "ruleName": "sizes",
+                }
+            ),
+        )
+
+        sizes = read_blob_inventory(manifest)
+
+        # Soft-deleted blobs are not exported.
+        self.assertEqual(
+            sizes, {"lakeprod": {"Hot": 500, "Archive": 200, "Unknown": 100}}
+        )
+
+
+class FillUnknownSizesTests(InventoryTestCase):
+    def test_only_unknown_rows_of_the_type_are_filled(self):
+        unknown = new_row("arn:aws:s3:::logs", "logs", "S3", "S3 Bucket", "object")
+        unknown["size_unknown"] = True
+        measured = new_row("arn:aws:s3:::web", "web", "S3", "S3 Bucket", "object")
+        measured["size_bytes"] = 5
+        volume = new_row("vol-1", "logs", "EBS", "EBS Volume", "block")
+        volume["size_unknown"] = True
+        rows = [unknown, measured, volume]
+
+        filled = fill_unknown_sizes(
+            rows,
+            {
+                "logs": {"Standard": 100, "Glacier": 40},
+                "web": {"Standard": 1},
+            },
+            "S3",
+            "S3 Inventory",
+            {"Glacier"},
+            lambda size: f"archive {size}",
+        )
+
+        self.assertEqual(filled, 1)
+        self.assertEqual(unknown["size_bytes"], 140)
+        self.assertEqual(unknown["tier_bytes"], {"Standard": 100, "Glacier": 40})
+        self.assertFalse(unknown["size_unknown"])
+        self.assertEqual(unknown["flags"], ["archive 40"])
+        self.assertEqual(unknown["notes"], ["sized from S3 Inventory"])
+        self.assertEqual(measured["size_bytes"], 5)
+        self.assertTrue(volume["size_unknown"])
+
+    def test_unreadable_manifests_are_skipped_and_the_rest_merged(self):
+        def read(location):
+            if location == "broken":
+                raise FileNotFoundError(location)
+            return {"logs": {"Standard": 1}}
+
+        with self.assertLogs("core.engine.egress", "WARNING"):
+            sizes = read_inventories(["a", "broken", "b"], read)
+
+        self.assertEqual(sizes, {"logs": {"Standard": 2}})
+
+
+if __name__ == "__main__":
+    unittest.main()
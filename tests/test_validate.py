@@ -110,6 +110,226 @@ class ValidateConfigTests(unittest.TestCase):
         with self.assertRaisesRegex(ValueError, "Invalid AWS region"):
             validate_config(config)
 
+    def test_accepts_aws_config_with_jobs(self):
+        config = build_aws_config()
+        config["providerDetails"]["jobs"] = 4
+
+        self.assertTrue(validate_config(config))
+
+    def test_rejects_aws_config_with_invalid_jobs(self):
+        for jobs in (0, -2, "8", 2.5, True):
+            config = build_aws_config()
+            config["providerDetails"]["jobs"] = jobs
+
+            with self.assertRaisesRegex(ValueError, "Invalid jobs"):
+                validate_config(config)
+
+    def test_accepts_aws_config_with_region_list_or_all(self):
+        for regions in (["eu-central-1", "us-east-1"], "all"):
+            config = build_aws_config()
+            config["providerDetails"]["regions"] = regions
+
+            self.assertTrue(validate_config(config))
+
+    def test_rejects_aws_config_with_invalid_regions(self):
+        for regions, message in (
+            ([], "Invalid regions"),
+            ("eu-central-1", "Invalid regions"),
+            (["eu-central-1", "moon-central-1"], "Invalid AWS region"),
+        ):
+            config = build_aws_config()
+            config["providerDetails"]["regions"] = regions
+
+            with self.assertRaisesRegex(ValueError, message):
+                validate_config(config)
+
+    def test_rejects_aws_config_with_non_boolean_raw_data(self):
+        config = build_aws_config()
+        config["providerDetails"]["rawData"] = "no"
+
+        with self.assertRaisesRegex(ValueError, "Invalid rawData"):
+            validate_config(config)
+
+    def test_resume_path_must_be_a_report_directory(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            config = build_aws_config()
+            config["providerDetails"]["resumePath"] = tmp_dir
+
+            with self.assertRaisesRegex(ValueError, "Invalid resumePath"):
+                validate_config(config)
+
+            (Path(tmp_dir) / "data").mkdir()
+            (Path(tmp_dir) / "data" / "assessment.db").touch()
+            self.assertTrue(validate_config(config))
+
+    def test_validates_response_cache_settings(self):
+        config = build_azure_config()
+        config["providerDetails"].update(cacheDir="cache", cacheTtl=0.5, refresh=True)
+        self.assertTrue(validate_config(config))
+
+        for fields, message in (
+            ({"cacheDir": ""}, "Invalid cacheDir"),
+            ({"cacheTtl": 0}, "Invalid cacheTtl"),
+            ({"cacheTtl": "6"}, "Invalid cacheTtl"),
+        ):
+            config = build_aws_config()
+            config["providerDetails"].update(fields)
+
+            with self.assertRaisesRegex(ValueError, message):
+                validate_config(config)
+
+        config = build_aws_config()
+        config["providerDetails"].update(refresh="yes")
+        with self.assertRaisesRegex(TypeError, "Invalid refresh"):
+            validate_config(config)
+
+    def test_validates_inventory_backend(self):
+        config = build_aws_config()
+        config["providerDetails"].update(
+            inventoryBackend="config", configAggregator="org"
+        )
+        self.assertTrue(validate_config(config))
+
+        for fields, message in (
+            ({"inventoryBackend": "graph"}, "Invalid inventoryBackend"),
+            (
+                {"inventoryBackend": "config", "configAggregator": ""},
+                "Invalid configAggregator",
+            ),
+            ({"configAggregator": "org"}, "requires inventoryBackend"),
+        ):
+            config = build_aws_config()
+            config["providerDetails"].update(fields)
+
+            with self.assertRaisesRegex(ValueError, message):
+                validate_config(config)
+
+    def test_validates_azure_inventory_backend(self):
+        config = build_azure_config()
+        config["providerDetails"].update(inventoryBackend="graph", rawData=True)
+        self.assertTrue(validate_config(config))
+
+        for fields, message in (
+            ({"inventoryBackend": "config"}, "Invalid inventoryBackend"),
+            ({"rawData": "yes"}, "Invalid rawData"),
+            ({"tokenCache": "yes"}, "Invalid tokenCache"),
+        ):
+            config = build_azure_config()
+            config["providerDetails"].update(fields)
+
+            with self.assertRaisesRegex(ValueError, message):
+                validate_config(config)
+
+    def test_validates_azure_scopes(self):
+        config = build_azure_config()
+        del config["providerDetails"]["resourceGroupName"]
+        config["providerDetails"].update(
+            subscriptions=["sub-a", "sub-b"], managementGroup="mg", scopeParallel=2
+        )
+        self.assertTrue(validate_config(config))
+
+        for fields, message in (
+            ({"resourceGroups": []}, "Invalid resourceGroups"),
+            ({"subscriptions": "sub-a"}, "Invalid subscriptions"),
+            ({"managementGroup": ""}, "Invalid managementGroup"),
+            ({"subscriptions": ["sub-a"], "scopeParallel": 0}, "Invalid scopeParallel"),
+            ({"scopeParallel": 2}, "scopeParallel requires"),
+            ({"resourceGroups": ["rg"], "egress": True}, "several scopes"),
+        ):
+            config = build_azure_config()
+            config["providerDetails"].update(fields)
+
+            with self.assertRaisesRegex(ValueError, message):
+                validate_config(config)
+
+    def test_validates_tag_scope(self):
+        config = build_aws_config()
+        config["providerDetails"]["tags"] = {"app": "payments"}
+        self.assertTrue(validate_config(config))
+
+        for fields, message in (
+            ({"tags": {}}, "Invalid tags"),
+            ({"tags": ["app=payments"]}, "Invalid tags"),
+            ({"tags": {"app": 1}}, "Invalid tags"),
+            ({"tags": {"app": "payments"}, "egress": True}, "tag scope"),
+            (
+                {"tags": {"app": "payments"}, "inventoryBackend": "config"},
+                "tag scope",
+            ),
+        ):
+            config = build_aws_config()
+            config["providerDetails"].update(fields)
+
+            with self.assertRaisesRegex(ValueError, message):
+                validate_config(config)
+
+    def test_validates_egress_inventory(self):
+        for config, location in (
+            (build_aws_config(), "s3://inventory/logs/manifest.json"),
+            (
+                build_azure_config(),
+                "https://lake.blob.core.windows.net/inventory/sizes-manifest.json",
+            ),
+        ):
+            config["providerDetails"].update(
+                egress=True, egressInventory=[location, "local/manifest.json"]
+            )
+            self.assertTrue(validate_config(config))
+
+        for fields, message in (
+            ({"egress": True, "egressInventory": []}, "Invalid egressInventory"),
+            (
+                {"egress": True, "egressInventory": ["https://x/manifest.json"]},
+                "Must be a local path or a s3:// URL",
+            ),
+            ({"egressInventory": ["manifest.json"]}, "requires egress"),
+        ):
+            config = build_aws_config()
+            config["providerDetails"].update(fields)
+
+            with self.assertRaisesRegex(ValueError, message):
+                validate_config(config)
+
+    def test_validates_snapshot_lineage(self):
+        config = build_aws_config()
+        config["providerDetails"].update(egress=True, snapshotLineage=True)
+        self.assertTrue(validate_config(config))
+
+        config = build_aws_config()
+        config["providerDetails"].update(egress=True, snapshotLineage="yes")
+        with self.assertRaisesRegex(TypeError, "Invalid snapshotLineage"):
+            validate_config(config)
+
+        config = build_aws_config()
+        config["providerDetails"].update(snapshotLineage=True)
+        with self.assertRaisesRegex(ValueError, "requires egress"):
+            validate_config(config)
+
+    def test_accepts_aws_config_with_org_scope(self):
+        config = build_aws_config()
+        config["providerDetails"].update(
+            orgRole="CloudExitReadOnly",
+            orgAccounts=["123456789012"],
+            orgParallel=2,
+        )
+
+        self.assertTrue(validate_config(config))
+
+    def test_rejects_aws_config_with_invalid_org_scope(self):
+        for fields, message in (
+            ({"orgRole": ""}, "Invalid orgRole"),
+            ({"orgAccounts": ["123456789012"]}, "Invalid orgRole"),
+            ({"orgRole": "r", "orgAccounts": ["12345"]}, "Invalid orgAccounts"),
+            ({"orgRole": "r", "orgAccounts": []}, "Invalid orgAccounts"),
+            ({"orgRole": "r", "orgParallel": 0}, "Invalid orgParallel"),
+            ({"orgRole": "r", "egress": True}, "organizations mode"),
+        ):
+            config = build_aws_config()
+            config["providerDetails"].update(fields)
+
+            with self.assertRaisesRegex(ValueError, message):
+                validate_config(config)
+
 
 class ValidateTfstateConfigTests(unittest.TestCase):
     def setUp(self):
@@ -146,6 +146,17 @@ def create_directory(base_path="reports"):
     return directory_path, raw_data_path
 
 
+def resume_directory(directory_path: str) -> tuple[str, str]:
+    """The directories of an earlier report, to be completed by --resume."""
+    if not os.path.isfile(os.path.join(directory_path, "data", "assessment.db")):
+        raise RuntimeError(
+            f"{directory_path} is not a report directory (no data/assessment.db)."
+        )
+    raw_data_path = os.path.join(directory_path, "raw_data")
+    os.makedirs(raw_data_path, exist_ok=True)
+    return directory_path, raw_data_path
+
+
 def require_env(var: str, description: str) -> str:
     """Return the value of an env var, or exit with CONFIG if it is unset/empty."""
     value = os.environ.get(var, "").strip()
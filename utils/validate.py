@@ -19,6 +19,26 @@ LIVE_ONLY_FIELDS = (
     "clientSecret",
     "subscriptionId",
     "resourceGroupName",
+    "jobs",
+    "regions",
+    "rawData",
+    "orgRole",
+    "orgAccounts",
+    "orgParallel",
+    "resumePath",
+    "inventoryBackend",
+    "configAggregator",
+    "tags",
+    "resourceGroups",
+    "subscriptions",
+    "managementGroup",
+    "scopeParallel",
+    "tokenCache",
+    "egressInventory",
+    "snapshotLineage",
+    "cacheDir",
+    "cacheTtl",
+    "refresh",
 )
 
 
@@ -28,6 +48,200 @@ def validate_region(region: str) -> None:
         raise ValueError(f"Invalid AWS region. Choose from: {', '.join(valid_regions)}")
 
 
+def validate_jobs(jobs: Any) -> None:
+    if isinstance(jobs, bool) or not isinstance(jobs, int) or jobs < 1:
+        raise ValueError("Invalid jobs in providerDetails. Must be an integer >= 1.")
+
+
+def validate_regions(regions: Any) -> None:
+    if regions == "all":
+        return
+    if not isinstance(regions, list) or not regions:
+        raise ValueError(
+            'Invalid regions in providerDetails. Must be "all" or a non-empty '
+            "list of AWS regions."
+        )
+    for region in regions:
+        validate_region(region)
+
+
+def validate_org(provider_details: dict[str, Any]) -> None:
+    org_role = provider_details.get("orgRole")
+    if not isinstance(org_role, str) or not org_role.strip():
+        raise ValueError(
+            "Invalid orgRole in providerDetails. Must be the name of the role to "
+            "assume in each member account."
+        )
+    if "orgAccounts" in provider_details:
+        accounts = provider_details["orgAccounts"]
+        if (
+            not isinstance(accounts, list)
+            or not accounts
+            or not all(
+                isinstance(account, str) and len(account) == 12 and account.isdigit()
+                for account in accounts
+            )
+        ):
+            raise ValueError(
+                "Invalid orgAccounts in providerDetails. Must be a non-empty list "
+                "of 12-digit AWS account IDs."
+            )
+    if "orgParallel" in provider_details:
+        org_parallel = provider_details["orgParallel"]
+        if (
+            isinstance(org_parallel, bool)
+            or not isinstance(org_parallel, int)
+            or org_parallel < 1
+        ):
+            raise ValueError(
+                "Invalid orgParallel in providerDetails. Must be an integer >= 1."
+            )
+    if provider_details.get("egress"):
+        raise ValueError(
+            "Egress estimation is not available in organizations mode (orgRole)."
+        )
+
+
+def validate_inventory_backend(
+    provider_details: dict[str, Any], backends: tuple[str, ...]
+) -> None:
+    if provider_details.get("inventoryBackend", "api") not in backends:
+        raise ValueError(
+            "Invalid inventoryBackend in providerDetails. Must be one of: "
+            + ", ".join(f"'{backend}'" for backend in backends)
+            + "."
+        )
+    if "configAggregator" in provider_details:
+        aggregator = provider_details["configAggregator"]
+        if not isinstance(aggregator, str) or not aggregator.strip():
+            raise ValueError(
+                "Invalid configAggregator in providerDetails. Must be the name of "
+                "an AWS Config aggregator."
+            )
+        if provider_details.get("inventoryBackend") != "config":
+            raise ValueError(
+                "configAggregator requires inventoryBackend 'config' in "
+                "providerDetails."
+            )
+
+
+def validate_tags(provider_details: dict[str, Any]) -> None:
+    tags = provider_details["tags"]
+    if (
+        not isinstance(tags, dict)
+        or not tags
+        or len(tags) > 50
+        or not all(
+            isinstance(key, str) and key.strip() and isinstance(value, str)
+            for key, value in tags.items()
+        )
+    ):
+        raise ValueError(
+            "Invalid tags in providerDetails. Must be an object of 1 to 50 tag "
+            'keys and values, e.g. {"app": "payments"}.'
+        )
+    if provider_details.get("egress"):
+        raise ValueError("Egress estimation is not available for a tag scope (tags).")
+    if provider_details.get("inventoryBackend") == "config":
+        raise ValueError(
+            "A tag scope (tags) cannot be combined with inventoryBackend 'config'."
+        )
+
+
+def _is_name_list(value: Any) -> bool:
+    return (
+        isinstance(value, list)
+        and bool(value)
+        and all(isinstance(name, str) and name.strip() for name in value)
+    )
+
+
+def validate_azure_scope(provider_details: dict[str, Any]) -> None:
+    if "resourceGroups" in provider_details and not _is_name_list(
+        provider_details["resourceGroups"]
+    ):
+        raise ValueError(
+            "Invalid resourceGroups in providerDetails. Must be a non-empty list "
+            "of resource group names in subscriptionId."
+        )
+    if "subscriptions" in provider_details and not _is_name_list(
+        provider_details["subscriptions"]
+    ):
+        raise ValueError(
+            "Invalid subscriptions in providerDetails. Must be a non-empty list "
+            "of subscription IDs."
+        )
+    if "managementGroup" in provider_details:
+        management_group = provider_details["managementGroup"]
+        if not isinstance(management_group, str) or not management_group.strip():
+            raise ValueError(
+                "Invalid managementGroup in providerDetails. Must be the ID of a "
+                "management group."
+            )
+    if "scopeParallel" in provider_details:
+        scope_parallel = provider_details["scopeParallel"]
+        if (
+            isinstance(scope_parallel, bool)
+            or not isinstance(scope_parallel, int)
+            or scope_parallel < 1
+        ):
+            raise ValueError(
+                "Invalid scopeParallel in providerDetails. Must be an integer >= 1."
+            )
+    if provider_details.get("egress"):
+        raise ValueError(
+            "Egress estimation is not available for several scopes "
+            "(resourceGroups, subscriptions, managementGroup)."
+        )
+
+
+def validate_egress_inventory(provider_details: dict[str, Any], scheme: str) -> None:
+    locations = provider_details["egressInventory"]
+    if not _is_name_list(locations):
+        raise ValueError(
+            "Invalid egressInventory in providerDetails. Must be a non-empty list "
+            "of inventory manifest paths or URLs."
+        )
+    for location in locations:
+        if "://" in location and not location.startswith(scheme):
+            raise ValueError(
+                f"Invalid egressInventory location {location}. Must be a local "
+                f"path or a {scheme} URL."
+            )
+    if not provider_details.get("egress"):
+        raise ValueError("egressInventory requires egress estimation (--egress).")
+
+
+def validate_snapshot_lineage(provider_details: dict[str, Any]) -> None:
+    if not isinstance(provider_details["snapshotLineage"], bool):
+        raise TypeError(
+            "Invalid snapshotLineage in providerDetails. Must be true or false."
+        )
+    if provider_details["snapshotLineage"] and not provider_details.get("egress"):
+        raise ValueError("snapshotLineage requires egress estimation (--egress).")
+
+
+def validate_cache(provider_details: dict[str, Any]) -> None:
+    if "cacheDir" in provider_details:
+        cache_dir = provider_details["cacheDir"]
+        if not isinstance(cache_dir, str) or not cache_dir.strip():
+            raise ValueError(
+                "Invalid cacheDir in providerDetails. Must be a directory path."
+            )
+    if "cacheTtl" in provider_details:
+        cache_ttl = provider_details["cacheTtl"]
+        if (
+            isinstance(cache_ttl, bool)
+            or not isinstance(cache_ttl, (int, float))
+            or cache_ttl <= 0
+        ):
+            raise ValueError(
+                "Invalid cacheTtl in providerDetails. Must be a number of hours > 0."
+            )
+    if not isinstance(provider_details.get("refresh", False), bool):
+        raise TypeError("Invalid refresh in providerDetails. Must be true or false.")
+
+
 def validate_config(config: dict[str, Any]) -> bool:
     try:
         # Cast key values to integers to handle string input gracefully
@@ -87,21 +301,72 @@ def validate_config(config: dict[str, Any]) -> bool:
 
         return True
 
+    validate_cache(provider_details)
+
     if cloud_service_provider == 1:  # Azure
         # Skip validation of clientId and clientSecret if using CLI credentials
         if provider_details.get("credential") is not None:
             required_fields = ["tenantId", "subscriptionId", "resourceGroupName"]
         else:
             required_fields = REQUIRED_FIELDS_AZURE
+        scope_fields = ("resourceGroups", "subscriptions", "managementGroup")
+        if any(field in provider_details for field in scope_fields):
+            # The scope fields name what to assess instead of resourceGroupName.
+            validate_azure_scope(provider_details)
+            required_fields = [
+                field for field in required_fields if field != "resourceGroupName"
+            ]
+        elif "scopeParallel" in provider_details:
+            raise ValueError(
+                "scopeParallel requires resourceGroups, subscriptions or "
+                "managementGroup in providerDetails."
+            )
         missing_fields = [
             field for field in required_fields if field not in provider_details
         ]
+        validate_inventory_backend(provider_details, ("api", "graph"))
+        if not isinstance(provider_details.get("rawData", False), bool):
+            raise ValueError(
+                "Invalid rawData in providerDetails. Must be true or false."
+            )
+        if not isinstance(provider_details.get("tokenCache", False), bool):
+            raise ValueError(
+                "Invalid tokenCache in providerDetails. Must be true or false."
+            )
+        if "egressInventory" in provider_details:
+            validate_egress_inventory(provider_details, "https://")
     elif cloud_service_provider == 2:  # AWS
         missing_fields = [
             field for field in REQUIRED_FIELDS_AWS if field not in provider_details
         ]
         if "region" in provider_details:
             validate_region(provider_details["region"])
+        if "jobs" in provider_details:
+            validate_jobs(provider_details["jobs"])
+        if "regions" in provider_details:
+            validate_regions(provider_details["regions"])
+        if not isinstance(provider_details.get("rawData", True), bool):
+            raise ValueError(
+                "Invalid rawData in providerDetails. Must be true or false."
+            )
+        if "resumePath" in provider_details:
+            resume_path = provider_details["resumePath"]
+            if not isinstance(resume_path, str) or not os.path.isfile(
+                os.path.join(resume_path, "data", "assessment.db")
+            ):
+                raise ValueError(
+                    "Invalid resumePath in providerDetails. Must be the directory "
+                    "of an earlier report (containing data/assessment.db)."
+                )
+        if any(field.startswith("org") for field in provider_details):
+            validate_org(provider_details)
+        validate_inventory_backend(provider_details, ("api", "config"))
+        if "tags" in provider_details:
+            validate_tags(provider_details)
+        if "egressInventory" in provider_details:
+            validate_egress_inventory(provider_details, "s3://")
+        if "snapshotLineage" in provider_details:
+            validate_snapshot_lineage(provider_details)
     else:
         raise ValueError(
             f"Invalid cloudServiceProvider: {cloud_service_provider}. Supported values: 1 (Azure), 2 (AWS)."